@@ -0,0 +1,247 @@
+"""Score a CSV or Parquet file of leads across a process pool.
+
+Usage:
+    python -m app.batch_score leads.csv -o predictions.csv --workers 8
+
+Each worker loads the model artifacts once, when it starts. Chunks are
+scored in parallel and written in input order as soon as they are ready.
+Parquet files need pyarrow.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from app.utils.constants import FEATURE_NAMES
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+_ml_service = None
+
+
+def _init_worker(blas_threads: int | None = None) -> None:
+    """Load the model artifacts, once per worker process.
+
+    Args:
+        blas_threads (int | None): The maximum number of BLAS and OpenMP
+            threads of the worker, so that the workers do not oversubscribe
+            the cores. None keeps the execution policy of the service.
+    """
+    global _ml_service
+    from app.services import ml_service
+
+    if blas_threads is not None:
+        ml_service.execution.blas_threads = blas_threads
+    ml_service.warm_up()
+    _ml_service = ml_service
+
+
+def score_chunk(chunk: pd.DataFrame, id_columns: list[str]) -> pd.DataFrame:
+    """Score one chunk of leads.
+
+    Args:
+        chunk (DataFrame): The leads, with one column per feature.
+        id_columns (list[str]): Columns copied as is into the results.
+
+    Returns:
+        DataFrame: The id columns, the prediction and the error of each lead.
+    """
+    if _ml_service is None:
+        _init_worker()
+    pipeline = _ml_service.pipeline
+
+    leads = chunk[FEATURE_NAMES].to_dict("records")
+    features = np.empty((len(leads), pipeline.n_features), dtype=np.float64)
+    predictions = np.full(len(leads), None, dtype=object)
+    errors = np.full(len(leads), None, dtype=object)
+
+    positions = []
+    for position, lead in enumerate(leads):
+        try:
+            features[len(positions)] = pipeline.encode(lead)
+            positions.append(position)
+        except ValueError as e:
+            errors[position] = str(e)
+
+    if positions:
+        features = features[: len(positions)]
+        predictions[positions] = _ml_service.predict_encoded(features)
+
+    results = chunk[id_columns].reset_index(drop=True)
+    results["prediction"] = predictions
+    results["error"] = errors
+    return results
+
+
+def read_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Read a CSV or Parquet file chunk by chunk.
+
+    Args:
+        path (str): The file to read.
+        chunk_size (int): The number of rows per chunk.
+
+    Yields:
+        DataFrame: The chunks, in file order.
+
+    Raises:
+        ImportError: If the file is a Parquet file and pyarrow is missing.
+    """
+    if path.endswith(".parquet"):
+        if pyarrow is None:
+            raise ImportError("Reading Parquet files requires pyarrow")
+        parquet_file = pyarrow.parquet.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, keep_default_na=False)
+
+
+class ResultWriter:
+    """Append result chunks to a CSV or Parquet file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._parquet_writer = None
+        self._schema = None
+        self._header = True
+        if path.endswith(".parquet") and pyarrow is None:
+            raise ImportError("Writing Parquet files requires pyarrow")
+
+    def write(self, results: pd.DataFrame) -> None:
+        """Append one chunk of results."""
+        if self.path.endswith(".parquet"):
+            if self._parquet_writer is None:
+                # A column of None would be typed null, and reject later strings
+                schema = pyarrow.Schema.from_pandas(results, preserve_index=False)
+                for name in ("prediction", "error"):
+                    schema = schema.set(
+                        schema.get_field_index(name),
+                        pyarrow.field(name, pyarrow.string()),
+                    )
+                self._schema = schema
+                self._parquet_writer = pyarrow.parquet.ParquetWriter(
+                    self.path, schema
+                )
+            table = pyarrow.Table.from_pandas(
+                results, schema=self._schema, preserve_index=False
+            )
+            self._parquet_writer.write_table(table)
+        else:
+            mode = "w" if self._header else "a"
+            results.to_csv(self.path, mode=mode, header=self._header, index=False)
+            self._header = False
+
+    def close(self) -> None:
+        """Flush and close the output file."""
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def score_file(
+    input_path: str,
+    output_path: str,
+    workers: int = 1,
+    chunk_size: int = 10_000,
+    id_columns: list[str] | None = None,
+) -> dict:
+    """Score a file across a process pool, writing results as chunks complete.
+
+    At most two chunks per worker are in flight, so memory use does not
+    depend on the size of the file. Each worker gets an equal share of the
+    cores for its BLAS and OpenMP threads.
+
+    Args:
+        input_path (str): The CSV or Parquet file of leads.
+        output_path (str): The CSV or Parquet file to write the results to.
+        workers (int): The number of worker processes.
+        chunk_size (int): The number of leads per chunk.
+        id_columns (list[str] | None): Columns copied as is into the results.
+
+    Returns:
+        dict: The number of rows, of errors, the elapsed time and the rows/sec.
+    """
+    id_columns = id_columns or []
+    writer = ResultWriter(output_path)
+    pending = deque()
+    n_rows = n_errors = 0
+    start = time.perf_counter()
+
+    def write_oldest():
+        nonlocal n_rows, n_errors
+        results = pending.popleft().result()
+        writer.write(results)
+        n_rows += len(results)
+        n_errors += int(results["error"].notna().sum())
+
+    blas_threads = max((os.cpu_count() or 1) // workers, 1)
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(blas_threads,)
+    ) as pool:
+        try:
+            for chunk in read_chunks(input_path, chunk_size):
+                pending.append(pool.submit(score_chunk, chunk, id_columns))
+                while len(pending) >= 2 * workers or (pending and pending[0].done()):
+                    write_oldest()
+            while pending:
+                write_oldest()
+        finally:
+            writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": n_rows,
+        "errors": n_errors,
+        "seconds": elapsed,
+        "rows_per_second": n_rows / elapsed if elapsed else 0.0,
+    }
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.batch_score",
+        description="Score a CSV or Parquet file of leads across a process pool.",
+    )
+    parser.add_argument("input", help="CSV or Parquet file of leads")
+    parser.add_argument("-o", "--output", required=True, help="CSV or Parquet output")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(), help="Number of processes"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=10_000, help="Number of leads per chunk"
+    )
+    parser.add_argument(
+        "--id-column",
+        action="append",
+        default=[],
+        help="Column copied into the results (repeatable)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    report = score_file(
+        args.input, args.output, args.workers, args.chunk_size, args.id_column
+    )
+    print(
+        f"Scored {report['rows']} rows ({report['errors']} errors) in "
+        f"{report['seconds']:.2f}s: {report['rows_per_second']:.0f} rows/sec",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
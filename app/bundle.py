@@ -0,0 +1,81 @@
+"""Build and verify versioned model bundles.
+
+Usage:
+    python -m app.bundle build
+    python -m app.bundle verify artifacts/bundles/<version>
+
+`build` packs the separate artifact files of `artifacts/` (model, encoders
+and scaler) into one bundle of MODEL_BUNDLES_DIR, which the service then
+loads with a single file read.
+"""
+
+import argparse
+import sys
+
+from app.services.artifacts import build_bundle, verify_bundle
+from app.utils.constants import (
+    LAST_ACTIVITY_ENCODER_PATH,
+    LAST_NOTABLE_ACTIVITY_ENCODER_PATH,
+    LEAD_ORIGIN_ENCODER_PATH,
+    LEAD_SOURCE_ENCODER_PATH,
+    MODEL_BUNDLES_DIR,
+    MODEL_PATH,
+    SCALER_PATH,
+)
+from app.utils.functions import load_artifact
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.bundle",
+        description="Build and verify versioned model bundles.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Bundle the files of artifacts/")
+    build.add_argument(
+        "--bundles-dir",
+        default=MODEL_BUNDLES_DIR,
+        help="Directory the bundle is written to",
+    )
+    build.add_argument(
+        "--version", help="Bundle version (defaults to a timestamp and a hash)"
+    )
+
+    verify = commands.add_parser("verify", help="Check a bundle against its manifest")
+    verify.add_argument("path", help="Bundle directory")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    if args.command == "build":
+        directory = build_bundle(
+            args.bundles_dir,
+            model=load_artifact(MODEL_PATH),
+            encoders={
+                "Last Activity": load_artifact(LAST_ACTIVITY_ENCODER_PATH),
+                "Last Notable Activity": load_artifact(
+                    LAST_NOTABLE_ACTIVITY_ENCODER_PATH
+                ),
+                "Lead Source": load_artifact(LEAD_SOURCE_ENCODER_PATH),
+                "Lead Origin": load_artifact(LEAD_ORIGIN_ENCODER_PATH),
+            },
+            scaler=load_artifact(SCALER_PATH),
+            version=args.version,
+        )
+        print(directory)
+        return 0
+
+    try:
+        manifest = verify_bundle(args.path)
+    except (OSError, ValueError) as e:
+        print(f"Invalid bundle: {e}", file=sys.stderr)
+        return 1
+    print(f"Bundle {manifest['version']} is valid")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
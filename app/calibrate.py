@@ -0,0 +1,74 @@
+"""Fit the Platt calibration used to turn ranking scores into probabilities.
+
+Usage:
+    python -m app.calibrate labeled_leads.csv --label-column Converted
+
+The file holds one lead per row, with the feature columns of the served
+model and a 0/1 label column, and should not overlap the training data.
+The calibration is tied to the served model version: refit it whenever the
+model changes.
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from app.batch_score import read_chunks
+from app.services.calibration import fit_platt, save_calibration
+from app.services.ml_service import decision_scores, get_artifacts
+from app.utils.constants import CALIBRATION_PATH, FEATURE_NAMES
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.calibrate",
+        description="Fit a Platt mapping from decision scores to probabilities.",
+    )
+    parser.add_argument("input", help="CSV or Parquet file of labeled leads")
+    parser.add_argument(
+        "--label-column", default="Converted", help="Column holding the 0/1 label"
+    )
+    parser.add_argument(
+        "-o", "--output", default=CALIBRATION_PATH, help="JSON file to write"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=10_000, help="Number of rows read at once"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    artifacts = get_artifacts()
+    scores, labels, n_skipped = [], [], 0
+    for chunk in read_chunks(args.input, args.chunk_size):
+        leads = chunk[FEATURE_NAMES].to_dict("records")
+        features, kept = [], []
+        for lead, label in zip(leads, chunk[args.label_column].tolist()):
+            try:
+                features.append(artifacts.pipeline.encode(lead))
+                kept.append(int(label))
+            except ValueError:
+                n_skipped += 1
+        if features:
+            scores.append(decision_scores(np.stack(features), artifacts))
+            labels.extend(kept)
+
+    if not labels:
+        print("No valid labeled lead to fit on", file=sys.stderr)
+        return 1
+
+    a, b = fit_platt(np.concatenate(scores), np.array(labels))
+    save_calibration(args.output, a, b, artifacts.version, len(labels))
+    print(
+        f"Fitted on {len(labels)} leads ({n_skipped} skipped): "
+        f"P(converted) = 1 / (1 + exp(-({a:.4f} * score + {b:.4f})))",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
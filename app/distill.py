@@ -0,0 +1,111 @@
+"""Distill the served SVM into a faster Nystroem approximation.
+
+Usage:
+    python -m app.distill --landmarks 512
+    python -m app.distill --data leads.csv
+
+The approximation is fitted on the support vectors and on leads drawn from
+their feature values, plus the leads of --data, and is compared with the
+exact model on a held-out share of them. It is tied to the served model
+version, and only served (INFERENCE_MODE=approximate) if its agreement is at
+least APPROXIMATION_MIN_AGREEMENT.
+"""
+
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from app.batch_score import read_chunks
+from app.services.approximation import (
+    build_engine,
+    fidelity_report,
+    fit_nystroem,
+    sample_leads,
+    save_approximation,
+)
+from app.services.engine import _unwrap_svc
+from app.services.ml_service import get_artifacts
+from app.utils.constants import (
+    APPROXIMATION_MIN_AGREEMENT,
+    APPROXIMATION_PATH,
+    FEATURE_NAMES,
+)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.distill",
+        description="Fit a Nystroem approximation of the served SVM.",
+    )
+    parser.add_argument(
+        "--landmarks", type=int, default=512, help="Number of Nystroem landmarks"
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=20_000,
+        help="Number of leads drawn from the feature values of the support vectors",
+    )
+    parser.add_argument(
+        "--data", help="CSV or Parquet file of real leads to fit and check on"
+    )
+    parser.add_argument(
+        "--holdout",
+        type=float,
+        default=0.25,
+        help="Share of the leads kept out of the fit to measure agreement",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument(
+        "-o", "--output", default=APPROXIMATION_PATH, help="The .npz file to write"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    artifacts = get_artifacts()
+    svc = _unwrap_svc(artifacts.model)
+    leads = [sample_leads(svc, artifacts.scaler, args.samples, args.seed)]
+    if args.data is not None:
+        for chunk in read_chunks(args.data, 10_000):
+            for lead in chunk[FEATURE_NAMES].to_dict("records"):
+                try:
+                    leads.append(artifacts.pipeline.encode(lead)[np.newaxis])
+                except ValueError:
+                    pass
+    leads = np.vstack(leads)
+    np.random.default_rng(args.seed).shuffle(leads)
+
+    n_holdout = int(len(leads) * args.holdout)
+    holdout, train = leads[:n_holdout], leads[n_holdout:]
+    approximation = fit_nystroem(
+        artifacts.model, artifacts.scaler, train, args.landmarks, args.seed
+    )
+    engine = build_engine(approximation, artifacts.model, artifacts.scaler)
+    report = fidelity_report(engine, artifacts.model, artifacts.scaler, holdout)
+    save_approximation(args.output, approximation, report, artifacts.version)
+
+    print(json.dumps(report, indent=2))
+    print(
+        f"Agreement with the exact model: {report['agreement']:.2%} on "
+        f"{report['n_holdout']} held-out leads, "
+        f"{report['n_landmarks']} landmarks for {report['n_support_vectors']} "
+        f"support vectors",
+        file=sys.stderr,
+    )
+    if report["agreement"] < APPROXIMATION_MIN_AGREEMENT:
+        print(
+            f"Below the {APPROXIMATION_MIN_AGREEMENT:.2%} threshold: the exact model "
+            "will be served",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
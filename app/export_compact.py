@@ -0,0 +1,171 @@
+"""Export the served artifacts in the compact model format.
+
+Usage:
+    python -m app.export_compact
+    python -m app.export_compact --dtype float32 -o artifacts/model.compact.bin
+
+The compact file holds the support vectors and coefficients (in float64 or
+float32), the labels of the categorical features and the scaler mean and
+scale as plain arrays, in one file that is memory-mapped on load. Serve it
+with MODEL_BUNDLE_PATH=<file>: the fused or factorized engine is then built
+straight from the arrays, without unpickling sklearn objects.
+
+The report compares it with the original artifacts: size on disk, load time
+and resident memory of a fresh process loading each (read from /proc, so on
+Linux), and how often the predictions disagree.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from app.batch_score import read_chunks
+from app.services.approximation import sample_leads
+from app.services.artifacts import PAYLOAD_NAME, ModelArtifacts
+from app.services.compact import COMPACT_DTYPES, compact_report, export_compact
+from app.services.engine import _unwrap_svc
+from app.services.ml_service import get_artifacts
+from app.utils.constants import (
+    ARTIFACTS_DIR,
+    FEATURE_NAMES,
+    LAST_ACTIVITY_ENCODER_PATH,
+    LAST_NOTABLE_ACTIVITY_ENCODER_PATH,
+    LEAD_ORIGIN_ENCODER_PATH,
+    LEAD_SOURCE_ENCODER_PATH,
+    MODEL_PATH,
+    SCALER_PATH,
+)
+
+# Loads artifacts in a fresh interpreter and reports the cost of doing so
+CHILD = """
+import json, sys, time
+def rss_bytes():  # Linux: the resident set size of this process
+    with open("/proc/self/status") as f:
+        fields = dict(line.split(":", 1) for line in f)
+    return int(fields["VmRSS"].split()[0]) * 1024
+start = time.perf_counter()
+from app.services.artifacts import ModelArtifacts
+artifacts = {load}
+seconds = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": seconds,
+    "rss_bytes": rss_bytes(),
+    "imports_sklearn": "sklearn" in sys.modules,
+}}))
+"""
+
+
+def measure_load(load: str) -> dict:
+    """Run a loading expression in a fresh interpreter and report its cost."""
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD.format(load=load)],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.export_compact",
+        description="Export the served artifacts in the compact model format.",
+    )
+    parser.add_argument(
+        "--dtype",
+        choices=COMPACT_DTYPES,
+        default="float64",
+        help="Type of the support vectors and coefficients",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=os.path.join(ARTIFACTS_DIR, "model.compact.bin"),
+        help="File the compact model is written to",
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=20_000,
+        help="Number of leads drawn from the feature values of the support "
+        "vectors to compare predictions on",
+    )
+    parser.add_argument(
+        "--data", help="CSV or Parquet file of real leads to compare on"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    artifacts = get_artifacts()
+    compact_bytes = export_compact(args.output, artifacts, args.dtype)
+    compact = ModelArtifacts.from_compact(args.output, inference_mode="fused")
+
+    svc = _unwrap_svc(artifacts.model)
+    leads = [sample_leads(svc, artifacts.scaler, args.samples)]
+    if args.data is not None:
+        for chunk in read_chunks(args.data, 10_000):
+            for lead in chunk[FEATURE_NAMES].to_dict("records"):
+                try:
+                    leads.append(artifacts.pipeline.encode(lead)[np.newaxis])
+                except ValueError:
+                    pass
+    report = compact_report(artifacts, compact, np.vstack(leads))
+
+    if artifacts.directory is not None:
+        original_paths = [os.path.join(artifacts.directory, PAYLOAD_NAME)]
+        original_load = (
+            f"ModelArtifacts.from_bundle({artifacts.directory!r}, "
+            "inference_mode='fused', storage='joblib')"
+        )
+    else:
+        original_paths = [
+            MODEL_PATH,
+            LAST_ACTIVITY_ENCODER_PATH,
+            LAST_NOTABLE_ACTIVITY_ENCODER_PATH,
+            LEAD_SOURCE_ENCODER_PATH,
+            LEAD_ORIGIN_ENCODER_PATH,
+            SCALER_PATH,
+        ]
+        original_load = (
+            "ModelArtifacts.from_legacy_files("
+            "inference_mode='fused', storage='joblib')"
+        )
+    compact_load = (
+        f"ModelArtifacts.from_compact({os.path.abspath(args.output)!r}, "
+        "inference_mode='fused', storage='joblib')"
+    )
+    report = {
+        "dtype": args.dtype,
+        "version": artifacts.version,
+        "original": {
+            "disk_bytes": sum(os.path.getsize(path) for path in original_paths),
+            **measure_load(original_load),
+        },
+        "compact": {"disk_bytes": compact_bytes, **measure_load(compact_load)},
+        **report,
+    }
+    print(json.dumps(report, indent=2))
+
+    original, compact = report["original"], report["compact"]
+    print(
+        f"{original['disk_bytes']} -> {compact['disk_bytes']} bytes on disk, "
+        f"loaded in {1000 * compact['seconds']:.0f} ms instead of "
+        f"{1000 * original['seconds']:.0f} ms, RSS "
+        f"{compact['rss_bytes'] >> 20} MiB instead of "
+        f"{original['rss_bytes'] >> 20} MiB; predictions changed on "
+        f"{report['disagreement']:.3%} of {report['n_leads']} leads",
+        file=sys.stderr,
+    )
+    print(f"Compact model written to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""Shrink the served SVM by merging and pruning support vectors.
+
+Usage:
+    python -m app.reduce --merge-radius 0.05
+    python -m app.reduce --merge-radius 0.1 --prune-below 0.01 --bundle
+
+Identical support vectors are always merged, which does not change any
+prediction. Near-duplicates (--merge-radius) and support vectors with
+negligible coefficients (--prune-below) trade a little fidelity for speed.
+The reduced model is only written if its predictions disagree with the
+original on at most --max-disagreement of the leads it is checked on.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import joblib
+import numpy as np
+
+from app.batch_score import read_chunks
+from app.services.approximation import sample_leads
+from app.services.artifacts import build_bundle
+from app.services.engine import _unwrap_svc
+from app.services.ml_service import get_artifacts
+from app.services.reduction import reduce_model, reduction_report
+from app.utils.constants import ARTIFACTS_DIR, FEATURE_NAMES, MODEL_BUNDLES_DIR
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.reduce",
+        description="Merge and prune the support vectors of the served SVM.",
+    )
+    parser.add_argument(
+        "--merge-radius",
+        type=float,
+        default=0.0,
+        help="Grid step, in the scaled space, within which support vectors "
+        "of the same class are merged (0: identical vectors only)",
+    )
+    parser.add_argument(
+        "--prune-below",
+        type=float,
+        default=0.0,
+        help="Drop support vectors whose coefficient is below this share "
+        "of the largest one",
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=20_000,
+        help="Number of leads drawn from the feature values of the support "
+        "vectors to check the reduced model on",
+    )
+    parser.add_argument("--data", help="CSV or Parquet file of real leads to check on")
+    parser.add_argument(
+        "--max-disagreement",
+        type=float,
+        default=0.001,
+        help="Largest share of leads on which the predictions may change",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=os.path.join(ARTIFACTS_DIR, "best_svm_reduced.joblib"),
+        help="File the reduced model is written to",
+    )
+    parser.add_argument(
+        "--bundle",
+        action="store_true",
+        help="Also write a model bundle, with the served encoders and scaler",
+    )
+    parser.add_argument(
+        "--bundles-dir", default=MODEL_BUNDLES_DIR, help="Directory of the bundles"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    artifacts = get_artifacts()
+    leads = [sample_leads(_unwrap_svc(artifacts.model), artifacts.scaler, args.samples)]
+    if args.data is not None:
+        for chunk in read_chunks(args.data, 10_000):
+            for lead in chunk[FEATURE_NAMES].to_dict("records"):
+                try:
+                    leads.append(artifacts.pipeline.encode(lead)[np.newaxis])
+                except ValueError:
+                    pass
+    leads = np.vstack(leads)
+
+    reduced = reduce_model(artifacts.model, args.merge_radius, args.prune_below)
+    report = reduction_report(artifacts.model, reduced, artifacts.scaler, leads)
+    print(json.dumps(report, indent=2))
+
+    original_count = report["original"]["n_support_vectors"]
+    reduced_count = report["reduced"]["n_support_vectors"]
+    print(
+        f"{original_count} -> {reduced_count} support vectors, predictions "
+        f"changed on {report['disagreement']:.3%} of {report['n_leads']} leads",
+        file=sys.stderr,
+    )
+    if report["disagreement"] > args.max_disagreement:
+        print(
+            f"Above the {args.max_disagreement:.3%} limit: nothing written",
+            file=sys.stderr,
+        )
+        return 1
+
+    joblib.dump(reduced, args.output)
+    print(f"Reduced model written to {args.output}", file=sys.stderr)
+    if args.bundle:
+        directory = build_bundle(
+            args.bundles_dir, reduced, artifacts.encoders, artifacts.scaler
+        )
+        print(f"Bundle written to {directory}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
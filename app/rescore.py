@@ -0,0 +1,85 @@
+"""Rescore a JSONL file of leads, scoring only the leads that changed.
+
+Usage:
+    python -m app.rescore leads.jsonl --id-field lead_id -o scores.jsonl
+
+The last score of each lead is kept in a SQLite store, with the hash of its
+encoded features and the model version. A lead is scored again only when
+one of them changed; the score of any other lead is read from the store.
+"""
+
+import argparse
+import json
+import sys
+
+from app.services.ml_service import rescore_lines
+from app.services.score_store import ScoreStore
+from app.utils.constants import SCORE_STORE_PATH, STREAM_CHUNK_SIZE
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.rescore",
+        description="Rescore the newline-delimited JSON leads that changed.",
+    )
+    parser.add_argument(
+        "input", nargs="?", default="-", help="JSONL file to score ('-' for stdin)"
+    )
+    parser.add_argument(
+        "-o", "--output", help="File to write every lead's score to ('-' for stdout)"
+    )
+    parser.add_argument(
+        "--id-field", required=True, help="Field holding the lead ID"
+    )
+    parser.add_argument(
+        "--store", default=SCORE_STORE_PATH, help="SQLite file of the last scores"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=STREAM_CHUNK_SIZE,
+        help="Number of leads scored at once",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    input_file = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    output_file = None
+    if args.output is not None:
+        output_file = (
+            sys.stdout
+            if args.output == "-"
+            else open(args.output, "w", encoding="utf-8")
+        )
+
+    store = ScoreStore(args.store)
+    n_scored = n_skipped = n_errors = 0
+    try:
+        for result in rescore_lines(input_file, store, args.id_field, args.chunk_size):
+            if output_file is not None:
+                output_file.write(json.dumps(result) + "\n")
+            if "error" in result:
+                n_errors += 1
+            elif result["rescored"]:
+                n_scored += 1
+            else:
+                n_skipped += 1
+    finally:
+        store.close()
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file not in (None, sys.stdout):
+            output_file.close()
+
+    print(
+        f"Scored {n_scored} leads, skipped {n_skipped} unchanged, {n_errors} errors",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,260 @@
-from flask import Blueprint, request, jsonify
-from app.services.ml_service import predict
+import functools
+import hmac
+import io
+import json
+import os
+import time
+
+import numpy as np
+
+from flask import Blueprint, Response, g, request, jsonify, stream_with_context
+from app.services.admission import BULK, INTERACTIVE, PRIORITIES
+from app.services.batcher import DeadlineExceededError, QueueFullError
+from app.services.ml_service import (
+    admission,
+    batcher,
+    cache,
+    execution,
+    get_artifacts,
+    get_score_store,
+    predict_batch,
+    predict_encoded,
+    predict_lines,
+    rank_lines,
+    registry,
+    rescore_lines,
+    sweep_lead,
+)
+from app.services.calibration import load_calibration
 from app.utils.helpers import format_response
-from app.utils.functions import extract_features
-from app.utils.constants import WELCOME_MESSAGE
+from app.utils.functions import (
+    extract_batch_features,
+    parse_sweep_grid,
+    read_encoded_features,
+)
+from app.utils.metrics import metrics, render_histograms, render_samples
+from app.utils.validation import batch_validator
+from app.utils.constants import (
+    ADMIN_TOKEN,
+    ADMISSION_RETRY_AFTER_S,
+    CALIBRATION_PATH,
+    MAX_BATCH_SIZE,
+    MAX_RANK_K,
+    MAX_SWEEP_POINTS,
+    MODEL_BUNDLES_DIR,
+    WELCOME_MESSAGE,
+)
 
 bp = Blueprint("routes", __name__)
 
+# Content types of a `.npy` body of pre-encoded features
+NPY_MIMETYPES = ("application/x-npy", "application/octet-stream")
+
+
+@bp.after_request
+def add_model_version(response):
+    """Report the model version that scored the request"""
+    if "model_version" in g:
+        response.headers["X-Model-Version"] = g.model_version
+    return response
+
+
+def instrumented(view):
+    """Count the requests of a route by status code, and time them"""
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not metrics.enabled:
+            return view(*args, **kwargs)
+
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = view(*args, **kwargs)
+            if isinstance(response, dict):
+                status = response.get("status", 200)
+            else:
+                status = getattr(response, "status_code", 200)
+            return response
+        finally:
+            metrics.count_request(
+                request.url_rule.rule, status, time.perf_counter() - start
+            )
+
+    return wrapper
+
+
+def request_deadline() -> float | None:
+    """Read the client deadline, a Unix time in seconds, as a time.monotonic() time"""
+    header = request.headers.get("X-Request-Deadline")
+    if header is None:
+        return None
+    deadline = float(header)  # Raises ValueError
+    if not np.isfinite(deadline):
+        raise ValueError("Invalid X-Request-Deadline")
+    return time.monotonic() + deadline - time.time()
+
+
+def remaining_time() -> float | None:
+    """Return the seconds left before the client deadline, if it sent one"""
+    if g.get("deadline") is None:
+        return None
+    return max(g.deadline - time.monotonic(), 0.0)
+
+
+def shed(message: str, status: int) -> Response:
+    """Answer a request refused for overload, with a real HTTP status.
+
+    Admission control and the micro-batcher answer the same way, so that
+    clients back off on Retry-After whichever refused them.
+    """
+    response = jsonify(format_response({"error": message}, status=status))
+    response.status_code = status
+    if status == 503:
+        response.headers["Retry-After"] = str(ADMISSION_RETRY_AFTER_S)
+    return response
+
+
+def admitted(default_priority: str):
+    """Score a route's requests within the limits of admission control.
+
+    The X-Request-Priority header ("interactive" or "bulk") overrides the
+    priority of the route. A request whose X-Request-Deadline passes before it
+    gets a slot is not scored. A streamed response keeps its slot until it is
+    fully sent.
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if admission is None:
+                return view(*args, **kwargs)
+
+            priority = request.headers.get("X-Request-Priority", default_priority)
+            if priority not in PRIORITIES:
+                return format_response(
+                    {
+                        "error": f"Invalid X-Request-Priority. Expected one of: "
+                        f"{', '.join(PRIORITIES)}"
+                    },
+                    status=400,
+                )
+            try:
+                g.deadline = request_deadline()
+            except ValueError:
+                return format_response(
+                    {"error": "Invalid X-Request-Deadline: expected a Unix time"},
+                    status=400,
+                )
+
+            try:
+                with metrics.time("admission"):
+                    admission.acquire(priority, g.deadline)
+            except QueueFullError as e:
+                return shed(str(e), 503)
+            except DeadlineExceededError as e:
+                return shed(str(e), 504)
+
+            release = True
+            try:
+                response = view(*args, **kwargs)
+                if isinstance(response, Response) and response.is_streamed:
+                    response.call_on_close(
+                        functools.partial(admission.release, priority)
+                    )
+                    release = False
+                return response
+            finally:
+                if release:
+                    admission.release(priority)
+
+        return wrapper
+
+    return decorator
+
+
+def request_lines() -> io.BufferedReader:
+    """Iterate the request body line by line.
+
+    Werkzeug's input stream reads lines in small pieces, which costs about
+    a quarter of a millisecond per line; buffering it makes that negligible.
+    """
+    return io.BufferedReader(request.stream, buffer_size=1 << 16)
+
+
+def batch_results(
+    n_leads: int, index: list[int], predictions: list[str], errors: dict[int, str]
+) -> list[dict]:
+    """Lay out the predictions and errors of a batch in input order"""
+    results = [None] * n_leads
+    for position, error in errors.items():
+        results[position] = {"error": error}
+    for position, prediction in zip(index, predictions):
+        results[position] = {"prediction": prediction}
+    return results
+
+
+def predict_columns(columns: dict) -> dict:
+    """Score leads sent as one list of values per feature"""
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        return format_response(
+            {"error": "Expected the same number of values for every feature"},
+            status=400,
+        )
+    n_leads = lengths.pop()
+    if n_leads > MAX_BATCH_SIZE:
+        return format_response(
+            {"error": f"Too many leads: at most {MAX_BATCH_SIZE} per batch"},
+            status=400,
+        )
+
+    try:
+        with metrics.time("validate"):
+            validation = batch_validator.validate_columns(columns)
+    except ValueError as e:
+        return format_response({"error": str(e)}, status=400)
+
+    artifacts = get_artifacts()
+    g.model_version = artifacts.version
+    with metrics.time("encode"):
+        features = artifacts.pipeline.encode_columns(validation.columns)
+    predictions = predict_encoded(features, artifacts) if len(features) else []
+
+    errors = {
+        position: field_errors[0].message
+        for position, field_errors in validation.errors.items()
+    }
+    return format_response(
+        {"predictions": batch_results(n_leads, validation.index, predictions, errors)}
+    )
+
+
+def predict_npy() -> dict:
+    """Score pre-encoded features sent as a `.npy` body"""
+    artifacts = get_artifacts()
+    g.model_version = artifacts.version
+    pipeline = artifacts.pipeline
+    try:
+        with metrics.time("parse"):
+            features = read_encoded_features(
+                request.get_data(cache=False), pipeline.n_features, MAX_BATCH_SIZE
+            )
+    except ValueError as e:
+        return format_response({"error": str(e)}, status=400)
+
+    with metrics.time("validate"):
+        errors = pipeline.check_encoded(features)
+    index = list(range(len(features)))
+    if errors:
+        index = [position for position in index if position not in errors]
+        features = features[index]
+    predictions = predict_encoded(features, artifacts) if len(features) else []
+
+    return format_response(
+        {"predictions": batch_results(len(errors) + len(index), index, predictions, errors)}
+    )
+
 
 @bp.route("/")
 def home():
@@ -15,21 +264,351 @@ def home():
 @bp.route('/registrazione', methods=['GET', 'POST'])
 
 @bp.route("/predict", methods=["POST"])
+@instrumented
+@admitted(INTERACTIVE)
 def predict_route():
     """Route to handle model predictions"""
     try:
-        data = request.get_json()
+        if request.mimetype in NPY_MIMETYPES:
+            return predict_npy()
+
+        with metrics.time("parse"):
+            data = request.get_json()
         if not data:
             return format_response({"error": "No data provided"}, status=400)
 
+        if isinstance(data, dict) and all(
+            isinstance(value, list) for value in data.values()
+        ):
+            return predict_columns(data)
+
+        artifacts = get_artifacts()
         try:
-            input_features = extract_features(data)
+            with metrics.time("encode"):  # Validation and encoding, compiled
+                input_features = artifacts.pipeline.encode(data)
         except ValueError as e:
             return format_response({"error": str(e)}, status=400)
 
-        prediction = predict(input_features)
+        if batcher is not None:
+            try:
+                with metrics.time("micro_batch"):
+                    # Scored by the artifacts that encoded it, even after a reload
+                    prediction, g.model_version = batcher.submit(
+                        input_features, timeout=remaining_time(), context=artifacts
+                    )
+            except QueueFullError as e:
+                return shed(str(e), 503)
+            except DeadlineExceededError as e:
+                return shed(str(e), 504)
+        else:
+            g.model_version = artifacts.version
+            prediction = predict_encoded(input_features[np.newaxis], artifacts)[0]
 
         return format_response({"prediction": prediction})
 
     except Exception as e:
         return format_response({"error": str(e)}, status=500)
+
+
+@bp.route("/predict/batch", methods=["POST"])
+@instrumented
+@admitted(BULK)
+def predict_batch_route():
+    """Route to handle model predictions for a list of leads"""
+    try:
+        with metrics.time("parse"):
+            data = request.get_json()
+        if not data:
+            return format_response({"error": "No data provided"}, status=400)
+
+        if not isinstance(data, list):
+            return format_response({"error": "Expected a list of leads"}, status=400)
+
+        if len(data) > MAX_BATCH_SIZE:
+            return format_response(
+                {"error": f"Too many leads: at most {MAX_BATCH_SIZE} per batch"},
+                status=400,
+            )
+
+        artifacts = get_artifacts()
+        g.model_version = artifacts.version
+        input_features, errors = extract_batch_features(data)
+        predictions = predict_batch(input_features, artifacts)
+
+        return format_response(
+            {
+                "predictions": batch_results(
+                    len(data), input_features.index, predictions, errors
+                )
+            }
+        )
+
+    except Exception as e:
+        return format_response({"error": str(e)}, status=500)
+
+
+@bp.route("/predict/stream", methods=["POST"])
+@instrumented
+@admitted(BULK)
+def predict_stream_route():
+    """Route to score newline-delimited JSON leads, streaming the results back"""
+    artifacts = get_artifacts()
+    g.model_version = artifacts.version
+    results = predict_lines(
+        request_lines(), id_field=request.args.get("id_field"), artifacts=artifacts
+    )
+
+    return Response(
+        stream_with_context(json.dumps(result) + "\n" for result in results),
+        mimetype="application/x-ndjson",
+    )
+
+
+@bp.route("/predict/rank", methods=["POST"])
+@instrumented
+@admitted(BULK)
+def predict_rank_route():
+    """Route to find the newline-delimited JSON leads most likely to convert"""
+    try:
+        k = request.args.get("k", default=100, type=int)
+        if not 0 < k <= MAX_RANK_K:
+            return format_response(
+                {"error": f"k must be between 1 and {MAX_RANK_K}"}, status=400
+            )
+
+        artifacts = get_artifacts()
+        g.model_version = artifacts.version
+        calibration = None
+        if request.args.get("probabilities") in ("1", "true"):
+            try:
+                calibration = load_calibration(CALIBRATION_PATH, artifacts.version)
+            except ValueError as e:
+                return format_response({"error": str(e)}, status=400)
+
+        ranking = rank_lines(
+            request_lines(),
+            k,
+            id_field=request.args.get("id_field"),
+            calibration=calibration,
+            artifacts=artifacts,
+        )
+        return format_response(ranking)
+
+    except Exception as e:
+        return format_response({"error": str(e)}, status=500)
+
+
+@bp.route("/predict/sweep", methods=["POST"])
+@instrumented
+@admitted(INTERACTIVE)
+def predict_sweep_route():
+    """Route to score one lead over a grid of values of its numeric features"""
+    try:
+        with metrics.time("parse"):
+            data = request.get_json()
+        if not isinstance(data, dict) or not isinstance(data.get("lead"), dict):
+            return format_response(
+                {"error": "Expected a lead and a grid of feature values"}, status=400
+            )
+
+        artifacts = get_artifacts()
+        g.model_version = artifacts.version
+        try:
+            grid = parse_sweep_grid(data.get("grid"), MAX_SWEEP_POINTS)
+            sweep = sweep_lead(data["lead"], grid, artifacts)
+        except ValueError as e:
+            return format_response({"error": str(e)}, status=400)
+
+        return format_response(sweep)
+
+    except Exception as e:
+        return format_response({"error": str(e)}, status=500)
+
+
+@bp.route("/predict/rescore", methods=["POST"])
+@instrumented
+@admitted(BULK)
+def predict_rescore_route():
+    """Route to rescore the newline-delimited JSON leads that changed since their last score"""
+    try:
+        id_field = request.args.get("id_field")
+        if not id_field:
+            return format_response(
+                {"error": "The id_field query parameter is required"}, status=400
+            )
+
+        artifacts = get_artifacts()
+        g.model_version = artifacts.version
+        counts = {"scored": 0, "skipped": 0, "errors": 0}
+        for result in rescore_lines(
+            request_lines(), get_score_store(), id_field, artifacts=artifacts
+        ):
+            if "error" in result:
+                counts["errors"] += 1
+            elif result["rescored"]:
+                counts["scored"] += 1
+            else:
+                counts["skipped"] += 1
+
+        return format_response(counts)
+
+    except Exception as e:
+        return format_response({"error": str(e)}, status=500)
+
+
+def _is_admin() -> bool:
+    """Check the bearer token of an admin request"""
+    if not ADMIN_TOKEN:
+        return False
+    token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+@bp.route("/admin/model", methods=["GET"])
+def admin_model_route():
+    """Route to report the served model version, the reload counters and the execution policy"""
+    if not _is_admin():
+        return format_response({"error": "Forbidden"}, status=403)
+
+    return format_response({**registry.stats(), "execution": execution.stats()})
+
+
+@bp.route("/admin/reload", methods=["POST"])
+@instrumented
+def admin_reload_route():
+    """Route to load a model bundle and serve it once it is warmed up"""
+    if not _is_admin():
+        return format_response({"error": "Forbidden"}, status=403)
+
+    try:
+        version = (request.get_json(silent=True) or {}).get("version")
+        bundle_path = None
+        if version is not None:
+            if not isinstance(version, str) or os.path.basename(version) != version:
+                return format_response({"error": "Invalid version"}, status=400)
+            bundle_path = os.path.join(MODEL_BUNDLES_DIR, version)
+            if not os.path.isdir(bundle_path):
+                return format_response(
+                    {"error": f"Unknown model version '{version}'"}, status=404
+                )
+
+        previous_version = registry.current.version
+        artifacts = registry.reload(bundle_path)
+        return format_response(
+            {"model_version": artifacts.version, "previous_version": previous_version}
+        )
+
+    except FileNotFoundError as e:
+        return format_response({"error": str(e)}, status=404)
+    except ValueError as e:
+        return format_response({"error": str(e)}, status=400)
+    except Exception as e:
+        return format_response({"error": str(e)}, status=500)
+
+
+@bp.route("/metrics", methods=["GET"])
+def metrics_route():
+    """Route to expose the metrics in the Prometheus text format"""
+    if not metrics.enabled:
+        return format_response({"error": "Metrics are disabled"}, status=404)
+
+    lines = []
+    model = registry.stats()
+    if model["version"] is not None:
+        lines += render_samples(
+            "lead_model_info",
+            "gauge",
+            "The served model version.",
+            {(("version", model["version"]),): 1},
+        )
+    lines += render_samples(
+        "lead_model_reloads_total",
+        "counter",
+        "Model reloads, by outcome.",
+        {
+            (("outcome", "success"),): model["reloads"],
+            (("outcome", "failure"),): model["failed_reloads"],
+        },
+    )
+
+    if batcher is not None:
+        stats = batcher.stats()
+        lines += render_histograms(
+            "lead_micro_batch_size",
+            "Leads scored per micro-batch.",
+            {(): stats["batch_size"]},
+        )
+        lines += render_histograms(
+            "lead_micro_batch_queue_wait_seconds",
+            "Time requests wait in the micro-batch queue.",
+            {(): stats["queue_wait_seconds"]},
+        )
+        lines += render_samples(
+            "lead_micro_batch_queue_depth",
+            "gauge",
+            "Queued requests.",
+            {(): stats["queue_depth"]},
+        )
+        lines += render_samples(
+            "lead_micro_batch_dropped_total",
+            "counter",
+            "Requests dropped by the micro-batcher, by reason.",
+            {
+                (("reason", "rejected"),): stats["rejected"],
+                (("reason", "expired"),): stats["expired"],
+            },
+        )
+
+    if admission is not None:
+        stats = admission.stats()
+        lines += render_samples(
+            "lead_admission_active",
+            "gauge",
+            "Requests holding an admission slot, by priority.",
+            {
+                (("priority", priority),): active
+                for priority, active in stats["active"].items()
+            },
+        )
+        lines += render_samples(
+            "lead_admission_queue_depth",
+            "gauge",
+            "Requests waiting for an admission slot, by priority.",
+            {
+                (("priority", priority),): depth
+                for priority, depth in stats["queue_depth"].items()
+            },
+        )
+        lines += render_samples(
+            "lead_admission_requests_total",
+            "counter",
+            "Requests seen by admission control, by priority and outcome.",
+            {
+                (("priority", priority), ("outcome", outcome)): count
+                for outcome in ("admitted", "rejected", "expired")
+                for priority, count in stats[outcome].items()
+            },
+        )
+
+    if cache is not None:
+        stats = cache.stats()
+        lines += render_samples(
+            "lead_prediction_cache_size",
+            "gauge",
+            "Cached predictions.",
+            {(): stats["size"]},
+        )
+        lines += render_samples(
+            "lead_prediction_cache_events_total",
+            "counter",
+            "Prediction cache events, by type.",
+            {
+                (("event", event),): stats[event]
+                for event in ("hits", "misses", "evictions", "expirations")
+            },
+        )
+
+    return Response(
+        metrics.render() + "\n".join(lines) + "\n",
+        mimetype="text/plain; version=0.0.4",
+    )
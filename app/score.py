@@ -0,0 +1,64 @@
+"""Score a JSONL file of leads from the command line.
+
+Usage:
+    python -m app.score leads.jsonl -o predictions.jsonl
+    cat leads.jsonl | python -m app.score > predictions.jsonl
+"""
+
+import argparse
+import json
+import sys
+
+from app.services.ml_service import predict_lines
+from app.utils.constants import STREAM_CHUNK_SIZE
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.score",
+        description="Score newline-delimited JSON leads, in input order.",
+    )
+    parser.add_argument(
+        "input", nargs="?", default="-", help="JSONL file to score ('-' for stdin)"
+    )
+    parser.add_argument(
+        "-o", "--output", default="-", help="File to write to ('-' for stdout)"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=STREAM_CHUNK_SIZE,
+        help="Number of leads scored at once",
+    )
+    parser.add_argument(
+        "--id-field", help="Field identifying a lead, copied into its result"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    input_file = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    output_file = (
+        sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    )
+
+    n_scored = n_errors = 0
+    try:
+        for result in predict_lines(input_file, args.chunk_size, args.id_field):
+            output_file.write(json.dumps(result) + "\n")
+            n_scored += "prediction" in result
+            n_errors += "error" in result
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+
+    print(f"Scored {n_scored} leads, {n_errors} errors", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
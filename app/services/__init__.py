@@ -1 +1,23 @@
-from .ml_service import predict
+from .scorer import LeadScore, LeadScorer
+
+# Importing ml_service creates the service state (model registry, cache,
+# micro-batcher...), which the library API does not need: its functions are
+# imported on first use.
+_ML_SERVICE_FUNCTIONS = (
+    "decision_scores",
+    "predict",
+    "predict_batch",
+    "predict_encoded",
+    "predict_lines",
+    "rank_lines",
+    "rescore_lines",
+    "sweep_lead",
+)
+
+
+def __getattr__(name: str):
+    if name in _ML_SERVICE_FUNCTIONS:
+        from . import ml_service
+
+        return getattr(ml_service, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
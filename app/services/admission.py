@@ -0,0 +1,180 @@
+import threading
+import time
+
+from collections import deque
+
+from app.services.batcher import DeadlineExceededError, QueueFullError
+
+# Priority classes, in the order their queued requests are admitted
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, BULK)
+
+
+class _Waiter:
+    __slots__ = ("priority", "deadline", "event", "outcome")
+
+    def __init__(self, priority: str, deadline: float):
+        self.priority = priority
+        self.deadline = deadline
+        self.event = threading.Event()
+        self.outcome = None  # "admitted", "shed" or "expired", once decided
+
+
+class AdmissionController:
+    """Bounds the number of requests scored at once.
+
+    Up to `max_concurrency` requests hold a slot. Others wait in a bounded
+    queue, per priority class, and a freed slot goes to the oldest waiting
+    interactive request, then to the oldest bulk one. Bulk requests hold at
+    most `max_concurrency - interactive_reserve` slots, so that interactive
+    ones do not wait for a bulk request to finish. When the queue is full,
+    an interactive request takes the place of the newest bulk one; any other
+    request is rejected at once. A request whose deadline passes, before it
+    arrives or while it waits, is dropped without being scored.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        max_queue_size: int = 64,
+        timeout: float = 1.0,
+        interactive_reserve: int = 0,
+    ):
+        """Configure the admission controller.
+
+        Args:
+            max_concurrency (int): The maximum number of admitted requests.
+            max_queue_size (int): The maximum number of waiting requests,
+                of all priorities.
+            timeout (float): The longest time, in seconds, a request waits
+                for a slot when its deadline is later or unset.
+            interactive_reserve (int): The number of slots bulk requests
+                cannot take. Bulk requests keep at least one.
+        """
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.timeout = timeout
+        self.max_bulk_concurrency = max(max_concurrency - interactive_reserve, 1)
+
+        self._active = {priority: 0 for priority in PRIORITIES}
+        self._queues = {priority: deque() for priority in PRIORITIES}
+        self._lock = threading.Lock()
+
+        self.admitted = {priority: 0 for priority in PRIORITIES}
+        self.rejected = {priority: 0 for priority in PRIORITIES}
+        self.expired = {priority: 0 for priority in PRIORITIES}
+
+    def acquire(
+        self, priority: str = INTERACTIVE, deadline: float | None = None
+    ) -> None:
+        """Wait for a slot. Call `release` with the same priority once the
+        request is handled.
+
+        Args:
+            priority (str): One of PRIORITIES.
+            deadline (float | None): The time.monotonic() time after which the
+                request is no longer worth scoring.
+
+        Raises:
+            ValueError: If the priority is unknown.
+            QueueFullError: If the queue is full, or the request lost its
+                place in it to an interactive one.
+            DeadlineExceededError: If the deadline passes before a slot frees.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(
+                f"Unknown priority '{priority}'. "
+                f"Expected one of: {', '.join(PRIORITIES)}"
+            )
+        now = time.monotonic()
+        wait_until = now + self.timeout
+        if deadline is not None:
+            if deadline <= now:
+                with self._lock:
+                    self.expired[priority] += 1
+                raise DeadlineExceededError("Request deadline passed before scoring")
+            wait_until = min(wait_until, deadline)
+
+        with self._lock:
+            ahead = PRIORITIES[: PRIORITIES.index(priority) + 1]
+            if self._has_slot(priority) and not any(self._queues[p] for p in ahead):
+                self._active[priority] += 1
+                self.admitted[priority] += 1
+                return
+
+            if self.queue_depth() >= self.max_queue_size:
+                if priority == BULK or not self._queues[BULK]:
+                    self.rejected[priority] += 1
+                    raise QueueFullError(
+                        f"Too many pending requests: at most {self.max_queue_size}"
+                    )
+                shed = self._queues[BULK].pop()
+                shed.outcome = "shed"
+                self.rejected[BULK] += 1
+                shed.event.set()
+
+            waiter = _Waiter(priority, wait_until)
+            self._queues[priority].append(waiter)
+
+        waiter.event.wait(max(wait_until - time.monotonic(), 0))
+
+        with self._lock:
+            if waiter.outcome is None:  # Timed out in the queue
+                self._queues[priority].remove(waiter)
+                waiter.outcome = "expired"
+                self.expired[priority] += 1
+        if waiter.outcome == "shed":
+            raise QueueFullError("Request shed in favor of interactive requests")
+        if waiter.outcome == "expired":
+            raise DeadlineExceededError("Request deadline passed in queue")
+
+    def release(self, priority: str = INTERACTIVE) -> None:
+        """Free the slot of a handled request, handing it to the next waiters.
+
+        Args:
+            priority (str): The priority the request was admitted with.
+        """
+        with self._lock:
+            self._active[priority] -= 1
+            now = time.monotonic()
+            for waiting in PRIORITIES:
+                queue = self._queues[waiting]
+                while queue and self._has_slot(waiting):
+                    waiter = queue.popleft()
+                    if waiter.deadline <= now:
+                        waiter.outcome = "expired"
+                        self.expired[waiting] += 1
+                    else:
+                        waiter.outcome = "admitted"
+                        self._active[waiting] += 1
+                        self.admitted[waiting] += 1
+                    waiter.event.set()
+
+    def _has_slot(self, priority: str) -> bool:
+        """Check whether a request of that priority may take a slot now."""
+        if sum(self._active.values()) >= self.max_concurrency:
+            return False
+        return priority == INTERACTIVE or self._active[BULK] < self.max_bulk_concurrency
+
+    def queue_depth(self) -> int:
+        """Return the number of waiting requests."""
+        return sum(len(queue) for queue in self._queues.values())
+
+    def stats(self) -> dict:
+        """Return the admission counters.
+
+        Returns:
+            dict: Per priority, the number of requests holding a slot and
+                waiting for one, and of admitted, rejected and expired ones.
+        """
+        with self._lock:
+            return {
+                "active": dict(self._active),
+                "queue_depth": {
+                    priority: len(queue) for priority, queue in self._queues.items()
+                },
+                "admitted": dict(self.admitted),
+                "rejected": dict(self.rejected),
+                "expired": dict(self.expired),
+            }
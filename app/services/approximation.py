@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from app.services.engine import FusedSVMEngine, _unwrap_svc
+
+if TYPE_CHECKING:
+    from sklearn.model_selection import GridSearchCV
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.svm import SVC
+
+
+def sample_leads(
+    svc: SVC, scaler: StandardScaler, n_samples: int, seed: int = 0
+) -> np.ndarray:
+    """Draw encoded leads around the training data of the model.
+
+    The support vectors are training leads, close to the decision boundary.
+    They are completed by leads drawing each feature independently from the
+    values of the support vectors, which covers the rest of the input space.
+
+    Args:
+        svc (SVC): The fitted RBF SVC.
+        scaler (StandardScaler): The fitted scaler.
+        n_samples (int): The number of drawn leads, on top of the support
+            vectors.
+        seed (int): The random seed.
+
+    Returns:
+        ndarray: The encoded leads, unscaled, in random order.
+    """
+    rng = np.random.default_rng(seed)
+    support = svc.support_vectors_ * scaler.scale_ + scaler.mean_
+    drawn = np.column_stack([rng.choice(column, n_samples) for column in support.T])
+    leads = np.vstack([support, drawn])
+    rng.shuffle(leads)
+    return leads
+
+
+def fit_nystroem(
+    model: GridSearchCV | SVC,
+    scaler: StandardScaler,
+    features: np.ndarray,
+    n_landmarks: int = 512,
+    seed: int = 0,
+) -> dict[str, np.ndarray]:
+    """Distill the RBF SVM into a linear model over Nystroem features.
+
+    The leads are mapped to their kernel values against a few landmarks,
+    the k-means centers of the leads, and a ridge regression fits the exact
+    decision values from these features. Scoring is then a dot product with
+    n_landmarks kernel values instead of one per support vector.
+
+    Args:
+        model (GridSearchCV | SVC): The fitted RBF SVC, or a search wrapping it.
+        scaler (StandardScaler): The fitted scaler.
+        features (ndarray): The encoded leads to fit on, unscaled.
+        n_landmarks (int): The number of landmarks.
+        seed (int): The random seed of k-means.
+
+    Returns:
+        dict[str, ndarray]: The landmarks, in the scaled space, the weights
+            of their kernel values and the intercept.
+    """
+    from sklearn.cluster import KMeans
+    from sklearn.metrics.pairwise import rbf_kernel
+
+    svc = _unwrap_svc(model)
+    scaled = (features - scaler.mean_) / scaler.scale_
+    targets = svc.decision_function(scaled)
+
+    landmarks = (
+        KMeans(n_landmarks, n_init=1, random_state=seed).fit(scaled).cluster_centers_
+    )
+    kernel = rbf_kernel(scaled, landmarks, gamma=svc._gamma)
+    kernel_mean, target_mean = kernel.mean(axis=0), targets.mean()
+    kernel -= kernel_mean
+    gram = kernel.T @ kernel
+    ridge = 1e-6 * np.trace(gram) / n_landmarks
+    weights = np.linalg.solve(
+        gram + ridge * np.eye(n_landmarks), kernel.T @ (targets - target_mean)
+    )
+
+    return {
+        "landmarks": landmarks,
+        "weights": weights,
+        "intercept": np.float64(target_mean - kernel_mean @ weights),
+    }
+
+
+def build_engine(
+    approximation: dict[str, np.ndarray],
+    model: GridSearchCV | SVC,
+    scaler: StandardScaler,
+) -> FusedSVMEngine:
+    """Build the engine scoring with an approximation.
+
+    The kernel values against the landmarks are computed like those against
+    support vectors, so the engine of the exact model serves it, with the
+    landmarks in place of the support vectors.
+
+    Args:
+        approximation (dict[str, ndarray]): The output of `fit_nystroem`.
+        model (GridSearchCV | SVC): The exact model.
+        scaler (StandardScaler): The fitted scaler.
+
+    Returns:
+        FusedSVMEngine: The approximate engine.
+    """
+    svc = _unwrap_svc(model)
+    return FusedSVMEngine(
+        support_vectors=approximation["landmarks"],
+        dual_coef=approximation["weights"],
+        intercept=float(approximation["intercept"]),
+        gamma=svc._gamma,
+        mean=scaler.mean_,
+        scale=scaler.scale_,
+        classes=svc.classes_,
+    )
+
+
+def fidelity_report(
+    engine: FusedSVMEngine,
+    model: GridSearchCV | SVC,
+    scaler: StandardScaler,
+    features: np.ndarray,
+) -> dict:
+    """Compare an approximate engine with the exact model on held-out leads.
+
+    Args:
+        engine (FusedSVMEngine): The approximate engine.
+        model (GridSearchCV | SVC): The exact model.
+        scaler (StandardScaler): The fitted scaler.
+        features (ndarray): The held-out encoded leads, unscaled.
+
+    Returns:
+        dict: The agreement with `model.predict`, the mean absolute error of
+            the decision values, the numbers of held-out leads, landmarks and
+            support vectors, and the scoring time per 1,000 leads of the exact
+            and approximate engines.
+    """
+    scaled = (features - scaler.mean_) / scaler.scale_
+    exact_predictions = model.predict(scaled)
+    exact_scores = _unwrap_svc(model).decision_function(scaled)
+    scores = engine.decision_function(features)
+
+    exact_engine = FusedSVMEngine.from_artifacts(model, scaler)
+    timings = {}
+    for name, timed in (("exact", exact_engine), ("approximate", engine)):
+        start = time.perf_counter()
+        timed.decision_function(features)
+        timings[name] = (time.perf_counter() - start) * 1000 * 1000 / len(features)
+
+    return {
+        "agreement": float(np.mean(engine.predict(features) == exact_predictions)),
+        "score_mae": float(np.mean(np.abs(scores - exact_scores))),
+        "n_holdout": len(features),
+        "n_landmarks": engine.n_support,
+        "n_support_vectors": exact_engine.n_support,
+        "exact_ms_per_1k": timings["exact"],
+        "approximate_ms_per_1k": timings["approximate"],
+    }
+
+
+def save_approximation(
+    path: str, approximation: dict[str, np.ndarray], report: dict, version: str
+) -> None:
+    """Write an approximation, tied to the model version it was fitted on.
+
+    Args:
+        path (str): The .npz file to write.
+        approximation (dict[str, ndarray]): The output of `fit_nystroem`.
+        report (dict): The fidelity report of the approximation.
+        version (str): The model version it approximates.
+    """
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as f:
+        np.savez(
+            f,
+            **approximation,
+            metadata=json.dumps({"model_version": version, "report": report}),
+        )
+    os.replace(temporary_path, path)
+
+
+def load_approximation(path: str, version: str, min_agreement: float) -> dict:
+    """Load the approximation of a model version, if it is accurate enough.
+
+    Args:
+        path (str): The .npz file written by `save_approximation`.
+        version (str): The served model version.
+        min_agreement (float): The lowest agreement with the exact model at
+            which the approximation may be served.
+
+    Returns:
+        dict: The approximation, as returned by `fit_nystroem`, plus its
+            fidelity report under "report".
+
+    Raises:
+        ValueError: If there is no approximation for that model version, or
+            if its agreement is below `min_agreement`.
+    """
+    try:
+        with np.load(path, allow_pickle=False) as arrays:
+            approximation = dict(arrays)
+    except FileNotFoundError:
+        raise ValueError("No approximation has been fitted")
+
+    metadata = json.loads(str(approximation.pop("metadata")))
+    if metadata["model_version"] != version:
+        raise ValueError(
+            f"The approximation was fitted for model version "
+            f"'{metadata['model_version']}', not '{version}'"
+        )
+    report = metadata["report"]
+    if report["agreement"] < min_agreement:
+        raise ValueError(
+            f"The approximation agrees with the model on {report['agreement']:.2%} "
+            f"of held-out leads, below the {min_agreement:.2%} threshold"
+        )
+    return {**approximation, "report": report}
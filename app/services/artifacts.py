@@ -0,0 +1,401 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+
+from typing import TYPE_CHECKING
+
+import joblib
+
+from app.utils.constants import (
+    APPROXIMATION_MIN_AGREEMENT,
+    APPROXIMATION_PATH,
+    ARTIFACT_STORAGE,
+    ARTIFACTS_DIR,
+    FEATURE_NAMES,
+    FUSED_ENGINE_DTYPE,
+    INFERENCE_MODE,
+    LAST_ACTIVITY_ENCODER_PATH,
+    LAST_NOTABLE_ACTIVITY_ENCODER_PATH,
+    LEAD_ORIGIN_ENCODER_PATH,
+    LEAD_SOURCE_ENCODER_PATH,
+    MODEL_BUNDLES_DIR,
+    MODEL_PATH,
+    SCALER_PATH,
+    SHARED_ARRAYS_PATH,
+)
+from app.utils.functions import artifact_fingerprint, load_artifact
+from app.services.approximation import build_engine, load_approximation
+from app.services.compact import load_compact
+from app.services.engine import (
+    FactorizedSVMEngine,
+    FusedSVMEngine,
+    _unwrap_svc,
+    vocabulary_sizes,
+)
+from app.services.pipeline import FeaturePipeline
+from app.services.shared_arrays import share_arrays
+
+if TYPE_CHECKING:
+    from sklearn.model_selection import GridSearchCV
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+    from sklearn.svm import SVC
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+PAYLOAD_NAME = "model.joblib"
+INFERENCE_MODES = ("sklearn", "fused", "factorized", "approximate")
+
+
+class ModelArtifacts:
+    """A loaded model, with everything derived from it to serve predictions."""
+
+    def __init__(
+        self,
+        model: GridSearchCV | SVC | None,
+        encoders: dict[str, LabelEncoder],
+        scaler: StandardScaler,
+        version: str,
+        directory: str | None = None,
+        inference_mode: str = INFERENCE_MODE,
+        storage: str = ARTIFACT_STORAGE,
+        engine: FusedSVMEngine | FactorizedSVMEngine | None = None,
+        shared_arrays_path: str | None = None,
+    ):
+        """Build the feature pipeline and the inference engine.
+
+        Args:
+            model (GridSearchCV | SVC | None): The fitted model, or its SVC
+                (e.g. a reduced model), None when the engine is given.
+            encoders (dict[str, LabelEncoder]): The fitted categorical encoders.
+            scaler (StandardScaler): The fitted scaler.
+            version (str): The version of the artifacts.
+            directory (str | None): The bundle directory or the compact model
+                file, None for the legacy artifact files.
+            inference_mode (str): One of INFERENCE_MODES. The "approximate"
+                mode falls back to "sklearn" when there is no approximation
+                of this version accurate enough, see APPROXIMATION_PATH.
+            storage (str): "joblib" or "mmap", see ARTIFACT_STORAGE.
+            engine (FusedSVMEngine | FactorizedSVMEngine | None): An engine
+                built for `inference_mode` without the model, e.g. from the
+                compact format. It is served as is.
+            shared_arrays_path (str | None): The file the arrays are mapped
+                from with the "mmap" storage. Defaults to shared_arrays.bin
+                in the bundle directory, to a file next to the compact model
+                file, or to SHARED_ARRAYS_PATH.
+
+        Raises:
+            ValueError: If the inference mode or the storage is unknown.
+        """
+        self.model = model
+        self.encoders = encoders
+        self.scaler = scaler
+        self.version = version
+        self.directory = directory
+        self.pipeline = FeaturePipeline(encoders, scaler)
+
+        if engine is not None:
+            self.engine = engine
+        elif inference_mode == "sklearn":
+            self.engine = None
+        elif inference_mode == "fused":
+            self.engine = FusedSVMEngine.from_artifacts(
+                model, scaler, dtype=FUSED_ENGINE_DTYPE
+            )
+        elif inference_mode == "factorized":
+            self.engine = FactorizedSVMEngine.from_artifacts(model, scaler, encoders)
+            logger.info("Kernel factor tables: %s", self.engine.memory_report())
+        elif inference_mode == "approximate":
+            try:
+                approximation = load_approximation(
+                    APPROXIMATION_PATH, version, APPROXIMATION_MIN_AGREEMENT
+                )
+            except ValueError as e:
+                logger.warning("%s: serving the exact model", e)
+                self.engine = None
+                inference_mode = "sklearn"
+            else:
+                self.engine = build_engine(approximation, model, scaler)
+                logger.info(
+                    "Serving an approximation agreeing on %.2f%% of held-out leads",
+                    100 * approximation["report"]["agreement"],
+                )
+        else:
+            raise ValueError(
+                f"Unknown inference mode '{inference_mode}'. "
+                f"Expected one of: {', '.join(INFERENCE_MODES)}"
+            )
+        self.inference_mode = inference_mode
+
+        if storage == "mmap":
+            if shared_arrays_path is None:
+                if directory is None:
+                    shared_arrays_path = SHARED_ARRAYS_PATH
+                elif os.path.isdir(directory):
+                    shared_arrays_path = os.path.join(directory, "shared_arrays.bin")
+                else:  # A compact model file
+                    shared_arrays_path = f"{os.path.splitext(directory)[0]}.shared.bin"
+            owners = {}
+            if model is not None:
+                owners = {"svc": _unwrap_svc(model), "scaler": scaler}
+            if self.engine is not None:
+                owners["engine"] = self.engine
+            shared_bytes = share_arrays(shared_arrays_path, version, owners)
+            logger.info("Mapped %d bytes from %s", shared_bytes, shared_arrays_path)
+        elif storage != "joblib":
+            raise ValueError(
+                f"Unknown artifact storage '{storage}'. Expected one of: joblib, mmap"
+            )
+
+    @classmethod
+    def from_legacy_files(
+        cls, directory: str = ARTIFACTS_DIR, **kwargs
+    ) -> ModelArtifacts:
+        """Load the six separate artifact files of `artifacts/`.
+
+        Args:
+            directory (str): The directory holding the files, under the names
+                they have in `artifacts/`.
+
+        Returns:
+            ModelArtifacts: The artifacts, versioned by a hash of the files.
+        """
+
+        def located(default_path: str) -> str:
+            return os.path.join(directory, os.path.basename(default_path))
+
+        paths = {
+            "Last Activity": located(LAST_ACTIVITY_ENCODER_PATH),
+            "Last Notable Activity": located(LAST_NOTABLE_ACTIVITY_ENCODER_PATH),
+            "Lead Source": located(LEAD_SOURCE_ENCODER_PATH),
+            "Lead Origin": located(LEAD_ORIGIN_ENCODER_PATH),
+        }
+        model_path, scaler_path = located(MODEL_PATH), located(SCALER_PATH)
+        return cls(
+            model=load_artifact(model_path),
+            encoders={key: load_artifact(path) for key, path in paths.items()},
+            scaler=load_artifact(scaler_path),
+            version=artifact_fingerprint([model_path, *paths.values(), scaler_path]),
+            shared_arrays_path=located(SHARED_ARRAYS_PATH),
+            **kwargs,
+        )
+
+    @classmethod
+    def from_bundle(cls, directory: str, **kwargs) -> ModelArtifacts:
+        """Load a model bundle, after checking it against its manifest.
+
+        Args:
+            directory (str): The bundle directory.
+
+        Returns:
+            ModelArtifacts: The artifacts, versioned by the manifest.
+
+        Raises:
+            ValueError: If the bundle does not match its manifest.
+        """
+        manifest = verify_bundle(directory)
+        payload = load_artifact(os.path.join(directory, PAYLOAD_NAME))
+        return cls(
+            model=payload["model"],
+            encoders=payload["encoders"],
+            scaler=payload["scaler"],
+            version=manifest["version"],
+            directory=directory,
+            **kwargs,
+        )
+
+    @classmethod
+    def from_compact(
+        cls, path: str, inference_mode: str | None = None, **kwargs
+    ) -> ModelArtifacts:
+        """Load a file written by `export_compact`, without sklearn objects.
+
+        The engine is built straight from the mapped arrays, in the dtype
+        they were exported in. There is no model, so the "sklearn" and
+        "approximate" inference modes are not available.
+
+        The arrays the engine derives from the file are private to each
+        process, unless `storage` is "mmap": they are then shared from a
+        file next to the compact one, e.g. model.compact.shared.bin.
+
+        Args:
+            path (str): The compact model file.
+            inference_mode (str | None): "fused" or "factorized". Defaults
+                to INFERENCE_MODE when it is one of them, to "fused" otherwise.
+
+        Returns:
+            ModelArtifacts: The artifacts, with the version they were exported
+                from.
+
+        Raises:
+            ValueError: If the file is not a compact model file, or the
+                inference mode is not available.
+        """
+        if inference_mode is None:
+            inference_mode = INFERENCE_MODE
+            if inference_mode not in ("fused", "factorized"):
+                inference_mode = "fused"
+        version, compact = load_compact(path)
+        scaler, encoders = compact["scaler"], compact["encoders"]
+        arrays = {
+            "support_vectors": compact["support_vectors"],
+            "dual_coef": compact["dual_coef"],
+            "intercept": float(compact["intercept"][0]),
+            "gamma": float(compact["gamma"][0]),
+            "mean": scaler.mean_,
+            "scale": scaler.scale_,
+            "classes": compact["classes"],
+        }
+        if inference_mode == "fused":
+            engine = FusedSVMEngine(**arrays, dtype=compact["support_vectors"].dtype)
+        elif inference_mode == "factorized":
+            engine = FactorizedSVMEngine(
+                **arrays,
+                vocabulary_sizes=vocabulary_sizes(encoders),
+                feature_names=FEATURE_NAMES,
+            )
+        else:
+            raise ValueError(
+                f"The compact format serves the fused and factorized inference "
+                f"modes, not '{inference_mode}'"
+            )
+        return cls(
+            model=None,
+            encoders=encoders,
+            scaler=scaler,
+            version=version,
+            directory=path,
+            inference_mode=inference_mode,
+            engine=engine,
+            **kwargs,
+        )
+
+
+def build_bundle(
+    bundles_dir: str,
+    model: GridSearchCV,
+    encoders: dict[str, LabelEncoder],
+    scaler: StandardScaler,
+    version: str | None = None,
+) -> str:
+    """Write the model, encoders and scaler as one versioned bundle.
+
+    The bundle is a directory named after its version, holding a single
+    joblib payload and a manifest with the checksum of every file.
+
+    Args:
+        bundles_dir (str): The directory holding the bundles.
+        model (GridSearchCV): The fitted model.
+        encoders (dict[str, LabelEncoder]): The fitted categorical encoders.
+        scaler (StandardScaler): The fitted scaler.
+        version (str | None): The bundle version. Defaults to a timestamp
+            followed by a hash of the payload.
+
+    Returns:
+        str: The bundle directory.
+
+    Raises:
+        FileExistsError: If a bundle with that version already exists.
+    """
+    os.makedirs(bundles_dir, exist_ok=True)
+    staging = os.path.join(bundles_dir, f".staging-{os.getpid()}")
+    os.makedirs(staging)
+    payload_path = os.path.join(staging, PAYLOAD_NAME)
+    joblib.dump({"model": model, "encoders": encoders, "scaler": scaler}, payload_path)
+
+    fingerprint = artifact_fingerprint([payload_path])
+    version = version or f"{time.strftime('%Y%m%d%H%M%S')}-{fingerprint}"
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "version": version,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "features": FEATURE_NAMES,
+        "files": {
+            PAYLOAD_NAME: {
+                "sha256": artifact_fingerprint([payload_path], length=None),
+                "bytes": os.path.getsize(payload_path),
+            }
+        },
+    }
+    with open(os.path.join(staging, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    directory = os.path.join(bundles_dir, version)
+    if os.path.exists(directory):
+        raise FileExistsError(f"Bundle '{version}' already exists in {bundles_dir}")
+    os.rename(staging, directory)  # Readers never see a partial bundle
+    return directory
+
+
+def verify_bundle(directory: str) -> dict:
+    """Check the files of a bundle against the checksums of its manifest.
+
+    Args:
+        directory (str): The bundle directory.
+
+    Returns:
+        dict: The manifest.
+
+    Raises:
+        ValueError: If the bundle format is unknown or a file does not match.
+    """
+    with open(os.path.join(directory, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+
+    if manifest.get("format") != BUNDLE_FORMAT:
+        raise ValueError(f"Unknown bundle format: {manifest.get('format')}")
+    if manifest.get("features") != FEATURE_NAMES:
+        raise ValueError("Bundle features do not match FEATURE_SCHEMA")
+    for name, expected in manifest["files"].items():
+        checksum = artifact_fingerprint([os.path.join(directory, name)], length=None)
+        if checksum != expected["sha256"]:
+            raise ValueError(f"Checksum mismatch for '{name}' in bundle {directory}")
+
+    return manifest
+
+
+def find_latest_bundle(bundles_dir: str = MODEL_BUNDLES_DIR) -> str | None:
+    """Return the newest bundle directory, by version name.
+
+    Args:
+        bundles_dir (str): The directory holding the bundles.
+
+    Returns:
+        str | None: The bundle directory, or None if there is no bundle.
+    """
+    if not os.path.isdir(bundles_dir):
+        return None
+    versions = sorted(
+        name
+        for name in os.listdir(bundles_dir)
+        if os.path.isfile(os.path.join(bundles_dir, name, MANIFEST_NAME))
+    )
+    return os.path.join(bundles_dir, versions[-1]) if versions else None
+
+
+def load_artifacts(bundle_path: str | None = None, **kwargs) -> ModelArtifacts:
+    """Load the served artifacts.
+
+    Args:
+        bundle_path (str | None): The bundle directory, or compact model file,
+            to load. Defaults to the newest bundle of MODEL_BUNDLES_DIR, or to
+            the legacy artifact files when there is none.
+
+    Returns:
+        ModelArtifacts: The artifacts.
+    """
+    bundle_path = bundle_path or find_latest_bundle()
+    if bundle_path is None:
+        logger.info("No model bundle found, loading the legacy artifact files")
+        return ModelArtifacts.from_legacy_files(**kwargs)
+
+    if os.path.isfile(bundle_path):
+        logger.info("Loading compact model %s", bundle_path)
+        return ModelArtifacts.from_compact(bundle_path, **kwargs)
+
+    logger.info("Loading model bundle %s", bundle_path)
+    return ModelArtifacts.from_bundle(bundle_path, **kwargs)
@@ -0,0 +1,201 @@
+import threading
+import time
+
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable
+
+import numpy as np
+
+from app.utils.metrics import Histogram
+
+
+class QueueFullError(Exception):
+    """Raised when the micro-batcher queue is at its maximum depth."""
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a request is not scored before its deadline."""
+
+
+class _Request:
+    __slots__ = ("features", "context", "deadline", "enqueued_at", "future")
+
+    def __init__(self, features: np.ndarray, context: Any, deadline: float):
+        self.features = features
+        self.context = context
+        self.deadline = deadline
+        self.enqueued_at = time.monotonic()
+        self.future = Future()
+
+
+class MicroBatcher:
+    """Groups concurrent single-lead requests into batches.
+
+    Each request waits in a queue until the batch is full or the oldest
+    request in it has waited `max_wait` seconds. The whole batch is then
+    scored with one call per context the requests were submitted with, and
+    each result is sent back to its caller.
+    """
+
+    def __init__(
+        self,
+        score: Callable[..., list],
+        max_batch_size: int = 64,
+        max_wait: float = 0.002,
+        max_queue_size: int = 1024,
+        timeout: float = 1.0,
+    ):
+        """Configure the micro-batcher.
+
+        Args:
+            score (Callable[..., list]): Scores a (n_samples, n_features)
+                matrix and returns one result per row. Rows submitted with
+                a context are scored together with it, as a second argument.
+            max_batch_size (int): The maximum number of rows scored at once.
+            max_wait (float): How long, in seconds, the oldest request waits
+                for the batch to fill.
+            max_queue_size (int): The maximum number of queued requests.
+            timeout (float): The default time, in seconds, a request may
+                take before its deadline passes.
+        """
+        self.score = score
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue_size = max_queue_size
+        self.timeout = timeout
+
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._worker = None
+
+        self.batch_sizes = Histogram(
+            [2**i for i in range(max_batch_size.bit_length())]
+        )
+        self.queue_wait = Histogram(
+            [0.0005, 0.001, 0.002, 0.005, 0.01, 0.05, 0.1, 1.0]
+        )
+        self.rejected = 0
+        self.expired = 0
+
+    def _ensure_worker(self) -> None:
+        """Start the worker thread, again if the process was forked."""
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(
+                target=self._run, name="micro-batcher", daemon=True
+            )
+            self._worker.start()
+
+    def submit(
+        self, features: np.ndarray, timeout: float | None = None, context: Any = None
+    ):
+        """Score one row through the next batch.
+
+        Args:
+            features (ndarray): The features of one lead, of shape (n_features,).
+            timeout (float | None): The time, in seconds, before the deadline
+                of this request. Defaults to the batcher timeout.
+            context: Passed to `score` with the row, e.g. the model snapshot
+                the row was encoded with. Rows are only scored together with
+                rows of the same context.
+
+        Returns:
+            The result of `score` for this row.
+
+        Raises:
+            QueueFullError: If the queue is at its maximum depth.
+            DeadlineExceededError: If the row is not scored before its deadline.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        request = _Request(features, context, time.monotonic() + timeout)
+
+        with self._condition:
+            if len(self._queue) >= self.max_queue_size:
+                self.rejected += 1
+                raise QueueFullError(
+                    f"Too many pending requests: at most {self.max_queue_size}"
+                )
+            self._ensure_worker()
+            self._queue.append(request)
+            self._condition.notify()
+
+        try:
+            remaining = max(request.deadline - time.monotonic(), 0)
+            return request.future.result(timeout=remaining)
+        except FutureTimeoutError:
+            request.future.cancel()
+            raise DeadlineExceededError(f"Request not scored within {timeout:.3f}s")
+
+    def _next_batch(self) -> list[_Request]:
+        """Wait for a batch: full, or as old as `max_wait`."""
+        with self._condition:
+            while not self._queue:
+                self._condition.wait()
+
+            flush_at = self._queue[0].enqueued_at + self.max_wait
+            while len(self._queue) < self.max_batch_size:
+                remaining = flush_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            size = min(len(self._queue), self.max_batch_size)
+            return [self._queue.popleft() for _ in range(size)]
+
+    def _run(self) -> None:
+        """Score batches until the process exits."""
+        while True:
+            batch = []
+            requests = self._next_batch()
+            # Read after the wait, which may last until the requests arrive
+            now = time.monotonic()
+            for request in requests:
+                if request.deadline <= now:
+                    self.expired += 1
+                    if request.future.set_running_or_notify_cancel():
+                        request.future.set_exception(
+                            DeadlineExceededError("Request deadline passed in queue")
+                        )
+                elif request.future.set_running_or_notify_cancel():
+                    self.queue_wait.observe(now - request.enqueued_at)
+                    batch.append(request)
+
+            groups = {}
+            for request in batch:
+                groups.setdefault(id(request.context), []).append(request)
+            for group in groups.values():
+                self._score_group(group)
+
+    def _score_group(self, batch: list[_Request]) -> None:
+        """Score requests of the same context with one call."""
+        self.batch_sizes.observe(len(batch))
+        features = np.stack([request.features for request in batch])
+        context = batch[0].context
+        try:
+            if context is None:
+                results = self.score(features)
+            else:
+                results = self.score(features, context)
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        for request, result in zip(batch, results):
+            request.future.set_result(result)
+
+    def stats(self) -> dict:
+        """Return the batch size and queue wait distributions.
+
+        Returns:
+            dict: The histograms, the queue depth, and the number of rejected
+                and expired requests.
+        """
+        return {
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_seconds": self.queue_wait.snapshot(),
+            "queue_depth": len(self._queue),
+            "rejected": self.rejected,
+            "expired": self.expired,
+        }
@@ -0,0 +1,129 @@
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+_MISSING = object()
+
+
+class PredictionCache:
+    """Bounded LRU cache of predictions, with an optional TTL.
+
+    Entries belong to a model version: when `set_version` is called with a
+    different version, every entry is dropped, and a prediction is only
+    stored or served under the version that made it, so a prediction is
+    never served by a model that did not make it.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float | None = None,
+        version: str | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Configure the cache.
+
+        Args:
+            max_size (int): The maximum number of entries.
+            ttl (float | None): How long, in seconds, an entry stays valid.
+                None keeps entries until they are evicted.
+            version (str | None): The version of the model making predictions.
+            clock (Callable[[], float]): The time source, in seconds.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version = version
+        self.clock = clock
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def set_version(self, version: str) -> None:
+        """Drop every entry if the model version changed.
+
+        Args:
+            version (str): The version of the model making predictions.
+        """
+        if version == self.version:
+            return
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+                self.invalidations += 1
+
+    def get(self, key: Hashable, default=None, version: str | None = None):
+        """Return the cached value of a key, and mark it as recently used.
+
+        Args:
+            key (Hashable): The key.
+            default: The value returned on a miss.
+            version (str | None): The model version of the caller. An entry
+                made by another version is dropped and missed.
+
+        Returns:
+            The cached value, or `default`.
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at, entry_version = entry
+                if version is not None and entry_version != version:
+                    del self._entries[key]
+                elif expires_at is None or expires_at > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                else:
+                    del self._entries[key]
+                    self.expirations += 1
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value, version: str | None = None) -> None:
+        """Cache a value, evicting the least recently used entry if full.
+
+        Args:
+            key (Hashable): The key.
+            value: The value.
+            version (str | None): The model version that made the value. It
+                is not cached if the cache has moved to another version.
+        """
+        expires_at = None if self.ttl is None else self.clock() + self.ttl
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._entries[key] = (value, expires_at, version or self.version)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        """Return the cache counters.
+
+        Returns:
+            dict: The size, hits, misses, evictions, expirations and
+                invalidations of the cache.
+        """
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,141 @@
+import json
+import os
+import time
+
+import numpy as np
+
+
+def fit_platt(
+    scores: np.ndarray, labels: np.ndarray, max_iter: int = 100
+) -> tuple[float, float]:
+    """Fit a Platt sigmoid mapping decision scores to probabilities.
+
+    P(converted | score) = 1 / (1 + exp(-(a * score + b))), fitted by
+    Newton's method on the log loss, with Platt's smoothed targets so that
+    a separable sample does not push the slope to infinity.
+
+    Args:
+        scores (ndarray): The decision scores, of shape (n_samples,).
+        labels (ndarray): The true classes (0 or 1), of shape (n_samples,).
+        max_iter (int): The maximum number of Newton steps.
+
+    Returns:
+        tuple[float, float]: The slope a and the intercept b.
+
+    Raises:
+        ValueError: If the labels do not hold both classes.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.asarray(labels).astype(bool)
+    n_positive = int(labels.sum())
+    n_negative = len(labels) - n_positive
+    if n_positive == 0 or n_negative == 0:
+        raise ValueError("Calibration needs leads of both classes")
+
+    targets = np.where(
+        labels, (n_positive + 1) / (n_positive + 2), 1 / (n_negative + 2)
+    )
+
+    def loss(a: float, b: float) -> float:
+        z = a * scores + b
+        return float(np.sum(np.logaddexp(0, z) - targets * z))
+
+    a, b = 1.0, float(np.log((n_positive + 1) / (n_negative + 1)))
+    current = loss(a, b)
+    for _ in range(max_iter):
+        p = 1 / (1 + np.exp(-(a * scores + b)))
+        residual = p - targets
+        gradient = np.array([residual @ scores, residual.sum()])
+        weights = p * (1 - p) + 1e-12
+        hessian = np.array(
+            [
+                [weights @ (scores * scores), weights @ scores],
+                [weights @ scores, weights.sum()],
+            ]
+        )
+        step = np.linalg.solve(hessian, gradient)
+
+        size = 1.0
+        while size > 1e-10:
+            new_a, new_b = a - size * step[0], b - size * step[1]
+            new = loss(new_a, new_b)
+            if new <= current:
+                break
+            size /= 2
+        else:
+            break
+
+        a, b = new_a, new_b
+        converged = current - new < 1e-12 * max(abs(current), 1.0)
+        current = new
+        if converged:
+            break
+
+    return float(a), float(b)
+
+
+def platt_probabilities(scores: np.ndarray, a: float, b: float) -> np.ndarray:
+    """Map decision scores to calibrated conversion probabilities.
+
+    Args:
+        scores (ndarray): The decision scores.
+        a (float): The slope of the fitted sigmoid.
+        b (float): The intercept of the fitted sigmoid.
+
+    Returns:
+        ndarray: The probabilities, of the shape of `scores`.
+    """
+    return 1 / (1 + np.exp(-(a * np.asarray(scores, dtype=np.float64) + b)))
+
+
+def save_calibration(
+    path: str, a: float, b: float, version: str, n_samples: int
+) -> None:
+    """Write a fitted calibration, tied to the model version it was fitted on.
+
+    Args:
+        path (str): The JSON file to write.
+        a (float): The slope of the fitted sigmoid.
+        b (float): The intercept of the fitted sigmoid.
+        version (str): The model version that produced the scores.
+        n_samples (int): The number of labeled leads used.
+    """
+    calibration = {
+        "method": "platt",
+        "a": a,
+        "b": b,
+        "model_version": version,
+        "n_samples": n_samples,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "w") as f:
+        json.dump(calibration, f, indent=2)
+    os.replace(temporary_path, path)
+
+
+def load_calibration(path: str, version: str) -> tuple[float, float]:
+    """Load the calibration fitted for a model version.
+
+    Args:
+        path (str): The JSON file written by `save_calibration`.
+        version (str): The served model version.
+
+    Returns:
+        tuple[float, float]: The slope a and the intercept b.
+
+    Raises:
+        ValueError: If there is no calibration for that model version.
+    """
+    try:
+        with open(path) as f:
+            calibration = json.load(f)
+    except FileNotFoundError:
+        raise ValueError("No probability calibration has been fitted")
+
+    if calibration.get("model_version") != version:
+        raise ValueError(
+            f"The probability calibration was fitted for model version "
+            f"'{calibration.get('model_version')}', not '{version}'"
+        )
+    return calibration["a"], calibration["b"]
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import os
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from app.services.engine import _unwrap_svc
+from app.services.shared_arrays import load_arrays, save_arrays
+from app.utils.constants import FEATURE_NAMES
+
+if TYPE_CHECKING:
+    from app.services.artifacts import ModelArtifacts
+
+COMPACT_DTYPES = ("float64", "float32")
+
+
+class CodeTable:
+    """The labels of a categorical feature, in code order.
+
+    It stands in for the fitted LabelEncoder: `classes_` holds the labels,
+    sorted, and `transform` maps labels to their codes.
+    """
+
+    def __init__(self, classes: np.ndarray):
+        self.classes_ = classes
+
+    def transform(self, values) -> np.ndarray:
+        """Map labels to their codes.
+
+        Args:
+            values: The labels.
+
+        Returns:
+            ndarray: The codes, of the shape of `values`.
+
+        Raises:
+            ValueError: If a label is not in the table.
+        """
+        values = np.asarray(values, dtype=str)
+        codes = np.searchsorted(self.classes_, values)
+        found = codes < len(self.classes_)
+        found[found] = self.classes_[codes[found]] == values[found]
+        if not found.all():
+            raise ValueError(
+                f"y contains previously unseen labels: {sorted(set(values[~found]))}"
+            )
+        return codes
+
+
+class AffineScaler:
+    """The mean and scale of a fitted StandardScaler."""
+
+    def __init__(self, mean: np.ndarray, scale: np.ndarray):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, features: np.ndarray) -> np.ndarray:
+        """Scale features, like StandardScaler.transform."""
+        return (np.asarray(features, dtype=np.float64) - self.mean_) / self.scale_
+
+
+def export_compact(
+    path: str, artifacts: ModelArtifacts, dtype: str = "float64"
+) -> int:
+    """Write artifacts in the compact format.
+
+    The compact format is a shared array file (see `save_arrays`) holding the
+    support vectors and dual coefficients in `dtype`, the labels of each
+    categorical feature as fixed-width strings in code order, the scaler mean
+    and scale, and the intercept, gamma and classes of the SVM. It keeps the
+    version of the artifacts, so that calibrations and approximations still
+    apply.
+
+    Args:
+        path (str): The file to write.
+        artifacts (ModelArtifacts): Artifacts loaded with their model.
+        dtype (str): One of COMPACT_DTYPES.
+
+    Returns:
+        int: The size of the file, in bytes.
+
+    Raises:
+        ValueError: If the dtype is unknown, or the model is not a binary
+            RBF SVC.
+    """
+    if dtype not in COMPACT_DTYPES:
+        raise ValueError(
+            f"Unknown dtype '{dtype}'. Expected one of: {', '.join(COMPACT_DTYPES)}"
+        )
+    svc = _unwrap_svc(artifacts.model)
+    arrays = {
+        "features": np.array(FEATURE_NAMES, dtype=str),
+        "support_vectors": svc.support_vectors_.astype(dtype),
+        "dual_coef": svc.dual_coef_[0].astype(dtype),
+        "intercept": svc.intercept_.astype(np.float64),
+        "gamma": np.array([svc._gamma], dtype=np.float64),
+        "classes": svc.classes_.astype(np.int64),
+        "scaler.mean": np.asarray(artifacts.scaler.mean_, dtype=np.float64),
+        "scaler.scale": np.asarray(artifacts.scaler.scale_, dtype=np.float64),
+    }
+    for key, encoder in artifacts.encoders.items():
+        arrays[f"vocabulary.{key}"] = np.asarray(encoder.classes_, dtype=str)
+
+    save_arrays(path, arrays, artifacts.version)
+    return os.path.getsize(path)
+
+
+def load_compact(path: str) -> tuple[str, dict]:
+    """Memory-map a compact model file.
+
+    Args:
+        path (str): The file written by `export_compact`.
+
+    Returns:
+        tuple[str, dict]: The version, and the arrays of the SVM, an
+            AffineScaler under "scaler" and the CodeTables of the
+            categorical features under "encoders".
+
+    Raises:
+        ValueError: If the file is not a compact model file, or was exported
+            for other features.
+    """
+    version, arrays = load_arrays(path)
+    if "features" not in arrays or "support_vectors" not in arrays:
+        raise ValueError(f"'{path}' is not a compact model file")
+    if arrays.pop("features").tolist() != FEATURE_NAMES:
+        raise ValueError("Compact model features do not match FEATURE_SCHEMA")
+
+    model = {name: array for name, array in arrays.items() if "." not in name}
+    model["scaler"] = AffineScaler(arrays["scaler.mean"], arrays["scaler.scale"])
+    model["encoders"] = {
+        name.removeprefix("vocabulary."): CodeTable(array)
+        for name, array in arrays.items()
+        if name.startswith("vocabulary.")
+    }
+    return version, model
+
+
+def compact_report(
+    original: ModelArtifacts, compact: ModelArtifacts, features: np.ndarray
+) -> dict:
+    """Compare compact artifacts with the original ones they were exported from.
+
+    Args:
+        original (ModelArtifacts): Artifacts loaded with their model.
+        compact (ModelArtifacts): The artifacts loaded from the compact file.
+        features (ndarray): Encoded leads, unscaled, to compare on.
+
+    Returns:
+        dict: The share of the leads on which the compact engine and the
+            model's `predict` disagree, the largest and mean absolute
+            difference of their decision values, and the number of leads.
+    """
+    svc = _unwrap_svc(original.model)
+    scaled = (features - original.scaler.mean_) / original.scaler.scale_
+    exact_scores = svc.decision_function(scaled)
+    scores = compact.engine.decision_function(features).astype(np.float64)
+    errors = np.abs(scores - exact_scores)
+    predictions = compact.engine.predict(features)
+    return {
+        "disagreement": float(np.mean(predictions != original.model.predict(scaled))),
+        "max_score_error": float(errors.max()),
+        "mean_score_error": float(errors.mean()),
+        "n_leads": len(features),
+    }
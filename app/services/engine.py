@@ -0,0 +1,466 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from app.utils.constants import FEATURE_SCHEMA
+
+if TYPE_CHECKING:
+    from sklearn.model_selection import GridSearchCV
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+    from sklearn.svm import SVC
+
+
+def _unwrap_svc(model: GridSearchCV | SVC) -> SVC:
+    """Return the binary RBF SVC behind the model.
+
+    Raises:
+        ValueError: If the model is not a binary RBF SVC.
+    """
+    from sklearn.svm import SVC
+
+    svc = getattr(model, "best_estimator_", model)
+    if not isinstance(svc, SVC) or svc.kernel != "rbf":
+        raise ValueError(f"Expected an RBF SVC, got {svc!r}")
+    if len(svc.classes_) != 2:
+        raise ValueError(f"Expected a binary SVC, got classes {svc.classes_}")
+    return svc
+
+
+def vocabulary_sizes(encoders: dict[str, LabelEncoder]) -> dict[int, int]:
+    """Return the number of codes of each categorical feature, by feature index.
+
+    Args:
+        encoders (dict[str, LabelEncoder]): The fitted categorical encoders.
+
+    Returns:
+        dict[int, int]: The vocabulary sizes of the encoded features, and of
+            the features with a fixed set of integer values.
+    """
+    sizes = {}
+    for j, (key, (type, expected_values)) in enumerate(FEATURE_SCHEMA.items()):
+        if key in encoders:
+            sizes[j] = len(encoders[key].classes_)
+        elif expected_values is not None:
+            assert sorted(expected_values) == list(range(len(expected_values)))
+            sizes[j] = len(expected_values)
+    return sizes
+
+
+class FusedSVMEngine:
+    """RBF-SVM decision function with the scaler folded into the support vectors.
+
+    With x the encoded (unscaled) features, m and s the scaler mean and scale,
+    and c a support vector, the squared distance in the scaled space is
+
+        ||(x - m) / s - c||^2 = ||x / s - c'||^2,  with c' = c + m / s
+
+    which expands into (x * x) . (1 / s^2) - 2 x . (c' / s) + ||c'||^2. The
+    kernel rows for a batch are therefore one GEMM against precomputed
+    support vectors, a rank-one correction and an exp, with no scaler pass
+    and no sklearn/libsvm dispatch.
+    """
+
+    def __init__(
+        self,
+        support_vectors: np.ndarray,
+        dual_coef: np.ndarray,
+        intercept: float,
+        gamma: float,
+        mean: np.ndarray,
+        scale: np.ndarray,
+        classes: np.ndarray,
+        dtype: type = np.float64,
+        chunk_size: int = 1024,
+    ):
+        """Fold the scaler and gamma into the support vectors.
+
+        Args:
+            support_vectors (ndarray): The support vectors, in the scaled space.
+            dual_coef (ndarray): The dual coefficients, one per support vector.
+            intercept (float): The intercept of the decision function.
+            gamma (float): The RBF kernel coefficient.
+            mean (ndarray): The scaler mean, one per feature.
+            scale (ndarray): The scaler scale, one per feature.
+            classes (ndarray): The class labels, negative class first.
+            dtype (type): The floating point type used for inference.
+            chunk_size (int): The number of rows scored at once, which bounds
+                the size of the kernel matrix.
+        """
+        support_vectors = np.asarray(support_vectors, dtype=np.float64)
+        inverse_scale = 1.0 / np.asarray(scale, dtype=np.float64)
+        shifted = support_vectors + np.asarray(mean, dtype=np.float64) * inverse_scale
+
+        self.dtype = np.dtype(dtype)
+        self.chunk_size = chunk_size
+        self.n_support = len(support_vectors)
+        self.n_features = support_vectors.shape[1]
+        self.classes = np.asarray(classes)
+
+        # log K(x, c) = x . weighted_sv + sv_bias - (x * x) . feature_weights
+        self.weighted_sv = np.ascontiguousarray(
+            (2.0 * gamma * shifted * inverse_scale).T, dtype=self.dtype
+        )
+        self.sv_bias = (-gamma * np.einsum("ij,ij->i", shifted, shifted)).astype(
+            self.dtype
+        )
+        self.feature_weights = (gamma * inverse_scale**2).astype(self.dtype)
+        self.dual_coef = np.ascontiguousarray(dual_coef, dtype=self.dtype).ravel()
+        self.intercept = self.dtype.type(intercept)
+
+    @classmethod
+    def from_artifacts(
+        cls,
+        model: GridSearchCV | SVC,
+        scaler: StandardScaler,
+        dtype: type = np.float64,
+        chunk_size: int = 1024,
+    ) -> FusedSVMEngine:
+        """Build the engine from the loaded model and scaler.
+
+        Args:
+            model (GridSearchCV | SVC): The fitted RBF SVC, or a search wrapping it.
+            scaler (StandardScaler): The fitted scaler.
+            dtype (type): The floating point type used for inference.
+            chunk_size (int): The number of rows scored at once.
+
+        Returns:
+            FusedSVMEngine: The engine.
+
+        Raises:
+            ValueError: If the model is not a binary RBF SVC.
+        """
+        svc = _unwrap_svc(model)
+
+        return cls(
+            support_vectors=svc.support_vectors_,
+            dual_coef=svc.dual_coef_[0],
+            intercept=svc.intercept_[0],
+            gamma=svc._gamma,
+            mean=scaler.mean_,
+            scale=scaler.scale_,
+            classes=svc.classes_,
+            dtype=dtype,
+            chunk_size=chunk_size,
+        )
+
+    def shared_arrays(self) -> dict[str, np.ndarray]:
+        """Return the numeric arrays of the engine, by name."""
+        return {
+            "weighted_sv": self.weighted_sv,
+            "sv_bias": self.sv_bias,
+            "feature_weights": self.feature_weights,
+            "dual_coef": self.dual_coef,
+        }
+
+    def attach_arrays(self, arrays: dict[str, np.ndarray]) -> None:
+        """Replace the numeric arrays of the engine, e.g. by shared views."""
+        for name, array in arrays.items():
+            setattr(self, name, array)
+
+    def _decision_chunk(self, features: np.ndarray, out: np.ndarray) -> None:
+        """Write the decision values of one chunk of rows into `out`."""
+        kernel = features @ self.weighted_sv
+        kernel += self.sv_bias
+        kernel -= ((features * features) @ self.feature_weights)[:, np.newaxis]
+        np.minimum(kernel, 0.0, out=kernel)  # Rounding can make distances negative
+        np.exp(kernel, out=kernel)
+        np.matmul(kernel, self.dual_coef, out=out)
+
+    def decision_function(self, features: np.ndarray) -> np.ndarray:
+        """Compute the SVM decision values of encoded, unscaled features.
+
+        Args:
+            features (ndarray): The encoded features, of shape
+                (n_samples, n_features) or (n_features,).
+
+        Returns:
+            ndarray: The decision values, of shape (n_samples,). Positive
+                values stand for the positive class.
+        """
+        features = np.asarray(features, dtype=self.dtype)
+        if features.ndim == 1:
+            features = features[np.newaxis]
+
+        scores = np.empty(len(features), dtype=self.dtype)
+        for start in range(0, len(features), self.chunk_size):
+            stop = start + self.chunk_size
+            self._decision_chunk(features[start:stop], scores[start:stop])
+        scores += self.intercept
+
+        return scores
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Predict the classes of encoded, unscaled features.
+
+        Args:
+            features (ndarray): The encoded features, of shape
+                (n_samples, n_features) or (n_features,).
+
+        Returns:
+            ndarray: The class predictions, of shape (n_samples,).
+        """
+        return self.classes[(self.decision_function(features) > 0).astype(np.intp)]
+
+
+class FactorizedSVMEngine:
+    """RBF-SVM decision function with precomputed categorical kernel factors.
+
+    The RBF kernel factorizes per dimension, exp(-g ||z - c||^2) being the
+    product over features j of exp(-g (z_j - c_j)^2). For the categorical and
+    binary features, that factor only depends on a value from a small
+    vocabulary, so it is computed once for every value and support vector.
+    Features are grouped so that a single table row holds the product for a
+    whole combination of values, and scoring a row only needs the numeric
+    dimensions, one exp, and a product of one table row per group.
+
+    Rows whose categorical values are not in the vocabularies are scored by a
+    FusedSVMEngine instead.
+    """
+
+    def __init__(
+        self,
+        support_vectors: np.ndarray,
+        dual_coef: np.ndarray,
+        intercept: float,
+        gamma: float,
+        mean: np.ndarray,
+        scale: np.ndarray,
+        classes: np.ndarray,
+        vocabulary_sizes: dict[int, int],
+        feature_names: list[str] | None = None,
+        max_group_size: int = 256,
+        chunk_size: int = 1024,
+    ):
+        """Build the kernel factor tables.
+
+        Args:
+            support_vectors (ndarray): The support vectors, in the scaled space.
+            dual_coef (ndarray): The dual coefficients, one per support vector.
+            intercept (float): The intercept of the decision function.
+            gamma (float): The RBF kernel coefficient.
+            mean (ndarray): The scaler mean, one per feature.
+            scale (ndarray): The scaler scale, one per feature.
+            classes (ndarray): The class labels, negative class first.
+            vocabulary_sizes (dict[int, int]): The number of codes of each
+                categorical feature, keyed by feature index. Codes run from 0.
+            feature_names (list[str] | None): The feature names, for reports.
+            max_group_size (int): The maximum number of value combinations,
+                i.e. table rows, of a group of categorical features.
+            chunk_size (int): The number of rows scored at once.
+        """
+        support_vectors = np.asarray(support_vectors, dtype=np.float64)
+        mean = np.asarray(mean, dtype=np.float64)
+        scale = np.asarray(scale, dtype=np.float64)
+        n_features = support_vectors.shape[1]
+
+        self.chunk_size = chunk_size
+        self.n_support = len(support_vectors)
+        self.classes = np.asarray(classes)
+        self.feature_names = feature_names or [str(j) for j in range(n_features)]
+        self.dual_coef = np.ascontiguousarray(dual_coef, dtype=np.float64).ravel()
+        self.intercept = float(intercept)
+        self.fallback = FusedSVMEngine(
+            support_vectors, dual_coef, intercept, gamma, mean, scale, classes
+        )
+
+        self.groups = []
+        for j in sorted(vocabulary_sizes):
+            size = vocabulary_sizes[j]
+            if self.groups and np.prod(self.groups[-1]["sizes"]) * size <= max_group_size:
+                self.groups[-1]["features"].append(j)
+                self.groups[-1]["sizes"].append(size)
+            else:
+                self.groups.append({"features": [j], "sizes": [size]})
+
+        for group in self.groups:
+            codes = np.indices(group["sizes"]).reshape(len(group["sizes"]), -1)
+            table = np.ones((codes.shape[1], self.n_support))
+            for j, feature_codes in zip(group["features"], codes):
+                scaled = (feature_codes - mean[j]) / scale[j]
+                delta = scaled[:, np.newaxis] - support_vectors[:, j]
+                table *= np.exp(-gamma * delta * delta)
+            group["table"] = table
+
+        self.categorical = np.array(sorted(vocabulary_sizes), dtype=np.intp)
+        self.vocabulary_sizes = np.array(
+            [vocabulary_sizes[j] for j in self.categorical], dtype=np.float64
+        )
+
+        # Numeric dimensions, with the scaler folded in as in FusedSVMEngine
+        self.numeric = np.array(
+            [j for j in range(n_features) if j not in vocabulary_sizes], dtype=np.intp
+        )
+        inverse_scale = 1.0 / scale[self.numeric]
+        shifted = support_vectors[:, self.numeric] + mean[self.numeric] * inverse_scale
+        self.weighted_sv = np.ascontiguousarray((2.0 * gamma * shifted * inverse_scale).T)
+        self.sv_bias = -gamma * np.einsum("ij,ij->i", shifted, shifted)
+        self.feature_weights = gamma * inverse_scale**2
+
+    @classmethod
+    def from_artifacts(
+        cls,
+        model: GridSearchCV | SVC,
+        scaler: StandardScaler,
+        encoders: dict[str, LabelEncoder],
+        max_group_size: int = 256,
+        chunk_size: int = 1024,
+    ) -> FactorizedSVMEngine:
+        """Build the engine from the loaded model, scaler and encoders.
+
+        Args:
+            model (GridSearchCV | SVC): The fitted RBF SVC, or a search wrapping it.
+            scaler (StandardScaler): The fitted scaler.
+            encoders (dict[str, LabelEncoder]): The fitted categorical encoders.
+            max_group_size (int): The maximum number of rows of a table.
+            chunk_size (int): The number of rows scored at once.
+
+        Returns:
+            FactorizedSVMEngine: The engine.
+
+        Raises:
+            ValueError: If the model is not a binary RBF SVC.
+        """
+        svc = _unwrap_svc(model)
+
+        return cls(
+            support_vectors=svc.support_vectors_,
+            dual_coef=svc.dual_coef_[0],
+            intercept=svc.intercept_[0],
+            gamma=svc._gamma,
+            mean=scaler.mean_,
+            scale=scaler.scale_,
+            classes=svc.classes_,
+            vocabulary_sizes=vocabulary_sizes(encoders),
+            feature_names=list(FEATURE_SCHEMA),
+            max_group_size=max_group_size,
+            chunk_size=chunk_size,
+        )
+
+    def memory_report(self) -> dict:
+        """Describe the kernel factor tables and their memory use.
+
+        Returns:
+            dict: One entry per table, and the total size in bytes.
+        """
+        tables = [
+            {
+                "features": [self.feature_names[j] for j in group["features"]],
+                "rows": group["table"].shape[0],
+                "bytes": group["table"].nbytes,
+            }
+            for group in self.groups
+        ]
+        return {
+            "n_support": self.n_support,
+            "tables": tables,
+            "total_bytes": sum(table["bytes"] for table in tables),
+        }
+
+    def shared_arrays(self) -> dict[str, np.ndarray]:
+        """Return the numeric arrays of the engine, by name."""
+        arrays = {
+            "weighted_sv": self.weighted_sv,
+            "sv_bias": self.sv_bias,
+            "feature_weights": self.feature_weights,
+            "dual_coef": self.dual_coef,
+        }
+        for i, group in enumerate(self.groups):
+            arrays[f"table_{i}"] = group["table"]
+        for name, array in self.fallback.shared_arrays().items():
+            arrays[f"fallback.{name}"] = array
+        return arrays
+
+    def attach_arrays(self, arrays: dict[str, np.ndarray]) -> None:
+        """Replace the numeric arrays of the engine, e.g. by shared views."""
+        fallback_arrays = {}
+        for name, array in arrays.items():
+            if name.startswith("fallback."):
+                fallback_arrays[name.removeprefix("fallback.")] = array
+            elif name.startswith("table_"):
+                self.groups[int(name.removeprefix("table_"))]["table"] = array
+            else:
+                setattr(self, name, array)
+        self.fallback.attach_arrays(fallback_arrays)
+
+    def _numeric_kernel(self, features: np.ndarray) -> np.ndarray:
+        """Compute the numeric factor of the kernel, exp(-g ||z_num - c_num||^2)."""
+        numeric = features[:, self.numeric]
+        kernel = numeric @ self.weighted_sv
+        kernel += self.sv_bias
+        kernel -= ((numeric * numeric) @ self.feature_weights)[:, np.newaxis]
+        np.minimum(kernel, 0.0, out=kernel)
+        return np.exp(kernel, out=kernel)
+
+    def decision_function(self, features: np.ndarray) -> np.ndarray:
+        """Compute the SVM decision values of encoded, unscaled features.
+
+        Rows are grouped by combination of categorical values. Each combination
+        folds the product of its table rows into the dual coefficients once,
+        and its rows are then scored against the numeric factor alone.
+
+        Args:
+            features (ndarray): The encoded features, of shape
+                (n_samples, n_features) or (n_features,).
+
+        Returns:
+            ndarray: The decision values, of shape (n_samples,). Positive
+                values stand for the positive class.
+        """
+        features = np.asarray(features, dtype=np.float64)
+        if features.ndim == 1:
+            features = features[np.newaxis]
+
+        codes = features[:, self.categorical]
+        in_vocabulary = (
+            (codes == np.floor(codes)) & (codes >= 0) & (codes < self.vocabulary_sizes)
+        ).all(axis=1)
+
+        scores = np.empty(len(features), dtype=np.float64)
+        if not in_vocabulary.all():
+            scores[~in_vocabulary] = self.fallback.decision_function(
+                features[~in_vocabulary]
+            )
+        rows = np.flatnonzero(in_vocabulary)
+        if not len(rows):
+            return scores
+
+        codes = codes[rows].astype(np.intp)
+        table_rows, start = [], 0
+        for group in self.groups:
+            stop = start + len(group["features"])
+            table_rows.append(
+                np.ravel_multi_index(tuple(codes[:, start:stop].T), group["sizes"])
+            )
+            start = stop
+        combinations = np.ravel_multi_index(
+            tuple(table_rows), [len(group["table"]) for group in self.groups]
+        )
+
+        order = np.argsort(combinations, kind="stable")
+        boundaries = np.flatnonzero(np.diff(combinations[order])) + 1
+        for combination_rows in np.split(order, boundaries):
+            first = combination_rows[0]
+            weights = self.dual_coef.copy()
+            for group, group_rows in zip(self.groups, table_rows):
+                weights *= group["table"][group_rows[first]]
+
+            for start in range(0, len(combination_rows), self.chunk_size):
+                chunk = rows[combination_rows[start : start + self.chunk_size]]
+                scores[chunk] = self._numeric_kernel(features[chunk]) @ weights
+        scores[rows] += self.intercept
+
+        return scores
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Predict the classes of encoded, unscaled features.
+
+        Args:
+            features (ndarray): The encoded features, of shape
+                (n_samples, n_features) or (n_features,).
+
+        Returns:
+            ndarray: The class predictions, of shape (n_samples,).
+        """
+        return self.classes[(self.decision_function(features) > 0).astype(np.intp)]
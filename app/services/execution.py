@@ -0,0 +1,117 @@
+import os
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import numpy as np
+
+
+class ExecutionPolicy:
+    """Decides how a batch of leads is scored: serially, or in chunks on threads.
+
+    NumPy's matrix products and exp, and libsvm, release the GIL, so chunks
+    of one batch can be scored on several cores from one worker process.
+    Small batches are scored serially, as handing them to threads costs more
+    than it saves. BLAS and OpenMP pools are capped at `blas_threads` per
+    process, so that the pool threads, or several worker processes, do not
+    each start one thread per core.
+    """
+
+    def __init__(
+        self,
+        n_threads: int = 1,
+        blas_threads: int | None = 1,
+        parallel_min_rows: int = 4096,
+        chunk_size: int = 512,
+    ):
+        """Configure the execution policy.
+
+        Args:
+            n_threads (int): The number of threads a large batch is scored on,
+                1 to always score serially.
+            blas_threads (int | None): The maximum number of BLAS and OpenMP
+                threads of the process, None to leave them unchanged.
+            parallel_min_rows (int): The smallest batch scored on threads.
+            chunk_size (int): The number of rows of a chunk, sized so that its
+                kernel matrix stays within the CPU caches.
+        """
+        self.n_threads = n_threads
+        self.blas_threads = blas_threads
+        self.parallel_min_rows = parallel_min_rows
+        self.chunk_size = chunk_size
+
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_pool(self) -> ThreadPoolExecutor | None:
+        """Cap the BLAS threads and start the pool, again after a fork."""
+        if self._pid == os.getpid():
+            return self._pool
+        with self._lock:
+            if self._pid != os.getpid():
+                if self.blas_threads is not None:
+                    from threadpoolctl import threadpool_limits
+
+                    threadpool_limits(limits=self.blas_threads)
+                self._pool = None
+                if self.n_threads > 1:
+                    self._pool = ThreadPoolExecutor(
+                        self.n_threads, thread_name_prefix="scoring"
+                    )
+                self._pid = os.getpid()
+        return self._pool
+
+    def is_parallel(self, n_rows: int) -> bool:
+        """Check whether a batch of that many rows is scored on threads."""
+        return self.n_threads > 1 and n_rows >= self.parallel_min_rows
+
+    def map(
+        self, function: Callable[[np.ndarray], np.ndarray], features: np.ndarray
+    ) -> np.ndarray:
+        """Apply a row-wise scoring function to a batch.
+
+        Args:
+            function (Callable[[ndarray], ndarray]): Scores a (n_rows,
+                n_features) matrix and returns one value per row, e.g. an
+                engine's `decision_function` or a model's `predict`. It must be
+                safe to call from several threads at once.
+            features (ndarray): The batch, of shape (n_samples, n_features).
+
+        Returns:
+            ndarray: The values of the rows, in order.
+        """
+        pool = self._ensure_pool()
+        if pool is None or not self.is_parallel(len(features)):
+            return function(features)
+
+        chunks = [
+            features[start : start + self.chunk_size]
+            for start in range(0, len(features), self.chunk_size)
+        ]
+        return np.concatenate(list(pool.map(function, chunks)))
+
+    def stats(self) -> dict:
+        """Return the configuration and the BLAS and OpenMP pools in use.
+
+        Returns:
+            dict: The policy settings, and the number of threads of each
+                native thread pool loaded in the process.
+        """
+        from threadpoolctl import threadpool_info
+
+        return {
+            "n_threads": self.n_threads,
+            "blas_threads": self.blas_threads,
+            "parallel_min_rows": self.parallel_min_rows,
+            "chunk_size": self.chunk_size,
+            "native_pools": [
+                {
+                    "api": info["internal_api"],
+                    "library": os.path.basename(info["filepath"]),
+                    "num_threads": info["num_threads"],
+                }
+                for info in threadpool_info()
+            ],
+        }
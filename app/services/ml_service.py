@@ -1,44 +1,601 @@
-import pandas as pd
+from __future__ import annotations
+
+import heapq
+import json
+import logging
+import threading
+
+from itertools import islice
+from typing import TYPE_CHECKING, Iterable, Iterator
+
 import numpy as np
 from app.utils.constants import (
-    MODEL_PATH,
-    LAST_ACTIVITY_ENCODER_PATH,
-    LAST_NOTABLE_ACTIVITY_ENCODER_PATH,
-    LEAD_SOURCE_ENCODER_PATH,
-    LEAD_ORIGIN_ENCODER_PATH,
-    SCALER_PATH,
+    ADMISSION_ENABLED,
+    ADMISSION_INTERACTIVE_RESERVE,
+    ADMISSION_MAX_CONCURRENCY,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT_MS,
+    INFERENCE_BLAS_THREADS,
+    INFERENCE_CHUNK_SIZE,
+    INFERENCE_PARALLEL_MIN_ROWS,
+    INFERENCE_THREADS,
+    LABELS,
+    MICRO_BATCH_ENABLED,
+    MICRO_BATCH_MAX_SIZE,
+    MICRO_BATCH_MAX_WAIT_MS,
+    MICRO_BATCH_MAX_QUEUE,
+    MICRO_BATCH_TIMEOUT_MS,
+    MODEL_BUNDLE_PATH,
+    MODEL_WATCH_INTERVAL,
+    RANK_CHUNK_SIZE,
+    SCORE_STORE_PATH,
+    STREAM_CHUNK_SIZE,
+    PREDICTION_CACHE_SIZE,
+    PREDICTION_CACHE_TTL,
 )
-from app.utils.functions import load_artifact
-
-model = load_artifact(MODEL_PATH)
-encoders = {
-    "Last Activity": load_artifact(LAST_ACTIVITY_ENCODER_PATH),
-    "Last Notable Activity": load_artifact(LAST_NOTABLE_ACTIVITY_ENCODER_PATH),
-    "Lead Source": load_artifact(LEAD_SOURCE_ENCODER_PATH),
-    "Lead Origin": load_artifact(LEAD_ORIGIN_ENCODER_PATH),
+from app.services.admission import AdmissionController
+from app.services.artifacts import ModelArtifacts
+from app.services.batcher import MicroBatcher
+from app.services.cache import PredictionCache
+from app.services.execution import ExecutionPolicy
+from app.services.calibration import platt_probabilities
+from app.services.registry import ModelRegistry
+from app.services.score_store import ScoreStore, StoredScore, feature_hashes
+from app.utils.metrics import metrics
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Attributes of the loaded artifacts, also readable as module attributes
+_ARTIFACT_ATTRIBUTES = {
+    "model": "model",
+    "encoders": "encoders",
+    "scaler": "scaler",
+    "pipeline": "pipeline",
+    "engine": "engine",
+    "model_version": "version",
 }
-scaler = load_artifact(SCALER_PATH)
+
+execution = ExecutionPolicy(
+    n_threads=INFERENCE_THREADS,
+    blas_threads=INFERENCE_BLAS_THREADS,
+    parallel_min_rows=INFERENCE_PARALLEL_MIN_ROWS,
+    chunk_size=INFERENCE_CHUNK_SIZE,
+)
+
+cache = None
+if PREDICTION_CACHE_SIZE > 0:
+    cache = PredictionCache(PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL)
+
+_score_store = None
+_score_store_lock = threading.Lock()
+
+WARM_UP_LEAD = {
+    "Lead Origin": "Landing Page Submission",
+    "Lead Source": "Google",
+    "Do Not Email": 0,
+    "TotalVisits": 3.0,
+    "Total Time Spent on Website": 300,
+    "Last Activity": "Email Opened",
+    "Through Recommendations": 0,
+    "A free copy of Mastering The Interview": 0,
+    "Last Notable Activity": "Modified",
+}
+
+
+def get_artifacts() -> ModelArtifacts:
+    """Return the served artifacts, loading them on first use.
+
+    Take one snapshot per request and pass it down: the registry may swap in
+    a new version at any time.
+
+    Returns:
+        ModelArtifacts: The artifacts.
+    """
+    return registry.current
+
+
+def warm_up() -> ModelArtifacts:
+    """Load the served artifacts, and run one prediction through them.
+
+    Call it before serving (e.g. at startup or in a prefork master) so that
+    the first request does not pay for loading the model.
+
+    Returns:
+        ModelArtifacts: The artifacts.
+    """
+    artifacts = get_artifacts()
+    logger.info("Model %s warmed up", artifacts.version)
+    return artifacts
+
+
+def get_score_store() -> ScoreStore:
+    """Return the store of lead scores, opening it on first use.
+
+    Returns:
+        ScoreStore: The store at SCORE_STORE_PATH.
+    """
+    global _score_store
+    if _score_store is None:
+        with _score_store_lock:
+            if _score_store is None:
+                _score_store = ScoreStore(SCORE_STORE_PATH)
+    return _score_store
+
+
+def _check_artifacts(artifacts: ModelArtifacts) -> None:
+    """Score a known lead with new artifacts before they are served."""
+    features = artifacts.pipeline.encode(WARM_UP_LEAD)[np.newaxis]
+    prediction = _score(features, artifacts)[0]
+    if prediction not in LABELS.values():
+        raise ValueError(f"Model {artifacts.version} predicted {prediction!r}")
+
+
+def _on_swap(artifacts: ModelArtifacts) -> None:
+    if cache is not None:
+        cache.set_version(artifacts.version)
 
 
-def predict(input_data: pd.DataFrame) -> int:
+def __getattr__(name: str):
+    if name in _ARTIFACT_ATTRIBUTES:
+        return getattr(get_artifacts(), _ARTIFACT_ATTRIBUTES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def predict_batch(
+    input_data: pd.DataFrame, artifacts: ModelArtifacts | None = None
+) -> list[str]:
+    """Make predictions for a batch of leads using the model.
+
+    Encoding, scaling and inference each run once over the whole batch. The
+    input DataFrame is left unchanged.
+
+    Args:
+        input_data (DataFrame): The input data with features, one row per lead.
+        artifacts (ModelArtifacts | None): The artifacts to score with.
+            Defaults to the served ones.
+
+    Returns:
+        list[str]: The class predictions, in the order of the input rows.
+    """
+    if input_data.empty:
+        return []
+
+    artifacts = artifacts or get_artifacts()
+    with metrics.time("encode"):
+        features = np.empty(input_data.shape, dtype=np.float64)
+        for i, key in enumerate(input_data.keys()):
+            if key in artifacts.encoders.keys():  # Categorical features
+                features[:, i] = artifacts.encoders[key].transform(input_data[key])
+            else:
+                features[:, i] = input_data[key].to_numpy(dtype=np.float64)
+
+    return predict_encoded(features, artifacts)
+
+
+def predict_encoded(
+    features: np.ndarray, artifacts: ModelArtifacts | None = None
+) -> list[str]:
+    """Make predictions from encoded features, before scaling.
+
+    When the prediction cache is on, rows are looked up by their encoded
+    values, which are the same whatever the types the client sent (e.g. "0"
+    and 0), and only the misses are scored. Requests still running on a
+    replaced model version bypass the cache.
+
+    Args:
+        features (ndarray): The encoded features, of shape (n_samples, n_features).
+        artifacts (ModelArtifacts | None): The artifacts to score with.
+            Defaults to the served ones.
+
+    Returns:
+        list[str]: The class predictions, in the order of the input rows.
+    """
+    artifacts = artifacts or get_artifacts()
+    if cache is None or cache.version != artifacts.version:
+        return _score(features, artifacts)
+
+    features = np.asarray(features, dtype=np.float64) + 0.0  # Folds -0.0 into 0.0
+    keys = [row.tobytes() for row in features]
+    predictions = [cache.get(key, version=artifacts.version) for key in keys]
+
+    misses = [i for i, prediction in enumerate(predictions) if prediction is None]
+    if misses:
+        for i, prediction in zip(misses, _score(features[misses], artifacts)):
+            predictions[i] = prediction
+            cache.put(keys[i], prediction, artifacts.version)
+
+    return predictions
+
+
+def _score(features: np.ndarray, artifacts: ModelArtifacts) -> list[str]:
+    """Score encoded features with the inference mode of the artifacts."""
+    if artifacts.engine is not None:
+        with metrics.time("inference"):  # The engine folds the scaling in
+            class_predictions = execution.map(artifacts.engine.predict, features)
+    else:
+        with metrics.time("scale"):
+            scaled_features = artifacts.pipeline.scale_features(features.copy())
+        with metrics.time("inference"):
+            class_predictions = execution.map(artifacts.model.predict, scaled_features)
+    assert len(class_predictions) == len(features)
+    assert np.isin(class_predictions, [0, 1]).all()
+
+    return [LABELS[class_prediction] for class_prediction in class_predictions]
+
+
+def decision_scores(
+    features: np.ndarray, artifacts: ModelArtifacts | None = None
+) -> np.ndarray:
+    """Compute the raw SVM decision scores of encoded features, before scaling.
+
+    Positive scores are predicted "Converted", and higher scores are more
+    confidently so.
+
+    Args:
+        features (ndarray): The encoded features, of shape (n_samples, n_features).
+        artifacts (ModelArtifacts | None): The artifacts to score with.
+            Defaults to the served ones.
+
+    Returns:
+        ndarray: The scores, of shape (n_samples,).
+    """
+    artifacts = artifacts or get_artifacts()
+    if artifacts.engine is not None:
+        with metrics.time("inference"):
+            return execution.map(artifacts.engine.decision_function, features)
+
+    with metrics.time("scale"):
+        scaled_features = artifacts.pipeline.scale_features(features.copy())
+    with metrics.time("inference"):
+        return execution.map(artifacts.model.decision_function, scaled_features)
+
+
+def predict_encoded_versioned(
+    features: np.ndarray, artifacts: ModelArtifacts | None = None
+) -> list[tuple[str, str]]:
+    """Make predictions from encoded features, with the version making them.
+
+    Args:
+        features (ndarray): The encoded features, of shape (n_samples, n_features).
+        artifacts (ModelArtifacts | None): The artifacts the features were
+            encoded with. Defaults to the served ones.
+
+    Returns:
+        list[tuple[str, str]]: The class prediction and the model version of
+            each row, in the order of the input rows.
+    """
+    artifacts = artifacts or get_artifacts()
+    predictions = predict_encoded(features, artifacts)
+    return [(prediction, artifacts.version) for prediction in predictions]
+
+
+def predict(input_data: pd.DataFrame) -> str:
     """Make a prediction using the model.
 
     Args:
         input_data (DataFrame): The input data with features.
 
     Returns:
-        int: The class prediction.
+        str: The class prediction.
+    """
+    predictions = predict_batch(input_data)
+    assert len(predictions) == 1
+
+    return predictions[0]
+
+
+def predict_lines(
+    lines: Iterable[str | bytes],
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    id_field: str | None = None,
+    artifacts: ModelArtifacts | None = None,
+) -> Iterator[dict]:
+    """Score newline-delimited JSON leads, chunk by chunk.
+
+    At most `chunk_size` lines are held in memory, so memory use does not
+    depend on the size of the input. Blank lines are skipped.
+
+    Args:
+        lines (Iterable[str | bytes]): The input lines, one JSON lead per line.
+        chunk_size (int): The number of lines scored at once.
+        id_field (str | None): A field to remove from each lead before
+            validation and to copy into its result.
+        artifacts (ModelArtifacts | None): The artifacts to score with, for
+            the whole input. Defaults to the served ones.
+
+    Yields:
+        dict: One result per lead, in input order, holding either the
+            prediction or the error.
+    """
+    artifacts = artifacts or get_artifacts()
+    for results, features, positions in _encode_lines(
+        lines, chunk_size, id_field, artifacts
+    ):
+        if positions:
+            predictions = predict_encoded(features, artifacts)
+            for position, prediction in zip(positions, predictions):
+                results[position]["prediction"] = prediction
+
+        yield from results
+
+
+def _encode_lines(
+    lines: Iterable[str | bytes],
+    chunk_size: int,
+    id_field: str | None,
+    artifacts: ModelArtifacts,
+) -> Iterator[tuple[list[dict], np.ndarray, list[int]]]:
+    """Parse and encode newline-delimited JSON leads, chunk by chunk.
+
+    Yields:
+        tuple[list[dict], ndarray, list[int]]: One result per line of the
+            chunk, holding the id or the error, the encoded features of the
+            valid leads, and their positions in the chunk.
+    """
+    pipeline = artifacts.pipeline
+    lines = (line for line in lines if line.strip())
+    while chunk := list(islice(lines, chunk_size)):
+        results = []
+        features = np.empty((len(chunk), pipeline.n_features), dtype=np.float64)
+        positions = []
+        for position, line in enumerate(chunk):
+            result = {}
+            try:
+                lead = json.loads(line)
+                if not isinstance(lead, dict):
+                    raise ValueError("Expected a JSON object")
+                if id_field is not None:
+                    result[id_field] = lead.pop(id_field, None)
+                features[len(positions)] = pipeline.encode(lead)
+                positions.append(position)
+            except ValueError as e:  # Includes JSONDecodeError
+                result["error"] = str(e)
+            results.append(result)
+
+        yield results, features[: len(positions)], positions
+
+
+def rank_lines(
+    lines: Iterable[str | bytes],
+    k: int,
+    id_field: str | None = None,
+    calibration: tuple[float, float] | None = None,
+    chunk_size: int = RANK_CHUNK_SIZE,
+    artifacts: ModelArtifacts | None = None,
+) -> dict:
+    """Find the K newline-delimited JSON leads most likely to convert.
+
+    Leads are scored chunk by chunk and only the best K are kept, in a
+    min-heap, so neither all the leads nor all the scores are held at once.
+
+    Args:
+        lines (Iterable[str | bytes]): The input lines, one JSON lead per line.
+        k (int): The number of leads returned.
+        id_field (str | None): A field identifying each lead, removed before
+            validation. Without it, leads are identified by their line number,
+            counting non-blank lines from 0.
+        calibration (tuple[float, float] | None): The Platt parameters (a, b)
+            used to add a conversion probability to each returned lead.
+        chunk_size (int): The number of lines scored at once.
+        artifacts (ModelArtifacts | None): The artifacts to score with.
+            Defaults to the served ones.
+
+    Returns:
+        dict: The top leads, best first, each with its id and its decision
+            score (and probability), plus the numbers of scored and invalid
+            leads.
     """
-    for key in input_data.keys():
-        if key in encoders.keys():  # Categorical features
-            input_data[key] = encoders[key].transform(input_data[key])
+    artifacts = artifacts or get_artifacts()
+    heap = []  # (score, -line, id), the worst of the kept leads first
+    n_scored = n_errors = line = 0
+    for results, features, positions in _encode_lines(
+        lines, chunk_size, id_field, artifacts
+    ):
+        n_errors += len(results) - len(positions)
+        if positions and k > 0:
+            scores = decision_scores(features, artifacts)
+            candidates = np.arange(len(scores))
+            if len(candidates) > k:
+                candidates = np.argpartition(scores, -k)[-k:]
+            if len(heap) == k:
+                candidates = candidates[scores[candidates] > heap[0][0]]
 
-    input_data = scaler.transform(input_data)
+            for i in candidates.tolist():
+                position = positions[i]
+                lead_id = results[position][id_field] if id_field else line + position
+                item = (float(scores[i]), -(line + position), lead_id)
+                if len(heap) < k:
+                    heapq.heappush(heap, item)
+                else:
+                    heapq.heappushpop(heap, item)
+
+        n_scored += len(positions)
+        line += len(results)
+
+    leads = []
+    for score, _, lead_id in sorted(heap, reverse=True):
+        leads.append({"id": lead_id, "score": score})
+    if calibration is not None and leads:
+        probabilities = platt_probabilities(
+            [lead["score"] for lead in leads], *calibration
+        )
+        for lead, probability in zip(leads, probabilities.tolist()):
+            lead["probability"] = probability
+
+    return {"leads": leads, "scored": n_scored, "errors": n_errors}
+
+
+def rescore_lines(
+    lines: Iterable[str | bytes],
+    store: ScoreStore,
+    id_field: str,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    artifacts: ModelArtifacts | None = None,
+) -> Iterator[dict]:
+    """Score newline-delimited JSON leads, reusing the stored scores.
+
+    Only the leads whose encoded features or model version differ from the
+    ones of their stored score are scored; the scores of the others are read
+    from the store. New scores are saved chunk by chunk.
+
+    Args:
+        lines (Iterable[str | bytes]): The input lines, one JSON lead per line.
+        store (ScoreStore): The scores of the previous runs.
+        id_field (str): The field holding the lead ID, removed before
+            validation.
+        chunk_size (int): The number of lines scored at once.
+        artifacts (ModelArtifacts | None): The artifacts to score with, for
+            the whole input. Defaults to the served ones.
+
+    Yields:
+        dict: One result per lead, in input order, holding either the error
+            or the prediction, the decision score and whether the lead was
+            scored (`rescored`) or read from the store.
+    """
+    artifacts = artifacts or get_artifacts()
+    for results, features, positions in _encode_lines(
+        lines, chunk_size, id_field, artifacts
+    ):
+        valid = []
+        for i, position in enumerate(positions):
+            if results[position][id_field] is None:
+                results[position] = {"error": f"Missing lead ID field '{id_field}'"}
+            else:
+                valid.append(i)
+        positions = [positions[i] for i in valid]
+        features = features[valid]
+
+        lead_ids = [str(results[position][id_field]) for position in positions]
+        hashes = feature_hashes(features)
+        stored = store.get_many(lead_ids)
+        scores = np.empty(len(positions))
+        changed = []
+        for i, (lead_id, feature_hash) in enumerate(zip(lead_ids, hashes)):
+            previous = stored.get(lead_id)
+            if (
+                previous is None
+                or previous.feature_hash != feature_hash
+                or previous.model_version != artifacts.version
+            ):
+                changed.append(i)
+            else:
+                scores[i] = previous.score
+
+        if changed:
+            scores[changed] = decision_scores(features[changed], artifacts)
+            store.put_many(
+                (lead_ids[i], StoredScore(hashes[i], artifacts.version, float(scores[i])))
+                for i in changed
+            )
+
+        rescored = np.zeros(len(positions), dtype=bool)
+        rescored[changed] = True
+        for position, score, was_rescored in zip(
+            positions, scores.tolist(), rescored.tolist()
+        ):
+            results[position].update(
+                prediction=LABELS[int(score > 0)], score=score, rescored=was_rescored
+            )
+
+        yield from results
+
+
+def sweep_lead(
+    lead: dict, grid: dict[str, np.ndarray], artifacts: ModelArtifacts | None = None
+) -> dict:
+    """Score one lead over a grid of values of its numeric features.
+
+    The lead is validated and encoded once. The grid only changes the numeric
+    columns of the encoded features, so the whole grid is scored in one
+    vectorized pass.
+
+    Args:
+        lead (dict): The input lead. The swept features may be left out.
+        grid (dict[str, ndarray]): The increasing values of each swept
+            feature, one or two of them (see `parse_sweep_grid`).
+        artifacts (ModelArtifacts | None): The artifacts to score with.
+            Defaults to the served ones.
+
+    Returns:
+        dict: The decision surface, with one score per grid point (a list,
+            or a list of rows over the first feature for two features), and
+            the flip thresholds: along each swept feature, the interpolated
+            values where the prediction changes, with the prediction past
+            them.
+
+    Raises:
+        ValueError: If the lead is invalid.
+    """
+    artifacts = artifacts or get_artifacts()
+    pipeline = artifacts.pipeline
+    base = pipeline.encode(
+        {**lead, **{key: float(values[0]) for key, values in grid.items()}}
+    )
+
+    keys = list(grid)
+    axes = np.meshgrid(*grid.values(), indexing="ij")
+    features = np.tile(base, (axes[0].size, 1))
+    for key, axis in zip(keys, axes):
+        features[:, pipeline.feature_names.index(key)] = axis.ravel()
+    scores = decision_scores(features, artifacts).reshape(axes[0].shape)
+
+    if len(keys) == 1:
+        thresholds = {keys[0]: _flips(grid[keys[0]], scores)}
+    else:
+        thresholds = {
+            keys[0]: [_flips(grid[keys[0]], column) for column in scores.T],
+            keys[1]: [_flips(grid[keys[1]], row) for row in scores],
+        }
+    return {
+        "grid": {key: values.tolist() for key, values in grid.items()},
+        "scores": scores.tolist(),
+        "thresholds": thresholds,
+    }
+
+
+def _flips(values: np.ndarray, scores: np.ndarray) -> list[dict]:
+    """Find where the prediction changes along one axis of a sweep.
+
+    The threshold between two grid points is the zero of the decision score
+    interpolated linearly between them.
+    """
+    converted = scores > 0
+    flips = []
+    for i in np.flatnonzero(converted[1:] != converted[:-1]).tolist():
+        fraction = scores[i] / (scores[i] - scores[i + 1])
+        flips.append(
+            {
+                "value": float(values[i] + fraction * (values[i + 1] - values[i])),
+                "prediction": LABELS[int(converted[i + 1])],
+            }
+        )
+    return flips
+
+
+registry = ModelRegistry(
+    MODEL_BUNDLE_PATH, warm_up=_check_artifacts, on_swap=_on_swap
+)
+if MODEL_WATCH_INTERVAL > 0:
+    registry.watch(MODEL_WATCH_INTERVAL)
 
-    class_prediction = model.predict(input_data)
-    assert len(class_prediction) == 1
-    assert class_prediction[0] in [0, 1]
+batcher = None
+if MICRO_BATCH_ENABLED:
+    batcher = MicroBatcher(
+        predict_encoded_versioned,
+        max_batch_size=MICRO_BATCH_MAX_SIZE,
+        max_wait=MICRO_BATCH_MAX_WAIT_MS / 1000,
+        max_queue_size=MICRO_BATCH_MAX_QUEUE,
+        timeout=MICRO_BATCH_TIMEOUT_MS / 1000,
+    )
 
-    if class_prediction[0] == 0:
-        return "Not Converted"
-    return "Converted"
+admission = None
+if ADMISSION_ENABLED:
+    admission = AdmissionController(
+        max_concurrency=ADMISSION_MAX_CONCURRENCY,
+        max_queue_size=ADMISSION_MAX_QUEUE,
+        timeout=ADMISSION_QUEUE_TIMEOUT_MS / 1000,
+        interactive_reserve=ADMISSION_INTERACTIVE_RESERVE,
+    )
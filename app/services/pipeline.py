@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import math
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from app.utils.constants import FEATURE_SCHEMA
+from app.utils.functions import check_feature_value, extract_feature_values
+
+if TYPE_CHECKING:
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+
+class FeaturePipeline:
+    """Feature pipeline compiled once from the fitted encoders and scaler.
+
+    It turns a request dict straight into a scaled float64 feature vector,
+    without building a DataFrame. Categorical and binary values are looked up
+    in precomputed category -> code tables and the scaler is applied with its
+    affine parameters, which gives the same bits as `StandardScaler.transform`.
+
+    Values that miss the lookup tables go through the reference validation in
+    `check_feature_value`, so error messages are unchanged.
+    """
+
+    def __init__(self, encoders: dict[str, LabelEncoder], scaler: StandardScaler):
+        self.encoders = encoders
+        self.feature_names = list(FEATURE_SCHEMA)
+        self.n_features = len(self.feature_names)
+        self.mean = np.ascontiguousarray(scaler.mean_, dtype=np.float64)
+        self.scale = np.ascontiguousarray(scaler.scale_, dtype=np.float64)
+
+        self._columns = []
+        for key, (type, expected_values) in FEATURE_SCHEMA.items():
+            if key in encoders:
+                codes = {
+                    label: float(code)
+                    for code, label in enumerate(encoders[key].classes_)
+                }
+                lookup = {
+                    value: codes[value] for value in expected_values if value in codes
+                }
+            elif expected_values is not None:
+                lookup = {value: float(value) for value in expected_values}
+                lookup.update({str(value): float(value) for value in expected_values})
+            else:
+                lookup = None
+            self._columns.append((key, type, expected_values, lookup))
+
+    def _convert(self, key: str, value, type: str, expected_values) -> float:
+        """Reference conversion, used for values missing from the lookup tables."""
+        check_feature_value(key, value, type, expected_values)
+        if key in self.encoders:
+            return float(self.encoders[key].transform([value])[0])
+        return float(value)
+
+    def encode(self, data: dict) -> np.ndarray:
+        """Validate and encode a lead, without scaling it.
+
+        Args:
+            data (dict): The input data.
+
+        Returns:
+            ndarray: The encoded features, of shape (n_features,).
+
+        Raises:
+            ValueError: If any required feature is missing or invalid.
+        """
+        for key in data:
+            if key not in FEATURE_SCHEMA:
+                extract_feature_values(data)  # Raises the unknown features error
+
+        row = np.empty(self.n_features, dtype=np.float64)
+        for i, (key, type, expected_values, lookup) in enumerate(self._columns):
+            value = data.get(key)
+            if lookup is not None:
+                try:
+                    row[i] = lookup[value]
+                    continue
+                except (KeyError, TypeError):
+                    pass
+            elif (
+                type == "float"
+                and value.__class__ in (int, float)
+                and math.isfinite(value)
+            ) or (type == "int" and value.__class__ is int):
+                row[i] = value
+                continue
+            row[i] = self._convert(key, value, type, expected_values)
+
+        return row
+
+    def encode_columns(self, columns: dict[str, list]) -> np.ndarray:
+        """Encode valid leads sent as one list of values per feature.
+
+        Args:
+            columns (dict[str, list]): The values of each feature, already
+                validated (see `BatchValidator.validate_columns`).
+
+        Returns:
+            ndarray: The encoded features, of shape (n_samples, n_features).
+        """
+        n_samples = len(next(iter(columns.values()), []))
+        features = np.empty((n_samples, self.n_features), dtype=np.float64)
+        for i, (key, type, expected_values, lookup) in enumerate(self._columns):
+            values = columns[key]
+            if lookup is None:
+                features[:, i] = np.asarray(values, dtype=np.float64)
+                continue
+            try:
+                features[:, i] = [lookup[value] for value in values]
+            except (KeyError, TypeError):
+                features[:, i] = [
+                    self._convert(key, value, type, expected_values)
+                    for value in values
+                ]
+        return features
+
+    def check_encoded(self, features: np.ndarray) -> dict[int, str]:
+        """Check features encoded by the client, one column at a time.
+
+        Categorical and binary features must hold one of the codes of their
+        expected values, and numeric features finite numbers.
+
+        Args:
+            features (ndarray): The encoded features, of shape
+                (n_samples, n_features).
+
+        Returns:
+            dict[int, str]: The error message of each invalid row, keyed by
+                its position, for the first invalid feature of the row.
+        """
+        errors = {}
+        for i, (key, _, _, lookup) in enumerate(self._columns):
+            column = features[:, i]
+            if lookup is None:
+                invalid = ~np.isfinite(column)
+                expected = "Expected a finite number."
+            else:
+                codes = sorted(set(lookup.values()))
+                invalid = ~np.isin(column, codes)
+                expected = f"Expected one of: {', '.join(f'{code:g}' for code in codes)}"
+            for position in np.flatnonzero(invalid).tolist():
+                if position not in errors:
+                    errors[position] = (
+                        f"Unexpected value '{column[position]:g}' for feature "
+                        f"'{key}'. {expected}"
+                    )
+        return dict(sorted(errors.items()))
+
+    def scale_features(self, features: np.ndarray) -> np.ndarray:
+        """Apply the scaler in place to encoded features.
+
+        Args:
+            features (ndarray): The encoded features, of shape (n_features,)
+                or (n_samples, n_features).
+
+        Returns:
+            ndarray: The scaled features.
+        """
+        features -= self.mean
+        features /= self.scale
+        return features
+
+    def transform(self, data: dict) -> np.ndarray:
+        """Validate, encode and scale a lead.
+
+        Args:
+            data (dict): The input data.
+
+        Returns:
+            ndarray: The scaled features, of shape (n_features,).
+
+        Raises:
+            ValueError: If any required feature is missing or invalid.
+        """
+        return self.scale_features(self.encode(data))
+
+    def transform_many(self, data: list[dict]) -> np.ndarray:
+        """Validate, encode and scale several leads.
+
+        Args:
+            data (list[dict]): The input leads.
+
+        Returns:
+            ndarray: The scaled features, of shape (n_samples, n_features).
+
+        Raises:
+            ValueError: If any lead is invalid.
+        """
+        features = np.empty((len(data), self.n_features), dtype=np.float64)
+        for i, lead in enumerate(data):
+            features[i] = self.encode(lead)
+        return self.scale_features(features)
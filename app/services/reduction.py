@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import copy
+import pickle
+import time
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from app.services.engine import FusedSVMEngine, _unwrap_svc
+
+if TYPE_CHECKING:
+    from sklearn.model_selection import GridSearchCV
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.svm import SVC
+
+
+def merge_support_vectors(
+    support_vectors: np.ndarray, dual_coef: np.ndarray, radius: float = 0.0
+) -> tuple[np.ndarray, np.ndarray]:
+    """Merge duplicate and near-duplicate support vectors.
+
+    Identical support vectors are merged into one whose coefficient is the
+    sum of theirs, which leaves the decision function unchanged; those of
+    opposite classes cancel out. With a radius, support vectors of the same
+    class falling in the same cell of a grid of that step, in the scaled
+    space, are then merged into their coefficient-weighted mean. The kernel
+    values against nearby points barely differ, so the decision function
+    barely changes.
+
+    Args:
+        support_vectors (ndarray): The support vectors, in the scaled space.
+        dual_coef (ndarray): Their dual coefficients, of shape (n_support,).
+        radius (float): The grid step, 0 to only merge identical vectors.
+
+    Returns:
+        tuple[ndarray, ndarray]: The merged support vectors and coefficients.
+    """
+    support_vectors, dual_coef = _merge_groups(
+        support_vectors, dual_coef, np.round(support_vectors, 9)
+    )
+    if radius > 0:
+        keys = np.column_stack(
+            [np.floor(support_vectors / radius), np.sign(dual_coef)]
+        )
+        support_vectors, dual_coef = _merge_groups(support_vectors, dual_coef, keys)
+    return support_vectors, dual_coef
+
+
+def _merge_groups(
+    support_vectors: np.ndarray, dual_coef: np.ndarray, keys: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Merge the support vectors sharing a key, dropping null coefficients."""
+    _, groups = np.unique(keys, axis=0, return_inverse=True)
+    groups = groups.ravel()
+    weights = np.abs(dual_coef)
+    total_weights = np.bincount(groups, weights=weights)
+    merged = np.column_stack(
+        [
+            np.bincount(groups, weights=weights * column) / total_weights
+            for column in support_vectors.T
+        ]
+    )
+    merged_coef = np.bincount(groups, weights=dual_coef)
+    keep = np.abs(merged_coef) > 1e-12
+    return merged[keep], merged_coef[keep]
+
+
+def prune_support_vectors(
+    support_vectors: np.ndarray, dual_coef: np.ndarray, threshold: float = 0.0
+) -> tuple[np.ndarray, np.ndarray]:
+    """Drop the support vectors with negligible dual coefficients.
+
+    Args:
+        support_vectors (ndarray): The support vectors.
+        dual_coef (ndarray): Their dual coefficients, of shape (n_support,).
+        threshold (float): The smallest absolute coefficient kept, as a share
+            of the largest one.
+
+    Returns:
+        tuple[ndarray, ndarray]: The kept support vectors and coefficients.
+    """
+    keep = np.abs(dual_coef) >= threshold * np.abs(dual_coef).max()
+    return support_vectors[keep], dual_coef[keep]
+
+
+def reduce_model(
+    model: GridSearchCV | SVC, merge_radius: float = 0.0, prune_below: float = 0.0
+) -> GridSearchCV | SVC:
+    """Build a copy of the model with fewer support vectors.
+
+    Args:
+        model (GridSearchCV | SVC): The fitted RBF SVC, or a search wrapping it.
+        merge_radius (float): See `merge_support_vectors`.
+        prune_below (float): See `prune_support_vectors`.
+
+    Returns:
+        GridSearchCV | SVC: The reduced model, of the type of `model`.
+    """
+    svc = _unwrap_svc(model)
+    support_vectors, dual_coef = prune_support_vectors(
+        svc.support_vectors_, svc.dual_coef_[0], prune_below
+    )
+    support_vectors, dual_coef = merge_support_vectors(
+        support_vectors, dual_coef, merge_radius
+    )
+
+    reduced_svc = _with_support_vectors(svc, support_vectors, dual_coef)
+    if model is svc:
+        return reduced_svc
+    reduced = copy.copy(model)
+    reduced.best_estimator_ = reduced_svc
+    return reduced
+
+
+def _with_support_vectors(
+    svc: SVC, support_vectors: np.ndarray, dual_coef: np.ndarray
+) -> SVC:
+    """Copy a fitted binary SVC, replacing its support vectors.
+
+    libsvm expects the support vectors grouped by class, the negative class
+    first; the coefficients of the negative class are negative. `support_`
+    no longer indexes training rows and is set to positions.
+    """
+    order = np.argsort(dual_coef > 0, kind="stable")
+    support_vectors, dual_coef = support_vectors[order], dual_coef[order]
+    n_negative = int(np.sum(dual_coef < 0))
+
+    reduced = copy.deepcopy(svc)
+    reduced.support_vectors_ = np.ascontiguousarray(support_vectors, dtype=np.float64)
+    reduced.dual_coef_ = np.ascontiguousarray(dual_coef[np.newaxis], dtype=np.float64)
+    reduced._dual_coef_ = -reduced.dual_coef_  # libsvm's sign for binary models
+    reduced._n_support = np.array(
+        [n_negative, len(dual_coef) - n_negative], dtype=np.int32
+    )
+    reduced.support_ = np.arange(len(dual_coef), dtype=np.int32)
+    return reduced
+
+
+def reduction_report(
+    original: GridSearchCV | SVC,
+    reduced: GridSearchCV | SVC,
+    scaler: StandardScaler,
+    features: np.ndarray,
+    batch_sizes: tuple[int, ...] = (1, 10, 100, 1000),
+    repeats: int = 5,
+) -> dict:
+    """Compare a reduced model with the original one.
+
+    Args:
+        original (GridSearchCV | SVC): The original model.
+        reduced (GridSearchCV | SVC): The reduced model.
+        scaler (StandardScaler): The fitted scaler.
+        features (ndarray): Encoded leads, unscaled, to compare predictions
+            on and time scoring with.
+        batch_sizes (tuple[int, ...]): The batch sizes timed.
+        repeats (int): The number of timings per batch size, of which the
+            best is kept.
+
+    Returns:
+        dict: For each model, the number of support vectors, the bytes of its
+            support vectors and coefficients, the bytes of the pickled model
+            and the scoring time per batch size (in ms) of the "sklearn" and
+            "fused" inference modes; and the share of the leads on which
+            their predictions disagree.
+    """
+    scaled = (features - scaler.mean_) / scaler.scale_
+    report = {}
+    for name, model in (("original", original), ("reduced", reduced)):
+        svc = _unwrap_svc(model)
+        engine = FusedSVMEngine.from_artifacts(model, scaler)
+        latency = {"sklearn": {}, "fused": {}}
+        for batch_size in batch_sizes:
+            latency["sklearn"][batch_size] = _best_time(
+                lambda: model.predict(scaled[:batch_size]), repeats
+            )
+            latency["fused"][batch_size] = _best_time(
+                lambda: engine.predict(features[:batch_size]), repeats
+            )
+        report[name] = {
+            "n_support_vectors": len(svc.support_vectors_),
+            "support_vector_bytes": svc.support_vectors_.nbytes
+            + svc.dual_coef_.nbytes
+            + svc._dual_coef_.nbytes
+            + svc.support_.nbytes,
+            "pickled_bytes": len(pickle.dumps(model)),
+            "latency_ms": latency,
+        }
+
+    report["disagreement"] = float(
+        np.mean(original.predict(scaled) != reduced.predict(scaled))
+    )
+    report["n_leads"] = len(features)
+    return report
+
+
+def _best_time(function, repeats: int) -> float:
+    """Return the best wall time of a function over some runs, in ms."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
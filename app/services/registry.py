@@ -0,0 +1,195 @@
+import logging
+import os
+import threading
+
+from typing import Callable
+
+from app.utils.constants import MODEL_BUNDLES_DIR
+from app.services.artifacts import ModelArtifacts, find_latest_bundle, load_artifacts
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """Holds the served artifacts and swaps in new versions without downtime.
+
+    A new version is loaded, validated and warmed up while the current one
+    keeps serving, then published with a single reference assignment.
+    Callers take one snapshot with `current` per request and use it until
+    they are done, so in-flight requests finish on the version they started
+    with. A version that fails to load or to warm up is never published.
+    """
+
+    def __init__(
+        self,
+        bundle_path: str | None = None,
+        bundles_dir: str = MODEL_BUNDLES_DIR,
+        warm_up: Callable[[ModelArtifacts], None] | None = None,
+        on_swap: Callable[[ModelArtifacts], None] | None = None,
+        loader: Callable[..., ModelArtifacts] = load_artifacts,
+    ):
+        """Configure the registry. Nothing is loaded until first use.
+
+        Args:
+            bundle_path (str | None): The bundle served first. Defaults to
+                the newest bundle, see `load_artifacts`.
+            bundles_dir (str): The directory searched for newer bundles by
+                `reload` and the watcher.
+            warm_up (Callable[[ModelArtifacts], None] | None): Runs a
+                prediction through new artifacts, raising if it fails.
+            on_swap (Callable[[ModelArtifacts], None] | None): Called with
+                the new artifacts once they are served.
+            loader (Callable[..., ModelArtifacts]): Loads a bundle, or the
+                default artifacts when given None.
+        """
+        self.bundle_path = bundle_path
+        self.bundles_dir = bundles_dir
+        self.warm_up = warm_up
+        self.on_swap = on_swap
+        self.loader = loader
+
+        self._current = None
+        self._load_lock = threading.Lock()
+        self._watcher = None
+        self._watcher_lock = threading.Lock()
+        self._failed_bundle = None
+        self._watch_interval = None
+        self._stop = threading.Event()
+
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.last_error = None
+
+    @property
+    def current(self) -> ModelArtifacts:
+        """The served artifacts, loaded on first use."""
+        current = self._current
+        if current is None:
+            with self._load_lock:
+                if self._current is None:
+                    self._publish(self._load(self.bundle_path))
+                current = self._current
+        if self._watch_interval is not None:
+            self._ensure_watcher()
+        return current
+
+    def _load(self, bundle_path: str | None) -> ModelArtifacts:
+        artifacts = self.loader(bundle_path)
+        if self.warm_up is not None:
+            self.warm_up(artifacts)
+        return artifacts
+
+    def _publish(self, artifacts: ModelArtifacts) -> None:
+        self._current = artifacts  # Atomic: readers see the old or the new one
+        if self.on_swap is not None:
+            self.on_swap(artifacts)
+
+    def reload(self, bundle_path: str | None = None) -> ModelArtifacts:
+        """Load a version and serve it once it is validated and warmed up.
+
+        Args:
+            bundle_path (str | None): The bundle to serve. Defaults to the
+                newest bundle of `bundles_dir`.
+
+        Returns:
+            ModelArtifacts: The served artifacts, unchanged if the version
+                is already served.
+
+        Raises:
+            FileNotFoundError: If there is no bundle to load.
+            ValueError: If the bundle does not match its manifest.
+            Exception: Whatever the loading or the warm-up raised. The
+                current version keeps serving.
+        """
+        with self._load_lock:
+            if bundle_path is None:
+                bundle_path = find_latest_bundle(self.bundles_dir)
+                if bundle_path is None:
+                    raise FileNotFoundError(f"No model bundle in {self.bundles_dir}")
+
+            current = self._current
+            if current is not None and _same_path(current.directory, bundle_path):
+                return current
+
+            try:
+                artifacts = self._load(bundle_path)
+            except Exception as e:
+                self.failed_reloads += 1
+                self.last_error = f"{bundle_path}: {e}"
+                self._failed_bundle = bundle_path
+                logger.exception("Could not load model bundle %s", bundle_path)
+                raise
+
+            self._publish(artifacts)
+            self.reloads += 1
+            self.last_error = self._failed_bundle = None
+            logger.info(
+                "Serving model %s (was %s)",
+                artifacts.version,
+                current.version if current is not None else None,
+            )
+            return artifacts
+
+    def watch(self, interval: float) -> None:
+        """Poll `bundles_dir` and reload whenever a newer bundle appears.
+
+        The polling thread starts with the next access to `current`, and
+        again after a fork, as threads do not survive one.
+
+        Args:
+            interval (float): The time, in seconds, between two polls.
+        """
+        self._watch_interval = interval
+        self._stop.clear()
+
+    def stop(self) -> None:
+        """Stop watching `bundles_dir`."""
+        self._watch_interval = None
+        self._stop.set()
+
+    def _ensure_watcher(self) -> None:
+        if self._watcher is None or not self._watcher.is_alive():
+            with self._watcher_lock:
+                if self._watcher is None or not self._watcher.is_alive():
+                    self._watcher = threading.Thread(
+                        target=self._watch, name="model-watcher", daemon=True
+                    )
+                    self._watcher.start()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self._watch_interval or 0):
+            latest = find_latest_bundle(self.bundles_dir)
+            current = self._current
+            if latest is None or (
+                current is not None and _same_path(current.directory, latest)
+            ):
+                continue
+            if latest == self._failed_bundle:
+                continue  # Already failed, wait for another bundle
+            try:
+                self.reload(latest)
+            except Exception:
+                pass  # Logged by reload, the current version keeps serving
+
+    def stats(self) -> dict:
+        """Return the served version and the reload counters.
+
+        Returns:
+            dict: The version, the bundle, the inference mode served, the
+                reloads, the failed reloads and the last error.
+        """
+        current = self._current
+        return {
+            "version": current.version if current is not None else None,
+            "bundle": current.directory if current is not None else None,
+            "inference_mode": current.inference_mode if current is not None else None,
+            "reloads": self.reloads,
+            "failed_reloads": self.failed_reloads,
+            "last_error": self.last_error,
+        }
+
+
+def _same_path(a: str | None, b: str | None) -> bool:
+    if a is None or b is None:
+        return False
+    return os.path.realpath(a) == os.path.realpath(b)
@@ -0,0 +1,124 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+from typing import Iterable, NamedTuple
+
+import numpy as np
+
+# SQLite limits the number of parameters of a statement
+_LOOKUP_BATCH_SIZE = 500
+
+
+class StoredScore(NamedTuple):
+    """The last score of a lead, and what it was computed from."""
+
+    feature_hash: bytes
+    model_version: str
+    score: float
+
+
+def feature_hashes(features: np.ndarray) -> list[bytes]:
+    """Hash each row of encoded features.
+
+    Rows are hashed by their float64 bits, so leads sent with different
+    types but the same values (e.g. "0" and 0) hash alike.
+
+    Args:
+        features (ndarray): The encoded features, of shape (n_samples, n_features).
+
+    Returns:
+        list[bytes]: A 16-byte digest per row.
+    """
+    features = np.ascontiguousarray(features, dtype=np.float64) + 0.0  # Folds -0.0
+    return [hashlib.blake2b(row.tobytes(), digest_size=16).digest() for row in features]
+
+
+class ScoreStore:
+    """SQLite store of the last decision score of each lead, by lead ID.
+
+    Each score is saved with the hash of the encoded features and the model
+    version it was computed from, so that a lead is rescored only when one
+    of them changes. The store can be shared by threads; several processes
+    may open the same file.
+    """
+
+    def __init__(self, path: str):
+        """Open the store, creating it if needed.
+
+        Args:
+            path (str): The SQLite database file, or ":memory:".
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._connection:
+            if path != ":memory:":
+                self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS scores ("
+                "lead_id TEXT PRIMARY KEY, "
+                "feature_hash BLOB NOT NULL, "
+                "model_version TEXT NOT NULL, "
+                "score REAL NOT NULL, "
+                "updated_at REAL NOT NULL)"
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def get(self, lead_id: str) -> StoredScore | None:
+        """Return the stored score of a lead.
+
+        Args:
+            lead_id (str): The lead ID.
+
+        Returns:
+            StoredScore | None: The score, or None if the lead was never scored.
+        """
+        return self.get_many([lead_id]).get(lead_id)
+
+    def get_many(self, lead_ids: list[str]) -> dict[str, StoredScore]:
+        """Return the stored scores of several leads.
+
+        Args:
+            lead_ids (list[str]): The lead IDs.
+
+        Returns:
+            dict[str, StoredScore]: The scores of the leads found, by lead ID.
+        """
+        found = {}
+        with self._lock:
+            for start in range(0, len(lead_ids), _LOOKUP_BATCH_SIZE):
+                batch = lead_ids[start : start + _LOOKUP_BATCH_SIZE]
+                rows = self._connection.execute(
+                    "SELECT lead_id, feature_hash, model_version, score FROM scores "
+                    f"WHERE lead_id IN ({', '.join('?' * len(batch))})",
+                    batch,
+                )
+                for lead_id, feature_hash, model_version, score in rows:
+                    found[lead_id] = StoredScore(feature_hash, model_version, score)
+        return found
+
+    def put_many(self, scores: Iterable[tuple[str, StoredScore]]) -> None:
+        """Save the scores of several leads, in one transaction.
+
+        Args:
+            scores (Iterable[tuple[str, StoredScore]]): The lead IDs and their
+                new scores.
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO scores "
+                "(lead_id, feature_hash, model_version, score, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(lead_id, *stored, now) for lead_id, stored in scores],
+            )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
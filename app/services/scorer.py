@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import os
+
+from itertools import islice
+from typing import Iterable, Iterator, Mapping, NamedTuple
+
+import numpy as np
+
+from app.services.artifacts import MANIFEST_NAME, ModelArtifacts
+from app.utils.constants import LABELS
+
+
+class LeadScore(NamedTuple):
+    """The outcome of scoring one lead."""
+
+    prediction: str | None  # None when the lead is invalid
+    score: float | None  # The SVM decision value, positive for "Converted"
+    error: str | None = None
+
+
+class LeadScorer:
+    """Score leads in-process, without the HTTP service.
+
+    The artifacts are loaded once, from an explicit location, and nothing is
+    shared with the service: no global model, cache, micro-batcher or
+    metrics. A scorer only holds read-only state, so one instance can be
+    shared by any number of threads, and its methods can be called
+    re-entrantly, e.g. from inside a `score_many` loop. Caller data is only
+    read: leads are neither copied nor modified, and `score_array` reads the
+    caller's array in place.
+
+    Example:
+        scorer = LeadScorer("artifacts/bundles/20240101000000-abcdef")
+        for lead, result in zip(leads, scorer.score_many(leads)):
+            ...
+    """
+
+    def __init__(
+        self,
+        path: str,
+        inference_mode: str = "fused",
+        storage: str = "joblib",
+        chunk_size: int = 1024,
+    ):
+        """Load the artifacts.
+
+        Args:
+            path (str): A model bundle directory (see app/bundle.py), a
+                compact model file (see app/export_compact.py), or a directory
+                holding the separate artifact files, named as in `artifacts/`.
+            inference_mode (str): One of INFERENCE_MODES, see
+                ModelArtifacts. A compact model file serves "fused" or
+                "factorized".
+            storage (str): "joblib" or "mmap", see ARTIFACT_STORAGE.
+            chunk_size (int): The number of leads `score_many` scores at once.
+
+        Raises:
+            FileNotFoundError: If the artifacts are missing.
+            ValueError: If the bundle does not match its manifest, or the
+                inference mode is not available for a compact model file.
+        """
+        if os.path.isfile(path):
+            self.artifacts = ModelArtifacts.from_compact(
+                path, inference_mode=inference_mode, storage=storage
+            )
+        elif os.path.isfile(os.path.join(path, MANIFEST_NAME)):
+            self.artifacts = ModelArtifacts.from_bundle(
+                path, inference_mode=inference_mode, storage=storage
+            )
+        else:
+            self.artifacts = ModelArtifacts.from_legacy_files(
+                path, inference_mode=inference_mode, storage=storage
+            )
+        self.chunk_size = chunk_size
+
+    @property
+    def version(self) -> str:
+        """The version of the loaded artifacts."""
+        return self.artifacts.version
+
+    def score_one(self, lead: Mapping) -> LeadScore:
+        """Score one lead.
+
+        Args:
+            lead (Mapping): The lead, as sent to /predict.
+
+        Returns:
+            LeadScore: The prediction and the decision score.
+
+        Raises:
+            ValueError: If any required feature is missing or invalid.
+        """
+        features = self.artifacts.pipeline.encode(lead)[np.newaxis]
+        score = float(self._decision_function(features)[0])
+        return LeadScore(LABELS[int(score > 0)], score)
+
+    def score_many(self, leads: Iterable[Mapping]) -> Iterator[LeadScore]:
+        """Score leads lazily, chunk by chunk, in input order.
+
+        At most `chunk_size` leads are read ahead of the results, so any
+        iterable can be scored, e.g. a generator over a Kafka topic. An
+        invalid lead does not stop the iteration: its result holds the error.
+
+        Args:
+            leads (Iterable[Mapping]): The leads, as sent to /predict.
+
+        Yields:
+            LeadScore: One result per lead.
+        """
+        pipeline = self.artifacts.pipeline
+        leads = iter(leads)
+        while chunk := list(islice(leads, self.chunk_size)):
+            features = np.empty((len(chunk), pipeline.n_features), dtype=np.float64)
+            errors = {}
+            n_valid = 0
+            for position, lead in enumerate(chunk):
+                if not isinstance(lead, Mapping):
+                    errors[position] = "Expected a mapping"
+                    continue
+                try:
+                    features[n_valid] = pipeline.encode(lead)
+                    n_valid += 1
+                except ValueError as e:
+                    errors[position] = str(e)
+
+            scores = iter(self._decision_function(features[:n_valid]).tolist())
+            for position in range(len(chunk)):
+                if position in errors:
+                    yield LeadScore(None, None, errors[position])
+                else:
+                    score = next(scores)
+                    yield LeadScore(LABELS[int(score > 0)], score)
+
+    def score_array(self, features: np.ndarray) -> np.ndarray:
+        """Score encoded features, as sent in a .npy body to /predict.
+
+        Args:
+            features (ndarray): The encoded features, unscaled, of shape
+                (n_samples, n_features), with label codes for the categorical
+                features. It is read in place when it is float64.
+
+        Returns:
+            ndarray: The decision scores, of shape (n_samples,). Leads with a
+                positive score are predicted "Converted".
+
+        Raises:
+            ValueError: If the array does not have n_features columns, or holds
+                an invalid code or a non-finite value.
+        """
+        pipeline = self.artifacts.pipeline
+        features = np.asarray(features)
+        if features.ndim != 2 or features.shape[1] != pipeline.n_features:
+            raise ValueError(
+                f"Expected an array of shape (n, {pipeline.n_features}), "
+                f"got {features.shape}"
+            )
+        errors = pipeline.check_encoded(features)
+        if errors:
+            position, message = next(iter(errors.items()))
+            raise ValueError(f"Row {position}: {message}")
+        return self._decision_function(features)
+
+    def _decision_function(self, features: np.ndarray) -> np.ndarray:
+        """Compute the decision scores of encoded features, without modifying them."""
+        artifacts = self.artifacts
+        if len(features) == 0:
+            return np.empty(0)
+        if artifacts.engine is not None:
+            return artifacts.engine.decision_function(features)
+        pipeline = artifacts.pipeline
+        scaled = (features - pipeline.mean) / pipeline.scale
+        return artifacts.model.decision_function(scaled)
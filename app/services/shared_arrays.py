@@ -0,0 +1,160 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"LEADARR1"
+ALIGNMENT = 64
+
+# Numeric attributes of the sklearn artifacts moved into the shared file, by class
+SHARED_ATTRIBUTES = {
+    "SVC": (
+        "support_vectors_",
+        "support_",
+        "dual_coef_",
+        "_dual_coef_",
+        "intercept_",
+        "_intercept_",
+    ),
+    "StandardScaler": ("mean_", "scale_", "var_"),
+}
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def save_arrays(path: str, arrays: dict[str, np.ndarray], version: str) -> None:
+    """Write arrays into a single file that can be memory-mapped.
+
+    The file holds a magic string, the length of a JSON header describing
+    the arrays, the header, then the raw C-ordered arrays, each aligned to 64
+    bytes. It is written to a temporary file and renamed, so concurrent
+    readers never see a partial file.
+
+    Args:
+        path (str): The file to write.
+        arrays (dict[str, ndarray]): The arrays, by name.
+        version (str): The version of the artifacts the arrays come from.
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    header = {"version": version, "arrays": {}}
+    offset = 0
+    for name, array in arrays.items():
+        header["arrays"][name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+        }
+        offset = _aligned(offset + array.nbytes)
+
+    header_bytes = json.dumps(header).encode()
+    data_start = _aligned(len(MAGIC) + 8 + len(header_bytes))
+
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(header_bytes)) + header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + header["arrays"][name]["offset"])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(temporary_path, path)
+
+
+def load_arrays(path: str) -> tuple[str, dict[str, np.ndarray]]:
+    """Memory-map the arrays of a file written by `save_arrays`.
+
+    The arrays are read-only views of one shared mapping, so every process
+    mapping the same file shares the same physical pages.
+
+    Args:
+        path (str): The file to map.
+
+    Returns:
+        tuple[str, dict[str, ndarray]]: The version and the arrays, by name.
+
+    Raises:
+        ValueError: If the file is not an array file.
+    """
+    buffer = np.memmap(path, dtype=np.uint8, mode="r")
+    if bytes(buffer[: len(MAGIC)]) != MAGIC:
+        raise ValueError(f"'{path}' is not a shared array file")
+
+    (header_length,) = struct.unpack("<Q", bytes(buffer[len(MAGIC) : len(MAGIC) + 8]))
+    header_end = len(MAGIC) + 8 + header_length
+    header = json.loads(bytes(buffer[len(MAGIC) + 8 : header_end]))
+    data_start = _aligned(header_end)
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        start = data_start + spec["offset"]
+        size = int(np.prod(spec["shape"])) * dtype.itemsize
+        arrays[name] = buffer[start : start + size].view(dtype).reshape(spec["shape"])
+
+    return header["version"], arrays
+
+
+def _owner_arrays(owner) -> dict[str, np.ndarray]:
+    if hasattr(owner, "shared_arrays"):
+        return owner.shared_arrays()
+    names = SHARED_ATTRIBUTES[type(owner).__name__]
+    return {name: getattr(owner, name) for name in names}
+
+
+def _attach(owner, arrays: dict[str, np.ndarray]) -> None:
+    if hasattr(owner, "attach_arrays"):
+        owner.attach_arrays(arrays)
+    else:
+        for name, array in arrays.items():
+            setattr(owner, name, array)
+
+
+def share_arrays(path: str, version: str, owners: dict[str, object]) -> int:
+    """Move the numeric arrays of loaded artifacts into a shared mapped file.
+
+    The file is (re)written when it is missing or was built from other
+    artifacts, then the arrays of every owner are replaced by read-only views
+    of the mapping.
+
+    Args:
+        path (str): The shared array file.
+        version (str): The version of the loaded artifacts.
+        owners (dict[str, object]): The artifacts and engines, by name. They
+            are SVC or StandardScaler instances, or objects with
+            `shared_arrays` and `attach_arrays` methods.
+
+    Returns:
+        int: The number of bytes now shared.
+    """
+    arrays = {}
+    for prefix, owner in owners.items():
+        for name, array in _owner_arrays(owner).items():
+            arrays[f"{prefix}.{name}"] = np.asarray(array)
+
+    try:
+        file_version, mapped = load_arrays(path)
+    except (FileNotFoundError, ValueError):
+        file_version, mapped = None, {}
+
+    up_to_date = file_version == version and all(
+        name in mapped
+        and mapped[name].dtype == array.dtype
+        and mapped[name].shape == array.shape
+        for name, array in arrays.items()
+    )
+    if not up_to_date:
+        save_arrays(path, arrays, version)
+        _, mapped = load_arrays(path)
+
+    for prefix, owner in owners.items():
+        _attach(
+            owner,
+            {
+                name: mapped[f"{prefix}.{name}"]
+                for name in _owner_arrays(owner)
+            },
+        )
+
+    return sum(mapped[name].nbytes for name in arrays)
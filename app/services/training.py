@@ -0,0 +1,572 @@
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.metrics.pairwise import euclidean_distances
+from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.svm import SVC
+
+from app.utils.constants import FEATURE_NAMES, FEATURE_SCHEMA
+
+TARGET = "Converted"
+
+# The SVC grid of Lead_Prediction.ipynb
+SVC_PARAM_GRID = {
+    "C": [0.1, 1, 10],
+    "kernel": ["linear", "rbf", "poly"],
+    "gamma": ["scale", "auto"],
+}
+SEARCH_STRATEGIES = ("grid", "halving")
+
+# The parameters each kernel of the SVC depends on
+KERNEL_PARAMS = {
+    "linear": (),
+    "rbf": ("gamma",),
+    "poly": ("gamma", "degree", "coef0"),
+    "sigmoid": ("gamma", "coef0"),
+}
+
+# The matrix each kernel is computed from, which none of its parameters change
+KERNEL_BASES = {
+    "linear": "dot",
+    "rbf": "sqeuclidean",
+    "poly": "dot",
+    "sigmoid": "dot",
+}
+
+CATEGORICAL_FEATURES = [
+    name for name, (kind, _) in FEATURE_SCHEMA.items() if kind == "str"
+]
+BINARY_FEATURES = [
+    name for name, (_, expected_values) in FEATURE_SCHEMA.items()
+    if expected_values == [0, 1]
+]
+BINARY_LABELS = {"No": 0, "Yes": 1}
+
+
+class TrainingResult(NamedTuple):
+    """The fitted artifacts of a training run, and its report."""
+
+    model: GridSearchCV
+    encoders: dict[str, LabelEncoder]
+    scaler: StandardScaler
+    report: dict
+
+
+def _group_rare(values: pd.Series) -> pd.Series:
+    """Replace the values held by less than 1% of the leads with "Other"."""
+    shares = values.value_counts(normalize=True).mul(100).round(2)
+    return values.replace(shares[shares.lt(1)].index.tolist(), "Other")
+
+
+def clean_leads(frame: pd.DataFrame) -> pd.DataFrame:
+    """Clean raw leads the way Lead_Prediction.ipynb does.
+
+    "Select" is a missing value. Missing lead sources are "Google" and
+    missing last activities "Email Opened"; missing visit counts are the
+    median. Leads above the 99.5th percentile of TotalVisits, then of Page
+    Views Per Visit (when the column is present), are dropped. Lead sources,
+    last activities and last notable activities held by less than 1% of the
+    leads become "Other", and "Yes"/"No" become 1/0.
+
+    Args:
+        frame (DataFrame): The raw leads, with the columns of FEATURE_SCHEMA
+            and "Converted".
+
+    Returns:
+        DataFrame: The features of FEATURE_SCHEMA and "Converted" of the kept
+            leads, not encoded yet.
+
+    Raises:
+        ValueError: If a column is missing.
+    """
+    missing = [name for name in [*FEATURE_NAMES, TARGET] if name not in frame]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    leads = frame.replace("Select", np.nan)
+    leads["Lead Source"] = _group_rare(
+        leads["Lead Source"].replace("google", "Google").fillna("Google")
+    )
+    visit_columns = [
+        name for name in ("TotalVisits", "Page Views Per Visit") if name in leads
+    ]
+    for name in visit_columns:
+        leads[name] = leads[name].fillna(leads[name].median())
+    leads["Last Activity"] = _group_rare(leads["Last Activity"].fillna("Email Opened"))
+    for name in visit_columns:
+        leads = leads[leads[name] <= leads[name].quantile(0.995)]
+
+    leads = leads[[*FEATURE_NAMES, TARGET]].copy()
+    leads["Lead Origin"] = leads["Lead Origin"].replace(
+        "Quick Add Form", "Lead Add Form"
+    )
+    leads["Last Notable Activity"] = _group_rare(leads["Last Notable Activity"])
+    for name in BINARY_FEATURES:
+        leads[name] = leads[name].map(lambda value: BINARY_LABELS.get(value, value))
+    return leads.astype({name: int for name in [*BINARY_FEATURES, TARGET]}).reset_index(
+        drop=True
+    )
+
+
+def fit_preprocessing(
+    leads: pd.DataFrame,
+) -> tuple[dict[str, LabelEncoder], StandardScaler, np.ndarray]:
+    """Fit the encoders and the scaler on cleaned leads.
+
+    As in the notebook, the scaler is fitted on all the leads, before they
+    are split into training and test sets.
+
+    Args:
+        leads (DataFrame): The leads returned by `clean_leads`.
+
+    Returns:
+        tuple[dict[str, LabelEncoder], StandardScaler, ndarray]: The encoder
+            of each categorical feature, the scaler, and the scaled features.
+    """
+    features = leads[FEATURE_NAMES].copy()
+    encoders = {}
+    for name in CATEGORICAL_FEATURES:
+        encoders[name] = LabelEncoder()
+        features[name] = encoders[name].fit_transform(features[name])
+    scaler = StandardScaler()
+    return encoders, scaler, scaler.fit_transform(features)
+
+
+class KernelCache:
+    """The kernel matrices of a training set, shared by the fits of a search.
+
+    Kernels are computed from the dot products or the squared distances of
+    the training set (see KERNEL_BASES), which do not depend on the SVC
+    parameters: each is computed once, on the whole set, and every fit takes
+    its block and applies its kernel to it, with gamma resolved on the rows
+    it is fitted on, as SVC does. Blocks below a quarter of the matrix, such
+    as those of the first rounds of a halving search, are cheaper to compute
+    directly. The least recently used matrices are dropped beyond
+    `max_bytes`, the last one is always kept.
+
+    A matrix is computed outside the lock, so that fits needing other
+    matrices go on; the fits needing the same one wait for it.
+    """
+
+    def __init__(self, features: np.ndarray, max_bytes: int = 1 << 30):
+        """Configure the cache.
+
+        Args:
+            features (ndarray): The training set, of shape (n_samples,
+                n_features).
+            max_bytes (int): The memory the kept matrices may use.
+        """
+        self.features = features
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.direct = 0
+        self.compute_seconds = 0.0
+
+        self._matrices = OrderedDict()
+        self._pending = {}  # The futures of the matrices being computed
+        self._lock = threading.Lock()
+
+    def __deepcopy__(self, memo: dict) -> KernelCache:
+        # clone() deep-copies the parameters of the estimators of a search,
+        # which must all share this cache
+        return self
+
+    def resolve_gamma(self, gamma: float | str, rows: np.ndarray) -> float:
+        """Return the value of gamma, resolved as SVC does on the rows it fits."""
+        if gamma == "scale":
+            variance = self.features[rows].var()
+            return 1.0 / (self.features.shape[1] * variance) if variance != 0 else 1.0
+        if gamma == "auto":
+            return 1.0 / self.features.shape[1]
+        return float(gamma)
+
+    def block(
+        self,
+        rows: np.ndarray,
+        columns: np.ndarray,
+        kernel: str,
+        gamma: float | str,
+        degree: int,
+        coef0: float,
+    ) -> np.ndarray:
+        """Return the kernel between two sets of rows of the training set.
+
+        Args:
+            rows (ndarray): The indices of the first set.
+            columns (ndarray): The indices of the second set, the rows the
+                SVC is fitted on.
+            kernel (str): One of KERNEL_PARAMS.
+            gamma (float | str): The gamma of the SVC, "scale", "auto" or a
+                value.
+            degree (int): The degree of the polynomial kernel.
+            coef0 (float): The constant of the polynomial and sigmoid kernels.
+
+        Returns:
+            ndarray: The kernel, of shape (len(rows), len(columns)).
+
+        Raises:
+            ValueError: If the kernel is unknown.
+        """
+        if kernel not in KERNEL_PARAMS:
+            raise ValueError(
+                f"Unknown kernel '{kernel}'. Expected one of: "
+                f"{', '.join(KERNEL_PARAMS)}"
+            )
+        gamma = self.resolve_gamma(gamma, columns)
+        key = KERNEL_BASES[kernel]
+        small = 4 * len(rows) * len(columns) < len(self.features) ** 2
+
+        pending = computing = None
+        with self._lock:
+            matrix = self._matrices.get(key)
+            if matrix is not None:
+                self.hits += 1
+                self._matrices.move_to_end(key)
+            elif key in self._pending:
+                self.hits += 1
+                pending = self._pending[key]
+            elif not small:
+                self.misses += 1
+                computing = self._pending[key] = Future()
+            else:
+                self.direct += 1
+
+        if pending is not None:
+            matrix = pending.result()
+        elif computing is not None:
+            start = time.perf_counter()
+            try:
+                matrix = _kernel_base(key, self.features, self.features)
+            except BaseException as e:
+                with self._lock:
+                    del self._pending[key]
+                computing.set_exception(e)
+                raise
+            with self._lock:
+                self.compute_seconds += time.perf_counter() - start
+                self._matrices[key] = matrix
+                del self._pending[key]
+                while len(self._matrices) > 1 and self.nbytes() > self.max_bytes:
+                    self._matrices.popitem(last=False)
+            computing.set_result(matrix)
+        if matrix is None:
+            block = _kernel_base(key, self.features[rows], self.features[columns])
+        else:
+            block = matrix[np.ix_(rows, columns)]
+        return _apply_kernel(block, kernel, gamma, degree, coef0)
+
+    def nbytes(self) -> int:
+        """Return the memory used by the kept matrices."""
+        return sum(matrix.nbytes for matrix in self._matrices.values())
+
+    def stats(self) -> dict:
+        """Return the use of the cache and the time spent filling it."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "direct": self.direct,
+            "compute_seconds": self.compute_seconds,
+            "kept_matrices": len(self._matrices),
+            "kept_bytes": self.nbytes(),
+        }
+
+
+def _kernel_base(base: str, X: np.ndarray, Y: np.ndarray) -> np.ndarray:
+    """Return the dot products or the squared distances between two sets."""
+    if base == "sqeuclidean":
+        return euclidean_distances(X, Y, squared=True)
+    return X @ Y.T
+
+
+def _apply_kernel(
+    block: np.ndarray, kernel: str, gamma: float, degree: int, coef0: float
+) -> np.ndarray:
+    """Turn a block of KERNEL_BASES into the kernel, in place, as sklearn does."""
+    if kernel == "rbf":
+        block *= -gamma
+        np.exp(block, out=block)
+    elif kernel == "poly":
+        block *= gamma
+        block += coef0
+        block **= degree
+    elif kernel == "sigmoid":
+        block *= gamma
+        block += coef0
+        np.tanh(block, out=block)
+    return block
+
+
+class CachedKernelSVC(ClassifierMixin, BaseEstimator):
+    """An SVC fitted on a precomputed kernel, from a KernelCache.
+
+    Its input is a column of row indices into the training set of the cache,
+    so that a search can split and subsample it like any other input. It
+    only serves the search: the selected parameters are then refitted on
+    the features, by a regular SVC.
+    """
+
+    def __init__(
+        self,
+        kernel_cache: KernelCache | None = None,
+        C: float = 1.0,
+        kernel: str = "rbf",
+        gamma: float | str = "scale",
+        degree: int = 3,
+        coef0: float = 0.0,
+    ):
+        self.kernel_cache = kernel_cache
+        self.C = C
+        self.kernel = kernel
+        self.gamma = gamma
+        self.degree = degree
+        self.coef0 = coef0
+
+    def _kernel(self, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        """Return the kernel of the parameters between two sets of rows."""
+        return self.kernel_cache.block(
+            rows, columns, self.kernel, self.gamma, self.degree, self.coef0
+        )
+
+    def fit(self, X: np.ndarray, y: np.ndarray) -> CachedKernelSVC:
+        self.rows_ = np.asarray(X, dtype=np.intp).ravel()
+        self.svc_ = SVC(kernel="precomputed", C=self.C)
+        self.svc_.fit(self._kernel(self.rows_, self.rows_), y)
+        self.classes_ = self.svc_.classes_
+        return self
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        rows = np.asarray(X, dtype=np.intp).ravel()
+        return self.svc_.decision_function(self._kernel(rows, self.rows_))
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        rows = np.asarray(X, dtype=np.intp).ravel()
+        return self.svc_.predict(self._kernel(rows, self.rows_))
+
+
+def kernel_groups(param_grid: dict) -> list[dict]:
+    """Split an SVC grid into one grid per kernel and kernel parameters.
+
+    The candidates sharing a kernel base matrix are then searched one after
+    the other, which keeps the kernel cache small, and the parameters a kernel
+    ignores (gamma for the linear kernel) no longer multiply its candidates.
+
+    Args:
+        param_grid (dict): The grid, a list of values per SVC parameter.
+
+    Returns:
+        list[dict]: The grids, in the order of the kernels of `param_grid`.
+    """
+    shared = {
+        name: values
+        for name, values in param_grid.items()
+        if name not in ("kernel", "gamma", "degree", "coef0")
+    }
+    groups = []
+    for kernel in param_grid.get("kernel", ["rbf"]):
+        names = [name for name in KERNEL_PARAMS[kernel] if name in param_grid]
+        for values in itertools.product(*(param_grid[name] for name in names)):
+            groups.append(
+                {
+                    "kernel": [kernel],
+                    **{name: [value] for name, value in zip(names, values)},
+                    **shared,
+                }
+            )
+    return groups
+
+
+def candidate_report(search: GridSearchCV) -> list[dict]:
+    """Return the scores and timings of each candidate of a search.
+
+    Args:
+        search (GridSearchCV): A fitted grid or halving search.
+
+    Returns:
+        list[dict]: Per candidate (and per iteration, for a halving search),
+            its parameters, rank, test scores, and fit and score times, in
+            seconds, averaged over the folds and in total.
+    """
+    results = search.cv_results_
+    candidates = []
+    for index, params in enumerate(results["params"]):
+        fit_time = float(results["mean_fit_time"][index])
+        score_time = float(results["mean_score_time"][index])
+        candidate = {
+            "params": params,
+            "rank": int(results["rank_test_score"][index]),
+            "mean_test_score": float(results["mean_test_score"][index]),
+            "std_test_score": float(results["std_test_score"][index]),
+            "mean_fit_time": fit_time,
+            "std_fit_time": float(results["std_fit_time"][index]),
+            "mean_score_time": score_time,
+            "total_seconds": search.n_splits_ * (fit_time + score_time),
+        }
+        if "iter" in results:
+            candidate["iter"] = int(results["iter"][index])
+            candidate["n_resources"] = int(results["n_resources"][index])
+        candidates.append(candidate)
+    return candidates
+
+
+def refitted_search(
+    search: GridSearchCV, param_grid: list[dict], svc: SVC, refit_time: float
+) -> GridSearchCV:
+    """Wrap an SVC refitted on the selected parameters like the notebook's model.
+
+    The notebook saves a GridSearchCV(SVC(), refit=True). The search that
+    selected the parameters was not refitted, and may have searched another
+    estimator, so a search of SVCs is built to hold the refitted SVC, with
+    the parameters and the score it was selected with.
+
+    Args:
+        search (GridSearchCV): The fitted search, left as it is.
+        param_grid (list[dict]): The grid it searched.
+        svc (SVC): The SVC refitted on the selected parameters.
+        refit_time (float): The time the refit took, in seconds.
+
+    Returns:
+        GridSearchCV: A search serving `svc`, as if it had been refitted.
+    """
+    model = GridSearchCV(
+        SVC(), param_grid, scoring=search.scoring, cv=search.cv, refit=True
+    )
+    model.best_params_ = search.best_params_
+    model.best_score_ = search.best_score_
+    model.best_estimator_ = svc
+    model.refit_time_ = refit_time
+    model.n_splits_ = search.n_splits_
+    model.scorer_ = search.scorer_
+    model.multimetric_ = search.multimetric_
+    return model
+
+
+def train(
+    frame: pd.DataFrame,
+    strategy: str = "grid",
+    param_grid: dict = SVC_PARAM_GRID,
+    n_jobs: int = 1,
+    cv: int = 5,
+    kernel_cache_bytes: int | None = 1 << 30,
+    factor: int = 3,
+    test_size: float = 0.2,
+    random_state: int = 42,
+) -> TrainingResult:
+    """Rebuild the artifacts of the notebook from raw leads.
+
+    The leads are cleaned, encoded and scaled once, then split as in the
+    notebook. The SVC parameters are searched on the training set, by a grid
+    search (the notebook's) or by successive halving, which scores every
+    candidate on a subsample and only keeps the best third for the next,
+    three times larger, round. Fits run on `n_jobs` threads (libsvm releases
+    the GIL), sharing a KernelCache unless `kernel_cache_bytes` is None. The
+    selected parameters are refitted by an SVC on the whole training set.
+
+    Args:
+        frame (DataFrame): The raw leads.
+        strategy (str): One of SEARCH_STRATEGIES.
+        param_grid (dict): The SVC parameters to search.
+        n_jobs (int): The number of threads, -1 for one per core.
+        cv (int): The number of stratified folds.
+        kernel_cache_bytes (int | None): The memory of the kernel cache, None
+            to let each fit compute its kernel.
+        factor (int): The ratio of candidates dropped, and of samples added,
+            at each round of a halving search.
+        test_size (float): The share of the leads held out for testing.
+        random_state (int): The seed of the split and of the subsamples.
+
+    Returns:
+        TrainingResult: The refitted SVC, wrapped like the notebook's
+            GridSearchCV (see `refitted_search`), the encoders, the scaler
+            and a report of the scores and timings.
+
+    Raises:
+        ValueError: If the strategy is unknown or a column is missing.
+    """
+    if strategy not in SEARCH_STRATEGIES:
+        raise ValueError(
+            f"Unknown strategy '{strategy}'. Expected one of: "
+            f"{', '.join(SEARCH_STRATEGIES)}"
+        )
+    from joblib import parallel_config
+    from threadpoolctl import threadpool_limits
+
+    start = time.perf_counter()
+    leads = clean_leads(frame)
+    encoders, scaler, features = fit_preprocessing(leads)
+    X_train, X_test, y_train, y_test = train_test_split(
+        features,
+        leads[TARGET].to_numpy(),
+        test_size=test_size,
+        random_state=random_state,
+    )
+    prepare_seconds = time.perf_counter() - start
+
+    kernel_cache = None
+    if kernel_cache_bytes is None:
+        estimator, search_input = SVC(), X_train
+    else:
+        kernel_cache = KernelCache(X_train, kernel_cache_bytes)
+        estimator = CachedKernelSVC(kernel_cache)
+        search_input = np.arange(len(X_train))[:, np.newaxis]
+
+    grid = kernel_groups(param_grid)
+    options = {"cv": cv, "scoring": "roc_auc", "n_jobs": n_jobs, "refit": False}
+    if strategy == "grid":
+        search = GridSearchCV(estimator, grid, **options)
+    else:
+        from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+        from sklearn.model_selection import HalvingGridSearchCV
+
+        search = HalvingGridSearchCV(
+            estimator, grid, factor=factor, random_state=random_state, **options
+        )
+
+    # One BLAS thread per fit when the fits run on several threads
+    blas_threads = None if n_jobs == 1 else 1
+    start = time.perf_counter()
+    with parallel_config(backend="threading"), threadpool_limits(blas_threads):
+        search.fit(search_input, y_train)
+    search_seconds = time.perf_counter() - start
+
+    # Refit as GridSearchCV(refit=True) would, without the kernel cache
+    start = time.perf_counter()
+    svc = SVC(**search.best_params_).fit(X_train, y_train)
+    model = refitted_search(search, grid, svc, time.perf_counter() - start)
+
+    report = {
+        "strategy": strategy,
+        "n_leads": len(frame),
+        "n_kept": len(leads),
+        "n_train": len(X_train),
+        "n_test": len(X_test),
+        "n_jobs": n_jobs,
+        "cv": cv,
+        "best_params": search.best_params_,
+        "best_cv_score": float(search.best_score_),
+        "test_scores": {
+            "roc_auc": float(roc_auc_score(y_test, svc.decision_function(X_test))),
+            "accuracy": float(accuracy_score(y_test, svc.predict(X_test))),
+        },
+        "timings": {
+            "prepare_seconds": prepare_seconds,
+            "search_seconds": search_seconds,
+            "refit_seconds": model.refit_time_,
+        },
+        "kernel_cache": None if kernel_cache is None else kernel_cache.stats(),
+        "candidates": candidate_report(search),
+    }
+    return TrainingResult(model, encoders, scaler, report)
@@ -1,9 +1,182 @@
-MODEL_PATH = "artifacts/best_svm.joblib"
-LAST_ACTIVITY_ENCODER_PATH = "artifacts/last_activity_encoder.joblib"
-LAST_NOTABLE_ACTIVITY_ENCODER_PATH = "artifacts/last_notable_activity_encoder.joblib"
-LEAD_SOURCE_ENCODER_PATH = "artifacts/lead_source_encoder.joblib"
-LEAD_ORIGIN_ENCODER_PATH = "artifacts/lead_origin_encoder.joblib"
-SCALER_PATH = "artifacts/scaler.joblib"
+import os
+
+# Paths are resolved from the repository, not from the working directory
+ARTIFACTS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "artifacts",
+)
+MODEL_PATH = os.path.join(ARTIFACTS_DIR, "best_svm.joblib")
+LAST_ACTIVITY_ENCODER_PATH = os.path.join(ARTIFACTS_DIR, "last_activity_encoder.joblib")
+LAST_NOTABLE_ACTIVITY_ENCODER_PATH = os.path.join(
+    ARTIFACTS_DIR, "last_notable_activity_encoder.joblib"
+)
+LEAD_SOURCE_ENCODER_PATH = os.path.join(ARTIFACTS_DIR, "lead_source_encoder.joblib")
+LEAD_ORIGIN_ENCODER_PATH = os.path.join(ARTIFACTS_DIR, "lead_origin_encoder.joblib")
+SCALER_PATH = os.path.join(ARTIFACTS_DIR, "scaler.joblib")
+SHARED_ARRAYS_PATH = os.path.join(ARTIFACTS_DIR, "shared_arrays.bin")
+
+# Versioned model bundles, see app/bundle.py. The newest one is served unless
+# MODEL_BUNDLE_PATH names one, or a compact model file (app/export_compact.py);
+# without any bundle, the files above are served.
+MODEL_BUNDLES_DIR = os.environ.get(
+    "MODEL_BUNDLES_DIR", os.path.join(ARTIFACTS_DIR, "bundles")
+)
+MODEL_BUNDLE_PATH = os.environ.get("MODEL_BUNDLE_PATH")
+
+# Load the artifacts when the app is created rather than on the first request
+WARM_UP_ON_START = os.environ.get("WARM_UP_ON_START", "0") == "1"
+
+# Seconds between two polls of MODEL_BUNDLES_DIR for a new bundle, 0 to disable
+MODEL_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", "0"))
+
+# Per-stage latency histograms and request counters, served at /metrics
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "0") == "1"
+
+# Bearer token of the /admin routes, which are disabled when it is not set
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+# "joblib" keeps private copies of the artifact arrays in each process,
+# "mmap" maps them read-only from SHARED_ARRAYS_PATH, shared by all workers.
+ARTIFACT_STORAGE = os.environ.get("ARTIFACT_STORAGE", "joblib")
+
+MAX_BATCH_SIZE = 10_000
+STREAM_CHUNK_SIZE = 1024
+
+# Ranking: the largest K served, and the number of leads scored at once
+MAX_RANK_K = 10_000
+RANK_CHUNK_SIZE = 4096
+
+# Platt parameters mapping decision scores to probabilities, see app/calibrate.py
+CALIBRATION_PATH = os.environ.get(
+    "CALIBRATION_PATH", os.path.join(ARTIFACTS_DIR, "calibration.json")
+)
+
+# Largest number of grid points of a what-if sweep
+MAX_SWEEP_POINTS = 10_000
+
+# SQLite store of the last score of each lead, used by delta rescoring
+SCORE_STORE_PATH = os.environ.get(
+    "SCORE_STORE_PATH", os.path.join(ARTIFACTS_DIR, "scores.sqlite3")
+)
+
+# "sklearn" runs scaler.transform + model.predict, "fused" runs FusedSVMEngine,
+# "factorized" runs FactorizedSVMEngine and "approximate" runs the Nystroem
+# approximation of app/distill.py.
+INFERENCE_MODE = os.environ.get("INFERENCE_MODE", "sklearn")
+FUSED_ENGINE_DTYPE = os.environ.get("FUSED_ENGINE_DTYPE", "float64")
+
+# Execution policy of the scoring service: batches of at least
+# INFERENCE_PARALLEL_MIN_ROWS leads are split into chunks of
+# INFERENCE_CHUNK_SIZE rows scored on INFERENCE_THREADS threads. BLAS and
+# OpenMP use at most INFERENCE_BLAS_THREADS threads per process: 1 by default
+# when scoring on threads, unchanged otherwise. Set it to 1 when running
+# several workers.
+INFERENCE_THREADS = int(os.environ.get("INFERENCE_THREADS", 1))
+INFERENCE_BLAS_THREADS = os.environ.get("INFERENCE_BLAS_THREADS")
+INFERENCE_BLAS_THREADS = (
+    int(INFERENCE_BLAS_THREADS)
+    if INFERENCE_BLAS_THREADS
+    else (1 if INFERENCE_THREADS > 1 else None)
+)
+INFERENCE_PARALLEL_MIN_ROWS = int(os.environ.get("INFERENCE_PARALLEL_MIN_ROWS", 4096))
+INFERENCE_CHUNK_SIZE = int(os.environ.get("INFERENCE_CHUNK_SIZE", 512))
+
+# The approximation is only served if it agreed with the exact model on at
+# least this share of held-out leads; the exact model is served otherwise.
+APPROXIMATION_PATH = os.environ.get(
+    "APPROXIMATION_PATH", os.path.join(ARTIFACTS_DIR, "approximation.npz")
+)
+APPROXIMATION_MIN_AGREEMENT = float(
+    os.environ.get("APPROXIMATION_MIN_AGREEMENT", "0.99")
+)
+
+# Memoization of predictions, off when the size is 0. The TTL is in seconds.
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", 0))
+PREDICTION_CACHE_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", 0)) or None
+
+# Micro-batching of concurrent /predict requests
+MICRO_BATCH_ENABLED = os.environ.get("MICRO_BATCH_ENABLED", "0") == "1"
+MICRO_BATCH_MAX_SIZE = int(os.environ.get("MICRO_BATCH_MAX_SIZE", 64))
+MICRO_BATCH_MAX_WAIT_MS = float(os.environ.get("MICRO_BATCH_MAX_WAIT_MS", 2))
+MICRO_BATCH_MAX_QUEUE = int(os.environ.get("MICRO_BATCH_MAX_QUEUE", 1024))
+MICRO_BATCH_TIMEOUT_MS = float(os.environ.get("MICRO_BATCH_TIMEOUT_MS", 1000))
+
+# Admission control of the scoring routes: at most ADMISSION_MAX_CONCURRENCY
+# requests are scored at once, ADMISSION_MAX_QUEUE more wait for at most
+# ADMISSION_QUEUE_TIMEOUT_MS, and the rest are told to retry after
+# ADMISSION_RETRY_AFTER_S seconds. Bulk requests cannot take the last
+# ADMISSION_INTERACTIVE_RESERVE slots.
+ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "0") == "1"
+ADMISSION_MAX_CONCURRENCY = int(
+    os.environ.get("ADMISSION_MAX_CONCURRENCY", (os.cpu_count() or 1) + 1)
+)
+ADMISSION_MAX_QUEUE = int(os.environ.get("ADMISSION_MAX_QUEUE", 64))
+ADMISSION_QUEUE_TIMEOUT_MS = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT_MS", 1000))
+ADMISSION_RETRY_AFTER_S = int(os.environ.get("ADMISSION_RETRY_AFTER_S", 1))
+ADMISSION_INTERACTIVE_RESERVE = int(os.environ.get("ADMISSION_INTERACTIVE_RESERVE", 1))
+
+# Feature name -> [expected type, expected values]. The order matters: it is
+# the column order the scaler and the model were fitted on.
+FEATURE_SCHEMA = {
+    "Lead Origin": [
+        "str",
+        ["API", "Landing Page Submission", "Lead Add Form", "Lead Import"],
+    ],
+    "Lead Source": [
+        "str",
+        [
+            "Direct Traffic",
+            "Google",
+            "Olark Chat",
+            "Organic Search",
+            "Other",
+            "Reference",
+            "Referral Sites",
+            "Welingak Website",
+        ],
+    ],
+    "Do Not Email": ["int", [0, 1]],
+    "TotalVisits": ["float", None],
+    "Total Time Spent on Website": ["int", None],
+    "Last Activity": [
+        "str",
+        [
+            "Converted to Lead",
+            "Email Bounced",
+            "Email Link Clicked",
+            "Email Opened",
+            "Form Submitted on Website",
+            "Olark Chat Conversation",
+            "Other",
+            "Page Visited on Website",
+            "SMS Sent",
+            "Unreachable",
+        ],
+    ],
+    "Through Recommendations": ["int", [0, 1]],
+    "A free copy of Mastering The Interview": ["int", [0, 1]],
+    "Last Notable Activity": [
+        "str",
+        [
+            "Email Link Clicked",
+            "Email Opened",
+            "Modified",
+            "Olark Chat Conversation",
+            "Other",
+            "Page Visited on Website",
+            "SMS Sent",
+        ],
+    ],
+}
+FEATURE_NAMES = list(FEATURE_SCHEMA)
+
+# The label of each class of the model
+LABELS = {0: "Not Converted", 1: "Converted"}
+
+# Features without a fixed set of values, which a what-if sweep can vary
+NUMERIC_FEATURES = [
+    key for key, (_, expected_values) in FEATURE_SCHEMA.items() if expected_values is None
+]
 
 WELCOME_MESSAGE = """
 <html>
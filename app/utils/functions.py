@@ -1,9 +1,20 @@
-import pandas as pd
+from __future__ import annotations
+
+import hashlib
+import math
+
 import joblib
 
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
+
+from app.utils.constants import FEATURE_NAMES, FEATURE_SCHEMA, NUMERIC_FEATURES
+from app.utils.metrics import metrics
 
-from sklearn.base import ClassifierMixin, TransformerMixin
+if TYPE_CHECKING:  # pandas and sklearn are slow to import, see WARM_UP_ON_START
+    import numpy as np
+    import pandas as pd
+
+    from sklearn.base import ClassifierMixin, TransformerMixin
 
 
 def load_artifact(filepath: str) -> ClassifierMixin | TransformerMixin:
@@ -18,6 +29,24 @@ def load_artifact(filepath: str) -> ClassifierMixin | TransformerMixin:
     return joblib.load(filepath)
 
 
+def artifact_fingerprint(filepaths: list[str], length: int | None = 12) -> str:
+    """Hash the content of artifact files.
+
+    Args:
+        filepaths (list[str]): The paths to the files.
+        length (int | None): The number of hex digits kept, None for all.
+
+    Returns:
+        str: A SHA-256 hex digest that changes whenever any of the files does.
+    """
+    digest = hashlib.sha256()
+    for filepath in filepaths:
+        with open(filepath, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:length]
+
+
 def check_feature_value(
     feature: str, value: Optional[str], type: str, expected_values: Optional[list]
 ) -> None:
@@ -38,7 +67,7 @@ def check_feature_value(
     if type == "int":
         try:
             value = int(value)
-        except ValueError:
+        except (TypeError, ValueError, OverflowError):
             raise ValueError(
                 f"Invalid value '{value}' for feature '{feature}'. Expected an integer."
             )
@@ -46,10 +75,15 @@ def check_feature_value(
     elif type == "float":
         try:
             value = float(value)
-        except ValueError:
+        except (TypeError, ValueError):
             raise ValueError(
                 f"Invalid value '{value}' for feature '{feature}'. Expected a float."
             )
+        if not math.isfinite(value):
+            raise ValueError(
+                f"Invalid value '{value}' for feature '{feature}'. "
+                "Expected a finite number."
+            )
 
     elif type == "str":
         if not isinstance(value, str):
@@ -64,80 +98,201 @@ def check_feature_value(
         )
 
 
-def extract_features(data: dict) -> pd.DataFrame:
-    """Extract features from the input data.
+def extract_feature_values(data: dict) -> list:
+    """Validate the input data and return its feature values.
 
     Args:
         data (dict): The input data.
-        encoders (dict): The encoders to use.
 
     Returns:
-        DataFrame: The extracted features.
+        list: The feature values, in the order of FEATURE_SCHEMA.
 
     Raises:
-        ValueError: If any required feature is missing.
+        ValueError: If any required feature is missing or invalid.
     """
-    expected_keys = {
-        "Lead Origin": [
-            "str",
-            ["API", "Landing Page Submission", "Lead Add Form", "Lead Import"],
-        ],
-        "Lead Source": [
-            "str",
-            [
-                "Direct Traffic",
-                "Google",
-                "Olark Chat",
-                "Organic Search",
-                "Other",
-                "Reference",
-                "Referral Sites",
-                "Welingak Website",
-            ],
-        ],
-        "Do Not Email": ["int", [0, 1]],
-        "TotalVisits": ["float", None],
-        "Total Time Spent on Website": ["int", None],
-        "Last Activity": [
-            "str",
-            [
-                "Converted to Lead",
-                "Email Bounced",
-                "Email Link Clicked",
-                "Email Opened",
-                "Form Submitted on Website",
-                "Olark Chat Conversation",
-                "Other",
-                "Page Visited on Website",
-                "SMS Sent",
-                "Unreachable",
-            ],
-        ],
-        "Through Recommendations": ["int", [0, 1]],
-        "A free copy of Mastering The Interview": ["int", [0, 1]],
-        "Last Notable Activity": [
-            "str",
-            [
-                "Email Link Clicked",
-                "Email Opened",
-                "Modified",
-                "Olark Chat Conversation",
-                "Other",
-                "Page Visited on Website",
-                "SMS Sent",
-            ],
-        ],
-    }
     features = []
 
     list_of_keys = data.keys()
-    unknown_keys = [key for key in list_of_keys if key not in expected_keys]
+    unknown_keys = [key for key in list_of_keys if key not in FEATURE_SCHEMA]
     if unknown_keys:
         raise ValueError(f"Unknown features: {', '.join(unknown_keys)}")
 
-    for key, (type, expected_values) in expected_keys.items():
+    for key, (type, expected_values) in FEATURE_SCHEMA.items():
         value = data.get(key)
         check_feature_value(key, value, type, expected_values)
         features.append(value)
 
-    return pd.DataFrame([features], columns=expected_keys)
+    return features
+
+
+def extract_features(data: dict) -> pd.DataFrame:
+    """Extract features from the input data.
+
+    Args:
+        data (dict): The input data.
+
+    Returns:
+        DataFrame: The extracted features.
+
+    Raises:
+        ValueError: If any required feature is missing.
+    """
+    import pandas as pd
+
+    return pd.DataFrame([extract_feature_values(data)], columns=FEATURE_NAMES)
+
+
+def extract_batch_features(data: list) -> tuple[pd.DataFrame, dict[int, str]]:
+    """Extract features from a batch of leads.
+
+    Invalid leads do not fail the batch: they are left out of the DataFrame
+    and their error message is returned instead. The batch is validated
+    column by column, see `BatchValidator`, with the rules and messages of
+    `extract_feature_values`.
+
+    Args:
+        data (list): The input leads.
+
+    Returns:
+        tuple[DataFrame, dict[int, str]]: The features of the valid leads,
+            indexed by their position in the input, and the error messages
+            of the invalid leads, keyed by their position in the input.
+    """
+    import numpy as np
+    import pandas as pd
+
+    from app.utils.validation import batch_validator
+
+    with metrics.time("validate"):
+        validation = batch_validator.validate(data)
+
+    errors = {
+        position: field_errors[0].message
+        for position, field_errors in validation.errors.items()
+    }
+    with metrics.time("dataframe"):
+        features = pd.DataFrame(
+            {
+                feature: np.array(values, dtype=object)
+                for feature, values in validation.columns.items()
+            },
+            columns=FEATURE_NAMES,
+            index=validation.index,
+        )
+    return features, errors
+
+
+def read_encoded_features(body: bytes, n_features: int, max_rows: int) -> np.ndarray:
+    """Read pre-encoded features from a NumPy `.npy` file.
+
+    The array must be 2-D, of shape (n_samples, n_features), in C order, and
+    hold little-endian integers or floats. Float64 data is returned as a
+    read-only view of `body`, without any copy.
+
+    Args:
+        body (bytes): The content of the file.
+        n_features (int): The expected number of columns.
+        max_rows (int): The maximum number of rows.
+
+    Returns:
+        ndarray: The encoded features, of shape (n_samples, n_features).
+
+    Raises:
+        ValueError: If the file is not a valid array of that shape and type.
+    """
+    import io
+
+    import numpy as np
+
+    stream = io.BytesIO(body)
+    try:
+        version = np.lib.format.read_magic(stream)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+    except ValueError as e:
+        raise ValueError(f"Invalid .npy file: {e}")
+
+    if len(shape) != 2 or shape[1] != n_features:
+        raise ValueError(f"Expected an array of shape (n, {n_features}), got {shape}")
+    if shape[0] > max_rows:
+        raise ValueError(f"Too many leads: at most {max_rows} per batch")
+    if fortran_order:
+        raise ValueError("Expected an array in C order")
+    if dtype.kind not in "iuf" or dtype.byteorder == ">" or (
+        dtype.byteorder == "=" and not np.little_endian
+    ):
+        raise ValueError(f"Expected little-endian integers or floats, got {dtype.str}")
+
+    data = memoryview(body)[stream.tell() :]
+    if len(data) != shape[0] * n_features * dtype.itemsize:
+        raise ValueError("Invalid .npy file: the data does not match the header")
+
+    features = np.frombuffer(data, dtype=dtype.newbyteorder("<")).reshape(shape)
+    return features.astype(np.float64, copy=False)
+
+
+def parse_sweep_grid(grid: dict, max_points: int) -> dict[str, np.ndarray]:
+    """Validate the grid of a what-if sweep.
+
+    Each swept feature takes either an explicit list of increasing values,
+    or {"start", "stop", "num"} for evenly spaced values, bounds included.
+
+    Args:
+        grid (dict): The values of each swept feature, one or two of
+            NUMERIC_FEATURES.
+        max_points (int): The maximum number of grid points.
+
+    Returns:
+        dict[str, ndarray]: The increasing values of each swept feature, in
+            the order of `grid`.
+
+    Raises:
+        ValueError: If the grid is invalid or too large.
+    """
+    import numpy as np
+
+    if not isinstance(grid, dict) or not 1 <= len(grid) <= 2:
+        raise ValueError("Expected a grid over one or two features")
+    unknown_keys = [key for key in grid if key not in NUMERIC_FEATURES]
+    if unknown_keys:
+        raise ValueError(
+            f"Cannot sweep {', '.join(unknown_keys)}. "
+            f"Expected one or two of: {', '.join(NUMERIC_FEATURES)}"
+        )
+
+    axes = {}
+    for key, spec in grid.items():
+        if isinstance(spec, dict):
+            start, stop, num = spec.get("start"), spec.get("stop"), spec.get("num")
+            if not isinstance(num, int) or isinstance(num, bool) or num < 2:
+                raise ValueError(f"Expected an integer num of at least 2 for '{key}'")
+            if num > max_points:
+                raise ValueError(f"Too many grid points: at most {max_points} per sweep")
+            values = [start, stop]
+        elif isinstance(spec, list) and spec:
+            values = spec
+        else:
+            raise ValueError(
+                f"Expected a list of values or {{start, stop, num}} for '{key}'"
+            )
+
+        if not all(
+            isinstance(value, (int, float)) and not isinstance(value, bool)
+            for value in values
+        ):
+            raise ValueError(f"Expected numbers for '{key}'")
+        values = np.array(values, dtype=np.float64)
+        if not np.isfinite(values).all():
+            raise ValueError(f"Expected finite numbers for '{key}'")
+        if isinstance(spec, dict):
+            values = np.linspace(values[0], values[1], num)
+        if not (np.diff(values) > 0).all():
+            raise ValueError(f"Expected increasing values for '{key}'")
+        axes[key] = values
+
+    n_points = int(np.prod([len(values) for values in axes.values()]))
+    if n_points > max_points:
+        raise ValueError(f"Too many grid points: at most {max_points} per sweep")
+    return axes
@@ -0,0 +1,227 @@
+import contextlib
+import threading
+import time
+
+from bisect import bisect_left
+
+from app.utils.constants import METRICS_ENABLED
+
+# Upper bounds, in seconds, of the latency histograms
+LATENCY_BOUNDS = [
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+]
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds."""
+
+    def __init__(self, bounds: list[float]):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Record one value."""
+        bucket = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[bucket] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self) -> dict:
+        """Return the cumulative bucket counts, the count and the sum."""
+        with self._lock:
+            counts, count, sum = list(self.counts), self.count, self.sum
+        buckets, total = {}, 0
+        for bound, bucket_count in zip(self.bounds + [float("inf")], counts):
+            total += bucket_count
+            buckets[str(bound)] = total
+        return {"buckets": buckets, "count": count, "sum": sum}
+
+
+class _StageTimer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+_NOT_TIMED = contextlib.nullcontext()
+
+
+class Metrics:
+    """Stage latencies and request counters of the serving path.
+
+    When disabled, `time` returns a shared no-op context manager and
+    `count_request` returns at once, so the instrumentation costs one
+    attribute check per call site.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        """Configure the metrics.
+
+        Args:
+            enabled (bool): Whether anything is recorded.
+        """
+        self.enabled = enabled
+        self._stages = {}
+        self._durations = {}
+        self._requests = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, histograms: dict, name: str) -> Histogram:
+        histogram = histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = histograms.setdefault(name, Histogram(LATENCY_BOUNDS))
+        return histogram
+
+    def time(self, stage: str):
+        """Time a block of code as one stage of the serving path.
+
+        Args:
+            stage (str): The stage name, e.g. "validate" or "inference".
+
+        Returns:
+            A context manager recording the duration of its block.
+        """
+        if not self.enabled:
+            return _NOT_TIMED
+        return _StageTimer(self._histogram(self._stages, stage))
+
+    def count_request(self, route: str, status: int, seconds: float) -> None:
+        """Record a handled request.
+
+        Args:
+            route (str): The route, e.g. "/predict".
+            status (int): The status code of the response.
+            seconds (float): The time spent handling the request.
+        """
+        if not self.enabled:
+            return
+        self._histogram(self._durations, route).observe(seconds)
+        with self._lock:
+            key = (route, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+    def render(self) -> str:
+        """Return the metrics in the Prometheus text format.
+
+        Returns:
+            str: The stage and request duration histograms, and the request
+                and error counters by route and status code.
+        """
+        with self._lock:
+            stages = dict(self._stages)
+            durations = dict(self._durations)
+            requests = dict(self._requests)
+
+        lines = render_histograms(
+            "lead_stage_duration_seconds",
+            "Time spent in each stage of the serving path.",
+            {(("stage", stage),): histogram for stage, histogram in stages.items()},
+        )
+        lines += render_histograms(
+            "lead_request_duration_seconds",
+            "Time spent handling a request, by route.",
+            {(("route", route),): histogram for route, histogram in durations.items()},
+        )
+        lines += render_samples(
+            "lead_requests_total",
+            "counter",
+            "Handled requests, by route and status code.",
+            {
+                (("route", route), ("status", str(status))): count
+                for (route, status), count in requests.items()
+            },
+        )
+        lines += render_samples(
+            "lead_errors_total",
+            "counter",
+            "Requests answered with an error, by route and status code.",
+            {
+                (("route", route), ("status", str(status))): count
+                for (route, status), count in requests.items()
+                if status >= 400
+            },
+        )
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        value = value.replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def render_samples(name: str, type: str, help: str, samples: dict) -> list[str]:
+    """Format counters or gauges in the Prometheus text format.
+
+    Args:
+        name (str): The metric name.
+        type (str): "counter" or "gauge".
+        help (str): The description of the metric.
+        samples (dict): The values, by tuple of (label, value) pairs.
+
+    Returns:
+        list[str]: The lines of the metric.
+    """
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {type}"]
+    for labels, value in samples.items():
+        lines.append(f"{name}{_labels(labels)} {value}")
+    return lines
+
+
+def render_histograms(name: str, help: str, histograms: dict) -> list[str]:
+    """Format histograms in the Prometheus text format.
+
+    Args:
+        name (str): The metric name.
+        help (str): The description of the metric.
+        histograms (dict): The histograms, or their snapshots, by tuple of
+            (label, value) pairs.
+
+    Returns:
+        list[str]: The lines of the metric.
+    """
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} histogram"]
+    for labels, histogram in histograms.items():
+        if isinstance(histogram, Histogram):
+            histogram = histogram.snapshot()
+        for bound, count in histogram["buckets"].items():
+            le = "+Inf" if bound == "inf" else bound
+            lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {count}")
+        lines.append(f"{name}_sum{_labels(labels)} {histogram['sum']}")
+        lines.append(f"{name}_count{_labels(labels)} {histogram['count']}")
+    return lines
+
+
+metrics = Metrics()
@@ -0,0 +1,213 @@
+import math
+
+from typing import NamedTuple
+
+from app.utils.constants import FEATURE_SCHEMA
+from app.utils.functions import check_feature_value
+
+# Value classes accepted without conversion, by feature type. Values of any
+# other class go through `check_feature_value`.
+_SCALAR_CLASSES = {
+    "str": (str,),
+    "int": (int, bool),
+    "float": (int, float, bool),
+}
+
+
+class FieldError(NamedTuple):
+    """A validation error of one lead."""
+
+    row: int
+    field: str | None  # None when the lead as a whole is invalid
+    message: str
+
+
+class BatchValidation(NamedTuple):
+    """The outcome of validating a batch of leads."""
+
+    index: list[int]  # Positions of the valid leads in the input
+    columns: dict[str, list]  # Values of the valid leads, by feature
+    errors: dict[int, list[FieldError]]  # Errors of the invalid leads
+
+
+class _Column:
+    """Validator of one feature, compiled from its schema entry."""
+
+    __slots__ = ("feature", "type", "expected_values", "classes", "allowed")
+
+    def __init__(self, feature: str, type: str, expected_values: list | None):
+        self.feature = feature
+        self.type = type
+        self.expected_values = expected_values
+
+        if expected_values is None:
+            self.classes = _SCALAR_CLASSES.get(type, ())
+            self.allowed = None
+        elif type == "str":
+            self.classes = (str,)
+            self.allowed = frozenset(expected_values)
+        elif type == "int":
+            # int("1") and int(1.0) are valid too: equal values hash alike
+            self.classes = (str, int, bool, float)
+            self.allowed = frozenset(expected_values) | {
+                str(value) for value in expected_values
+            }
+        else:
+            self.classes = ()
+            self.allowed = None
+
+    def suspects(self, values: list) -> list[int]:
+        """Return the positions of the values the fast checks cannot accept."""
+        classes, allowed = self.classes, self.allowed
+        if allowed is not None:
+            return [
+                i
+                for i, value in enumerate(values)
+                if value.__class__ not in classes or value not in allowed
+            ]
+        # NaN and infinities are floats, but not valid numbers
+        return [
+            i
+            for i, value in enumerate(values)
+            if value.__class__ not in classes
+            or (value.__class__ is float and not math.isfinite(value))
+        ]
+
+    def check(self, value) -> str | None:
+        """Validate one value with the reference rules."""
+        try:
+            check_feature_value(self.feature, value, self.type, self.expected_values)
+        except ValueError as e:
+            return str(e)
+        return None
+
+
+class BatchValidator:
+    """Feature schema compiled into column-wise validators.
+
+    A batch is checked one feature at a time: each column is scanned once
+    against a set of accepted values (categorical and binary features) or of
+    accepted value classes (numeric features). Only the values these checks
+    cannot accept, which are rare in practice, go through
+    `check_feature_value`. The rules and error messages are therefore those
+    of the single-lead path, and the first error of a lead is the error
+    `extract_feature_values` raises.
+    """
+
+    def __init__(self, schema: dict = FEATURE_SCHEMA):
+        self.schema = schema
+        self.feature_names = list(schema)
+        self._known = frozenset(schema)
+        self._columns = [
+            _Column(feature, type, expected_values)
+            for feature, (type, expected_values) in schema.items()
+        ]
+
+    def validate(self, leads: list) -> BatchValidation:
+        """Validate a batch of leads.
+
+        Args:
+            leads (list): The input leads.
+
+        Returns:
+            BatchValidation: The values of the valid leads, by feature, and
+                every error of the invalid leads, in the order the single-lead
+                path checks them.
+        """
+        errors = {}
+        rows = []
+        for position, lead in enumerate(leads):
+            if not isinstance(lead, dict):
+                errors[position] = [
+                    FieldError(position, None, "Expected a JSON object")
+                ]
+            else:
+                if not lead.keys() <= self._known:
+                    unknown_keys = [key for key in lead if key not in self._known]
+                    errors[position] = [
+                        FieldError(
+                            position,
+                            None,
+                            f"Unknown features: {', '.join(unknown_keys)}",
+                        )
+                    ]
+                rows.append(position)
+
+        columns = {}
+        for column in self._columns:
+            values = [leads[position].get(column.feature) for position in rows]
+            for i in column.suspects(values):
+                message = column.check(values[i])
+                if message is not None:
+                    position = rows[i]
+                    errors.setdefault(position, []).append(
+                        FieldError(position, column.feature, message)
+                    )
+            columns[column.feature] = values
+
+        if errors:
+            keep = [i for i, position in enumerate(rows) if position not in errors]
+            index = [rows[i] for i in keep]
+            columns = {
+                feature: [values[i] for i in keep] for feature, values in columns.items()
+            }
+        else:
+            index = rows
+
+        return BatchValidation(index, columns, dict(sorted(errors.items())))
+
+    def validate_columns(self, columns: dict) -> BatchValidation:
+        """Validate a batch of leads sent as one list of values per feature.
+
+        Each column is checked once, as in `validate`, without building a
+        dict per lead.
+
+        Args:
+            columns (dict): The input values, one list per feature, all of
+                the same length.
+
+        Returns:
+            BatchValidation: The values of the valid leads, by feature, and
+                every error of the invalid leads, in schema order.
+
+        Raises:
+            ValueError: If a feature is unknown or missing, or if the columns
+                are not lists of the same length.
+        """
+        unknown_keys = [key for key in columns if key not in self._known]
+        if unknown_keys:
+            raise ValueError(f"Unknown features: {', '.join(unknown_keys)}")
+        missing_keys = [key for key in self.feature_names if key not in columns]
+        if missing_keys:
+            raise ValueError(f"Missing features: {', '.join(missing_keys)}")
+        if not all(isinstance(values, list) for values in columns.values()):
+            raise ValueError("Expected a list of values per feature")
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("Expected the same number of values for every feature")
+
+        errors = {}
+        for column in self._columns:
+            values = columns[column.feature]
+            for position in column.suspects(values):
+                message = column.check(values[position])
+                if message is not None:
+                    errors.setdefault(position, []).append(
+                        FieldError(position, column.feature, message)
+                    )
+
+        n_leads = lengths.pop() if lengths else 0
+        if errors:
+            index = [position for position in range(n_leads) if position not in errors]
+            columns = {
+                feature: [columns[feature][position] for position in index]
+                for feature in self.feature_names
+            }
+        else:
+            index = list(range(n_leads))
+            columns = {feature: columns[feature] for feature in self.feature_names}
+
+        return BatchValidation(index, columns, dict(sorted(errors.items())))
+
+
+batch_validator = BatchValidator()
@@ -0,0 +1,58 @@
+"""Throughput of the offline scorer across 1..N worker processes.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_batch_score --rows 200000
+"""
+
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from app.batch_score import score_file
+from app.utils.constants import FEATURE_SCHEMA
+
+
+def write_leads(path: str, n_rows: int, seed: int = 0) -> None:
+    """Write a CSV of random valid leads."""
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for key, (type, expected_values) in FEATURE_SCHEMA.items():
+        if expected_values is not None:
+            columns[key] = rng.choice(np.array(expected_values, dtype=object), n_rows)
+        elif type == "float":
+            columns[key] = rng.integers(0, 30, n_rows).astype(float)
+        else:
+            columns[key] = rng.integers(0, 2500, n_rows)
+    pd.DataFrame(columns).to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--chunk-size", type=int, default=5_000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        input_path = os.path.join(directory, "leads.csv")
+        output_path = os.path.join(directory, "predictions.csv")
+        write_leads(input_path, args.rows)
+
+        print(f"{'workers':>8}{'seconds':>10}{'rows/sec':>12}{'speedup':>9}")
+        baseline = None
+        for workers in range(1, args.max_workers + 1):
+            report = score_file(input_path, output_path, workers, args.chunk_size)
+            baseline = baseline or report["rows_per_second"]
+            print(
+                f"{workers:>8}{report['seconds']:>10.2f}"
+                f"{report['rows_per_second']:>12.0f}"
+                f"{report['rows_per_second'] / baseline:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Cold start of the service: import, app creation and first prediction.
+
+Each configuration runs in a fresh interpreter, so nothing is cached in the
+process. The artifacts come either from the legacy files of `artifacts/` or
+from a bundle built into a temporary directory, and are loaded either on the
+first request (lazy) or when the app is created (warm-up).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_cold_start --repeat 5
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from app.bundle import main as bundle_main
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+import run
+imported = time.perf_counter()
+app = run.create_app()
+created = time.perf_counter()
+from app.services.ml_service import WARM_UP_LEAD
+response = app.test_client().post("/predict", json=WARM_UP_LEAD)
+assert response.status_code == 200, response.data
+predicted = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "create_app": created - imported,
+    "first_predict": predicted - created,
+    "total": predicted - start,
+}))
+"""
+
+
+def run_child(env: dict) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        env={**os.environ, **env},
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as bundles_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            bundle_main(["build", "--bundles-dir", bundles_dir, "--version", "bench"])
+        configurations = [
+            ("legacy files", "lazy", {"MODEL_BUNDLES_DIR": os.devnull}),
+            ("legacy files", "warm-up", {"MODEL_BUNDLES_DIR": os.devnull}),
+            ("bundle", "lazy", {"MODEL_BUNDLES_DIR": bundles_dir}),
+            ("bundle", "warm-up", {"MODEL_BUNDLES_DIR": bundles_dir}),
+        ]
+
+        columns = ["import", "create_app", "first_predict", "total"]
+        print(f"{'artifacts':>13}{'loading':>9}" + "".join(f"{c:>15}" for c in columns))
+        for source, loading, env in configurations:
+            env = {**env, "WARM_UP_ON_START": "1" if loading == "warm-up" else "0"}
+            runs = [run_child(env) for _ in range(args.repeat)]
+            medians = [statistics.median(run[c] for run in runs) for c in columns]
+            print(
+                f"{source:>13}{loading:>9}"
+                + "".join(f"{1000 * m:>12.1f} ms" for m in medians)
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Latency of the sklearn path against the fused and factorized engines.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_engine
+"""
+
+import time
+
+import numpy as np
+
+from app.services.engine import FactorizedSVMEngine, FusedSVMEngine
+from app.services.ml_service import encoders, model, scaler
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+
+
+def sample_features(n: int, seed: int = 0) -> np.ndarray:
+    """Draw encoded features from the training distribution (the support vectors)."""
+    features = model.best_estimator_.support_vectors_ * scaler.scale_ + scaler.mean_
+    rng = np.random.default_rng(seed)
+    return features[rng.integers(0, len(features), n)]
+
+
+def time_call(func, features: np.ndarray, budget: float = 1.0) -> float:
+    """Return the median latency of func(features), in milliseconds."""
+    timings = []
+    deadline = time.perf_counter() + budget
+    while len(timings) < 3 or (time.perf_counter() < deadline and len(timings) < 1000):
+        start = time.perf_counter()
+        func(features)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1e3
+
+
+def main():
+    runners = {
+        "sklearn": lambda X: model.predict((X - scaler.mean_) / scaler.scale_),
+        "fused64": FusedSVMEngine.from_artifacts(model, scaler).predict,
+        "fused32": FusedSVMEngine.from_artifacts(model, scaler, np.float32).predict,
+        "factorized": FactorizedSVMEngine.from_artifacts(model, scaler, encoders).predict,
+    }
+
+    print(f"{'batch':>8}" + "".join(f"{name + ' (ms)':>16}" for name in runners))
+    for batch_size in BATCH_SIZES:
+        features = sample_features(batch_size)
+        row = "".join(f"{time_call(run, features):>16.3f}" for run in runners.values())
+        print(f"{batch_size:>8}" + row)
+
+
+if __name__ == "__main__":
+    main()
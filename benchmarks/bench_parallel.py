@@ -0,0 +1,80 @@
+"""Throughput of chunked, multi-threaded scoring across 1..N cores.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_parallel --rows 100000
+
+Each inference mode scores the same batch through an ExecutionPolicy with 1
+to --max-threads threads, BLAS capped at one thread each, and then with the
+BLAS pools left at their default size, to show oversubscription.
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from threadpoolctl import threadpool_limits
+
+from app.services.engine import FactorizedSVMEngine, FusedSVMEngine
+from app.services.execution import ExecutionPolicy
+from app.services.ml_service import encoders, model, scaler
+
+
+def sample_features(n: int, seed: int = 0) -> np.ndarray:
+    """Draw encoded features from the training distribution (the support vectors)."""
+    features = model.best_estimator_.support_vectors_ * scaler.scale_ + scaler.mean_
+    rng = np.random.default_rng(seed)
+    return features[rng.integers(0, len(features), n)]
+
+
+def rows_per_second(policy: ExecutionPolicy, function, features, repeats: int) -> float:
+    """Return the best throughput of scoring the batch through the policy."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        policy.map(function, features)
+        best = min(best, time.perf_counter() - start)
+    return len(features) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--max-threads", type=int, default=os.cpu_count())
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    features = sample_features(args.rows)
+    scaled = (features - scaler.mean_) / scaler.scale_
+    runners = {
+        "sklearn": (model.predict, scaled),
+        "fused": (FusedSVMEngine.from_artifacts(model, scaler).predict, features),
+        "factorized": (
+            FactorizedSVMEngine.from_artifacts(model, scaler, encoders).predict,
+            features,
+        ),
+    }
+    default_blas_threads = os.cpu_count()
+
+    print(f"{'mode':>11}{'threads':>9}{'blas':>6}{'rows/sec':>12}{'speedup':>9}")
+    for name, (function, batch) in runners.items():
+        baseline = None
+        for n_threads in range(1, args.max_threads + 1):
+            for blas_threads in sorted({1, default_blas_threads}):
+                policy = ExecutionPolicy(
+                    n_threads, None, parallel_min_rows=1, chunk_size=args.chunk_size
+                )
+                with threadpool_limits(limits=blas_threads):
+                    throughput = rows_per_second(policy, function, batch, args.repeats)
+                baseline = baseline or throughput
+                print(
+                    f"{name:>11}{n_threads:>9}{blas_threads:>6}{throughput:>12.0f}"
+                    f"{throughput / baseline:>9.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
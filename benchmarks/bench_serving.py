@@ -0,0 +1,222 @@
+"""Latency of each stage of the serving path, and of the full HTTP route.
+
+The stages are timed separately, on the same random leads:
+
+    validation   the column-wise BatchValidator
+    dataframe    building the feature DataFrame from the validated columns
+    encoding     the label encoders, column by column
+    scaling      the scaler
+    inference    model.predict (or the engine of INFERENCE_MODE)
+    pipeline     the compiled FeaturePipeline (validation + encoding + scaling)
+    response     format_response and JSON serialization
+    route        POST /predict (one lead) or /predict/batch, via the test client
+
+Each cell reports the p50, p95 and p99 latency in milliseconds. Results can
+be saved as a JSON baseline and compared with a later run:
+
+    python -m benchmarks.bench_serving --save baseline.json
+    python -m benchmarks.bench_serving --compare baseline.json
+
+With --compare, the exit status is 1 when any p50 is slower than the
+baseline by more than --threshold (a ratio) and by more than --min-delta
+milliseconds, which keeps timer noise on microsecond stages out.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from app.services import ml_service
+from app.utils.constants import FEATURE_NAMES, FEATURE_SCHEMA, INFERENCE_MODE
+from app.utils.helpers import format_response
+from app.utils.validation import batch_validator
+from run import create_app
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+STAGES = [
+    "validation",
+    "dataframe",
+    "encoding",
+    "scaling",
+    "inference",
+    "pipeline",
+    "response",
+    "route",
+]
+
+
+def sample_leads(n: int, seed: int = 0) -> list[dict]:
+    """Draw random valid leads."""
+    rng = np.random.default_rng(seed)
+    leads = []
+    for _ in range(n):
+        lead = {}
+        for key, (type, expected_values) in FEATURE_SCHEMA.items():
+            if expected_values is not None:
+                lead[key] = expected_values[rng.integers(len(expected_values))]
+            elif type == "float":
+                lead[key] = float(rng.integers(0, 30))
+            else:
+                lead[key] = int(rng.integers(0, 2500))
+        leads.append(lead)
+    return leads
+
+
+def build_frame(columns: dict) -> pd.DataFrame:
+    """Build the feature DataFrame the way extract_batch_features does."""
+    return pd.DataFrame(
+        {feature: np.array(values, dtype=object) for feature, values in columns.items()},
+        columns=FEATURE_NAMES,
+    )
+
+
+def build_stages(leads: list[dict], client) -> dict:
+    """Return one callable per stage, each fed with the output of the previous."""
+    artifacts = ml_service.get_artifacts()
+    columns = batch_validator.validate(leads).columns
+    frame = build_frame(columns)
+    encoded = frame.copy()
+    for key, encoder in artifacts.encoders.items():
+        encoded[key] = encoder.transform(encoded[key])
+    encoded = encoded.to_numpy(dtype=np.float64)
+    predictions = ml_service.predict_encoded(encoded, artifacts)
+
+    def encode():
+        copy = frame.copy()
+        for key, encoder in artifacts.encoders.items():
+            copy[key] = encoder.transform(copy[key])
+        return copy.to_numpy(dtype=np.float64)
+
+    def respond():
+        body = [{"prediction": prediction} for prediction in predictions]
+        return json.dumps(format_response({"predictions": body}))
+
+    def route():
+        if len(leads) == 1:
+            response = client.post("/predict", json=leads[0])
+        else:
+            response = client.post("/predict/batch", json=leads)
+        assert response.json["status"] == 200, response.json
+
+    return {
+        "validation": lambda: batch_validator.validate(leads),
+        "dataframe": lambda: build_frame(columns),
+        "encoding": encode,
+        "scaling": lambda: artifacts.pipeline.scale_features(encoded.copy()),
+        "inference": lambda: ml_service._score(encoded, artifacts),
+        "pipeline": lambda: artifacts.pipeline.transform_many(leads),
+        "response": respond,
+        "route": route,
+    }
+
+
+def measure(
+    func, budget: float, min_repeats: int = 5, max_repeats: int = 1000
+) -> dict:
+    """Return the p50, p95 and p99 latency of func(), in milliseconds."""
+    func()  # Warm-up
+    timings = []
+    deadline = time.perf_counter() + budget
+    while len(timings) < min_repeats or (
+        time.perf_counter() < deadline and len(timings) < max_repeats
+    ):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99]) * 1e3
+    return {"p50": p50, "p95": p95, "p99": p99, "repeats": len(timings)}
+
+
+def compare(
+    results: dict, baseline: dict, threshold: float, min_delta: float = 0.0
+) -> list[str]:
+    """Return the cells whose p50 regressed by more than both tolerances."""
+    regressions = []
+    for stage, by_batch in results.items():
+        for batch_size, current in by_batch.items():
+            previous = baseline.get(stage, {}).get(batch_size)
+            if previous is None:
+                continue
+            if (
+                current["p50"] > threshold * previous["p50"]
+                and current["p50"] - previous["p50"] > min_delta
+            ):
+                regressions.append(
+                    f"{stage} @ {batch_size}: {previous['p50']:.3f} ms -> "
+                    f"{current['p50']:.3f} ms"
+                )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=BATCH_SIZES)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument(
+        "--budget", type=float, default=1.0, help="Seconds spent per cell"
+    )
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare with this JSON baseline")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    parser.add_argument("--min-delta", type=float, default=0.05)
+    args = parser.parse_args()
+
+    client = create_app().test_client()
+    results = {stage: {} for stage in args.stages}
+
+    print(f"{'stage':>12}{'batch':>8}{'p50 (ms)':>12}{'p95 (ms)':>12}{'p99 (ms)':>12}")
+    for batch_size in args.batch_sizes:
+        stages = build_stages(sample_leads(batch_size), client)
+        for stage in args.stages:
+            result = measure(stages[stage], args.budget)
+            results[stage][str(batch_size)] = result
+            print(
+                f"{stage:>12}{batch_size:>8}{result['p50']:>12.3f}"
+                f"{result['p95']:>12.3f}{result['p99']:>12.3f}"
+            )
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(
+                {
+                    "environment": {
+                        "python": platform.python_version(),
+                        "numpy": np.__version__,
+                        "pandas": pd.__version__,
+                        "scikit-learn": sklearn.__version__,
+                        "inference_mode": INFERENCE_MODE,
+                        "machine": platform.machine(),
+                    },
+                    "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(
+            results, baseline["results"], args.threshold, args.min_delta
+        )
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No p50 regression above {args.threshold:.2f}x", file=sys.stderr)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
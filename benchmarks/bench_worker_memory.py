@@ -0,0 +1,109 @@
+"""RSS and PSS of prefork workers, by artifact storage mode and preloading.
+
+Each configuration runs in a fresh interpreter that mimics a prefork server:
+with preloading, the master imports the service before forking the workers;
+without it, each worker imports it after the fork. Linux only (reads
+/proc/<pid>/smaps_rollup).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_worker_memory --workers 4
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+CONFIGURATIONS = [
+    ("joblib", False),
+    ("joblib", True),
+    ("mmap", False),
+    ("mmap", True),
+]
+
+
+def read_memory(pid: int) -> dict:
+    """Return the RSS and PSS of a process, in KiB."""
+    memory = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                memory[key.lower()] = int(value.split()[0])
+    return memory
+
+
+def run_configuration(workers: int, preload: bool) -> list[dict]:
+    """Fork the workers, warm them up, and measure them. Runs in the child."""
+
+    def load_and_warm_up():
+        from app.services import ml_service
+
+        ml_service.warm_up()
+
+    if preload:
+        load_and_warm_up()
+
+    pids, ready = [], []
+    for _ in range(workers):
+        read_end, write_end = os.pipe()
+        release_read, release_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            load_and_warm_up()
+            os.write(write_end, b"1")
+            os.read(release_read, 1)
+            os._exit(0)
+        pids.append(pid)
+        ready.append((read_end, release_write))
+
+    for read_end, _ in ready:
+        os.read(read_end, 1)
+    measurements = [read_memory(pid) for pid in pids]
+    for _, release_write in ready:
+        os.write(release_write, b"1")
+    for pid in pids:
+        os.waitpid(pid, 0)
+
+    return measurements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--child", nargs=2, metavar=("STORAGE", "PRELOAD"))
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_configuration(args.workers, args.child[1] == "1")))
+        return
+
+    print(f"{'storage':>8}{'preload':>9}{'worker':>8}{'RSS (MiB)':>11}{'PSS (MiB)':>11}")
+    for storage, preload in CONFIGURATIONS:
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.bench_worker_memory",
+                "--workers",
+                str(args.workers),
+                "--child",
+                storage,
+                "1" if preload else "0",
+            ],
+            env={**os.environ, "ARTIFACT_STORAGE": storage},
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        for worker, memory in enumerate(json.loads(output)):
+            print(
+                f"{storage:>8}{'yes' if preload else 'no':>9}{worker:>8}"
+                f"{memory['rss'] / 1024:>11.1f}{memory['pss'] / 1024:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
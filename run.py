@@ -1,10 +1,14 @@
 from flask import Flask
 from app.routes import bp as routes_bp
+from app.services.ml_service import warm_up
+from app.utils.constants import WARM_UP_ON_START
 
 
 def create_app():
     app = Flask(__name__)
     app.register_blueprint(routes_bp)
+    if WARM_UP_ON_START:
+        warm_up()
     return app
 
 
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from app.services.admission import BULK, INTERACTIVE, AdmissionController
+from app.services.batcher import DeadlineExceededError, QueueFullError
+
+
+def _acquire_in_thread(controller, priority, order, name):
+    def acquire():
+        try:
+            controller.acquire(priority)
+        except QueueFullError:
+            order.append(f"{name} shed")
+            return
+        order.append(name)
+
+    thread = threading.Thread(target=acquire)
+    thread.start()
+    time.sleep(0.05)  # The request is queued
+    return thread
+
+
+def test_admission_admits_interactive_requests_first():
+    """Test that a freed slot goes to queued interactive requests before bulk ones."""
+    controller = AdmissionController(max_concurrency=1, max_queue_size=4, timeout=5)
+    controller.acquire(BULK)
+    order = []
+    bulk = _acquire_in_thread(controller, BULK, order, "bulk")
+    interactive = _acquire_in_thread(controller, INTERACTIVE, order, "interactive")
+    assert controller.stats()["queue_depth"] == {INTERACTIVE: 1, BULK: 1}
+
+    controller.release(BULK)
+    interactive.join(1)
+    controller.release(INTERACTIVE)
+    bulk.join(1)
+    assert order == ["interactive", "bulk"]
+
+    controller.release(BULK)
+    stats = controller.stats()
+    assert stats["active"] == {INTERACTIVE: 0, BULK: 0}
+    assert stats["admitted"] == {INTERACTIVE: 1, BULK: 2}
+
+
+def test_admission_reserves_slots_for_interactive_requests():
+    """Test that bulk requests leave the reserved slots to interactive ones."""
+    controller = AdmissionController(
+        max_concurrency=2, max_queue_size=4, timeout=5, interactive_reserve=1
+    )
+    controller.acquire(BULK)
+    order = []
+    bulk = _acquire_in_thread(controller, BULK, order, "bulk")
+    assert order == [], "The second slot is reserved"
+
+    controller.acquire(INTERACTIVE)
+    controller.release(INTERACTIVE)
+    assert order == []
+
+    controller.release(BULK)
+    bulk.join(1)
+    assert order == ["bulk"]
+    controller.release(BULK)
+
+
+def test_admission_sheds_bulk_requests_when_the_queue_is_full():
+    """Test that a full queue rejects at once, except interactive over bulk requests."""
+    controller = AdmissionController(max_concurrency=1, max_queue_size=1, timeout=5)
+    controller.acquire(INTERACTIVE)
+    order = []
+    bulk = _acquire_in_thread(controller, BULK, order, "bulk")
+
+    start = time.monotonic()
+    with pytest.raises(QueueFullError):
+        controller.acquire(BULK)
+    assert time.monotonic() - start < 0.05, "A full queue rejects without waiting"
+
+    interactive = _acquire_in_thread(controller, INTERACTIVE, order, "interactive")
+    bulk.join(1)
+    assert order == ["bulk shed"]
+
+    controller.release(INTERACTIVE)
+    interactive.join(1)
+    assert order == ["bulk shed", "interactive"]
+    assert controller.stats()["rejected"] == {INTERACTIVE: 0, BULK: 2}
+
+
+def test_admission_drops_requests_past_their_deadline():
+    """Test that expired requests are dropped on arrival and while queued."""
+    controller = AdmissionController(max_concurrency=1, max_queue_size=4, timeout=5)
+
+    with pytest.raises(DeadlineExceededError):
+        controller.acquire(INTERACTIVE, deadline=time.monotonic() - 1)
+
+    controller.acquire(INTERACTIVE)
+    with pytest.raises(DeadlineExceededError):
+        controller.acquire(INTERACTIVE, deadline=time.monotonic() + 0.05)
+    controller.release(INTERACTIVE)
+
+    stats = controller.stats()
+    assert stats["expired"] == {INTERACTIVE: 2, BULK: 0}
+    assert stats["active"] == {INTERACTIVE: 0, BULK: 0}
+    assert stats["queue_depth"] == {INTERACTIVE: 0, BULK: 0}
@@ -0,0 +1,96 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.distill import main
+from app.services import artifacts as artifacts_module
+from app.services.approximation import (
+    build_engine,
+    fidelity_report,
+    fit_nystroem,
+    load_approximation,
+    sample_leads,
+    save_approximation,
+)
+from app.services.artifacts import ModelArtifacts
+from app.services.engine import _unwrap_svc
+from app.services.ml_service import get_artifacts
+
+
+@pytest.fixture(scope="module")
+def approximation():
+    """Fixture to fit a small approximation of the served model, with its report."""
+    served = get_artifacts()
+    leads = sample_leads(_unwrap_svc(served.model), served.scaler, 3000)
+    fitted = fit_nystroem(served.model, served.scaler, leads[1000:], n_landmarks=128)
+    engine = build_engine(fitted, served.model, served.scaler)
+    report = fidelity_report(engine, served.model, served.scaler, leads[:1000])
+    return fitted, report
+
+
+def test_approximation_agrees_with_model(approximation, tmp_path):
+    """Test the approximation mostly agrees with the model, and survives a round trip."""
+    served = get_artifacts()
+    fitted, report = approximation
+    assert report["agreement"] > 0.9
+    assert report["n_landmarks"] == 128 and report["n_holdout"] == 1000
+
+    path = str(tmp_path / "approximation.npz")
+    save_approximation(path, fitted, report, served.version)
+    loaded = load_approximation(path, served.version, min_agreement=0.9)
+    assert loaded["report"] == report
+
+    leads = sample_leads(_unwrap_svc(served.model), served.scaler, 100, seed=1)
+    expected = build_engine(fitted, served.model, served.scaler)
+    engine = build_engine(loaded, served.model, served.scaler)
+    assert np.array_equal(
+        engine.decision_function(leads), expected.decision_function(leads)
+    )
+
+    with pytest.raises(ValueError, match="fitted for model version"):
+        load_approximation(path, "other", min_agreement=0.9)
+    with pytest.raises(ValueError, match="below the 100.00% threshold"):
+        load_approximation(path, served.version, min_agreement=1.0)
+
+
+def test_approximate_mode_falls_back_to_exact_model(
+    approximation, tmp_path, monkeypatch
+):
+    """Test the approximation is only served above the agreement threshold."""
+    served = get_artifacts()
+    fitted, report = approximation
+    path = str(tmp_path / "approximation.npz")
+    monkeypatch.setattr(artifacts_module, "APPROXIMATION_PATH", path)
+
+    def load():
+        return ModelArtifacts(
+            served.model,
+            served.encoders,
+            served.scaler,
+            served.version,
+            inference_mode="approximate",
+        )
+
+    assert load().engine is None, "No approximation has been fitted"
+
+    save_approximation(path, fitted, report, served.version)
+    monkeypatch.setattr(artifacts_module, "APPROXIMATION_MIN_AGREEMENT", 0.9)
+    artifacts = load()
+    assert artifacts.inference_mode == "approximate"
+    assert artifacts.engine.n_support == 128
+
+    monkeypatch.setattr(artifacts_module, "APPROXIMATION_MIN_AGREEMENT", 1.0)
+    artifacts = load()
+    assert artifacts.inference_mode == "sklearn" and artifacts.engine is None
+
+
+def test_distill_cli(tmp_path, capsys):
+    """Test the CLI writes the approximation with its fidelity report."""
+    path = tmp_path / "approximation.npz"
+    status = main(["--landmarks", "32", "--samples", "500", "-o", str(path)])
+
+    report = json.loads(capsys.readouterr().out)
+    assert path.exists()
+    assert status == (0 if report["agreement"] >= 0.99 else 1)
+    assert report["n_landmarks"] == 32
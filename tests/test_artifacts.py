@@ -0,0 +1,72 @@
+import json
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from app.bundle import main
+from app.services.artifacts import (
+    ModelArtifacts,
+    find_latest_bundle,
+    load_artifacts,
+    verify_bundle,
+)
+from app.services.ml_service import WARM_UP_LEAD
+
+
+def test_bundle_matches_legacy_files(tmp_path):
+    """Test a bundle built from artifacts/ makes the same predictions."""
+    assert main(["build", "--bundles-dir", str(tmp_path), "--version", "v1"]) == 0
+
+    bundle = ModelArtifacts.from_bundle(str(tmp_path / "v1"))
+    legacy = ModelArtifacts.from_legacy_files()
+    assert bundle.version == "v1"
+
+    features = bundle.pipeline.transform(WARM_UP_LEAD)[np.newaxis]
+    assert np.array_equal(
+        bundle.model.decision_function(features),
+        legacy.model.decision_function(features),
+    ), "Bundled model differs from the artifact files"
+
+
+def test_bundle_checksum_mismatch(tmp_path):
+    """Test a modified bundle is rejected."""
+    main(["build", "--bundles-dir", str(tmp_path), "--version", "v1"])
+    with open(tmp_path / "v1" / "model.joblib", "ab") as f:
+        f.write(b"\0")
+
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        verify_bundle(str(tmp_path / "v1"))
+    assert main(["verify", str(tmp_path / "v1")]) == 1
+
+    with pytest.raises(FileExistsError):
+        main(["build", "--bundles-dir", str(tmp_path), "--version", "v1"])
+
+
+def test_latest_bundle(tmp_path):
+    """Test the newest bundle is found and loaded, ignoring unfinished ones."""
+    assert find_latest_bundle(str(tmp_path)) is None
+
+    for version in ("20240101000000-a", "20250101000000-b"):
+        main(["build", "--bundles-dir", str(tmp_path), "--version", version])
+    (tmp_path / "20990101000000-c").mkdir()
+
+    latest = find_latest_bundle(str(tmp_path))
+    assert latest == str(tmp_path / "20250101000000-b")
+    assert load_artifacts(latest).version == "20250101000000-b"
+
+    manifest = json.loads((tmp_path / "20250101000000-b" / "manifest.json").read_text())
+    assert manifest["files"]["model.joblib"]["bytes"] > 0
+
+
+def test_import_does_not_load_model():
+    """Test importing the routes loads neither the artifacts nor sklearn."""
+    code = (
+        "import sys, app.routes, app.services.ml_service as s;"
+        "print(s.registry._current is None, 'sklearn' in sys.modules)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, check=True, text=True
+    ).stdout
+    assert output.split() == ["True", "False"], output
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+from app.batch_score import ResultWriter, score_file
+
+
+def test_score_file_keeps_input_order(tmp_path):
+    """Test the offline scorer writes one result per row, in input order."""
+    lead = {
+        "Lead Origin": "Lead Add Form",
+        "Lead Source": "Google",
+        "Do Not Email": 0,
+        "TotalVisits": 5.0,
+        "Total Time Spent on Website": 456,
+        "Last Activity": "Email Opened",
+        "Through Recommendations": 0,
+        "A free copy of Mastering The Interview": 1,
+        "Last Notable Activity": "SMS Sent",
+    }
+    leads = pd.DataFrame(
+        [{**lead, "Do Not Email": i % 2, "Lead ID": f"L{i}"} for i in range(25)]
+    )
+    leads.loc[7, "Lead Origin"] = "Bad value"
+
+    input_path = tmp_path / "leads.csv"
+    output_path = tmp_path / "predictions.csv"
+    leads.to_csv(input_path, index=False)
+
+    report = score_file(
+        str(input_path), str(output_path), workers=2, chunk_size=4, id_columns=["Lead ID"]
+    )
+
+    results = pd.read_csv(output_path)
+    assert report["rows"] == 25 and report["errors"] == 1
+    assert list(results["Lead ID"]) == [f"L{i}" for i in range(25)]
+    assert results.loc[7, "error"].startswith("Unexpected value 'Bad value'")
+    expected = ["Converted" if i % 2 == 0 else "Not Converted" for i in range(25)]
+    expected[7] = float("nan")
+    assert results["prediction"].drop(index=7).tolist() == expected[:7] + expected[8:]
+
+
+def test_parquet_results_with_errors_after_a_clean_chunk(tmp_path):
+    """Test an error in a later chunk fits the schema of a first chunk without any."""
+    pytest.importorskip("pyarrow")
+    writer = ResultWriter(str(tmp_path / "predictions.parquet"))
+    writer.write(pd.DataFrame({"prediction": ["Converted"], "error": [None]}))
+    writer.write(pd.DataFrame({"prediction": [None], "error": ["Unexpected value"]}))
+    writer.close()
+
+    results = pd.read_parquet(tmp_path / "predictions.parquet")
+    assert results["prediction"].tolist() == ["Converted", None]
+    assert results["error"].tolist() == [None, "Unexpected value"]
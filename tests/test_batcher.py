@@ -0,0 +1,146 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.services.batcher import DeadlineExceededError, MicroBatcher, QueueFullError
+
+
+def _submit_concurrently(batcher, values):
+    results = [None] * len(values)
+
+    def submit(i):
+        results[i] = batcher.submit(np.array([values[i]]))
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(values))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_micro_batcher_groups_requests_and_routes_results():
+    """Test that concurrent requests are scored together and get their own result."""
+    batch_sizes = []
+
+    def score(features):
+        batch_sizes.append(len(features))
+        return [float(value) * 10 for value in features[:, 0]]
+
+    batcher = MicroBatcher(score, max_batch_size=8, max_wait=0.05)
+    values = list(range(20))
+
+    assert _submit_concurrently(batcher, values) == [value * 10.0 for value in values]
+    assert sum(batch_sizes) == 20
+    assert max(batch_sizes) <= 8
+    assert len(batch_sizes) < 20, "Expected some requests to share a batch."
+
+    stats = batcher.stats()
+    assert stats["batch_size"]["count"] == len(batch_sizes)
+    assert stats["queue_wait_seconds"]["count"] == 20
+
+
+def test_micro_batcher_rejects_when_queue_is_full():
+    """Test that requests beyond the maximum queue depth are rejected."""
+    release = threading.Event()
+
+    def score(features):
+        release.wait()
+        return list(features[:, 0])
+
+    batcher = MicroBatcher(score, max_batch_size=1, max_wait=0, max_queue_size=1)
+    threading.Thread(target=batcher.submit, args=(np.array([0.0]),)).start()
+    time.sleep(0.05)  # The first request is being scored, the queue is empty
+    threading.Thread(target=batcher.submit, args=(np.array([1.0]),)).start()
+    time.sleep(0.05)  # The second request fills the queue
+
+    with pytest.raises(QueueFullError):
+        batcher.submit(np.array([2.0]))
+    assert batcher.stats()["rejected"] == 1
+    release.set()
+
+
+def test_micro_batcher_deadline():
+    """Test that a request not scored in time raises DeadlineExceededError."""
+
+    def score(features):
+        time.sleep(0.2)
+        return list(features[:, 0])
+
+    batcher = MicroBatcher(score, max_batch_size=1, max_wait=0)
+
+    with pytest.raises(DeadlineExceededError):
+        batcher.submit(np.array([0.0]), timeout=0.01)
+
+
+def test_micro_batcher_propagates_scoring_errors():
+    """Test that a scoring error is raised in every request of the batch."""
+
+    def score(features):
+        raise ValueError("boom")
+
+    batcher = MicroBatcher(score)
+
+    with pytest.raises(ValueError, match="boom"):
+        batcher.submit(np.array([0.0]))
+
+
+def test_micro_batcher_records_queue_wait_after_arrival():
+    """Test the queue wait is measured from arrival, so it is never negative."""
+    batcher = MicroBatcher(lambda features: list(features[:, 0]), max_wait=0)
+    for value in range(5):
+        time.sleep(0.02)  # The worker waits on an empty queue first
+        assert batcher.submit(np.array([float(value)])) == value
+
+    queue_wait = batcher.stats()["queue_wait_seconds"]
+    assert queue_wait["count"] == 5
+    assert 0 <= queue_wait["sum"] < 0.05
+
+
+def test_micro_batcher_expires_requests_in_queue():
+    """Test a request whose deadline passes while queued is expired, not scored."""
+    scored = []
+
+    def score(features):
+        scored.extend(features[:, 0])
+        return list(features[:, 0])
+
+    batcher = MicroBatcher(score, max_batch_size=8, max_wait=0.1)
+    batcher.submit(np.array([0.0]))
+    time.sleep(0.05)  # The worker waits on an empty queue
+
+    # The batch waits 0.1 s to fill, past the deadline of the request
+    with pytest.raises(DeadlineExceededError):
+        batcher.submit(np.array([1.0]), timeout=0.02)
+    time.sleep(0.15)
+
+    assert scored == [0.0]
+    assert batcher.stats()["expired"] == 1
+
+
+def test_micro_batcher_scores_each_context_separately():
+    """Test that rows submitted with different contexts are never scored together."""
+    calls = []
+
+    def score(features, context):
+        calls.append((context, len(features)))
+        return [(float(value), context) for value in features[:, 0]]
+
+    batcher = MicroBatcher(score, max_batch_size=16, max_wait=0.05)
+    results = [None] * 10
+
+    def submit(i):
+        context = "v1" if i % 2 else "v2"
+        results[i] = batcher.submit(np.array([float(i)]), context=context)
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [(float(i), "v1" if i % 2 else "v2") for i in range(10)]
+    assert sum(size for _, size in calls) == 10
+    assert {context for context, _ in calls} == {"v1", "v2"}
@@ -0,0 +1,100 @@
+import numpy as np
+
+from unittest.mock import patch
+
+from app.services import ml_service
+from app.services.cache import PredictionCache
+
+
+def test_cache_evicts_least_recently_used():
+    cache = PredictionCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")  # "b" is now the least recently used
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_expires_entries():
+    now = [0.0]
+    cache = PredictionCache(max_size=10, ttl=5, clock=lambda: now[0])
+    cache.put("a", 1)
+
+    now[0] = 4.9
+    assert cache.get("a") == 1
+    now[0] = 5.0
+    assert cache.get("a") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"]) == (1, 1, 1)
+
+
+def test_cache_is_invalidated_by_a_new_model_version():
+    cache = PredictionCache(max_size=10, version="v1")
+    cache.put("a", 1)
+
+    cache.set_version("v1")
+    assert cache.get("a") == 1
+    cache.set_version("v2")
+    assert cache.get("a") is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_predict_encoded_caches_canonical_features():
+    """Test that leads differing only by value types share a cache entry."""
+    lead = {
+        "Lead Origin": "Lead Add Form",
+        "Lead Source": "Google",
+        "Do Not Email": "0",
+        "TotalVisits": "5",
+        "Total Time Spent on Website": 456,
+        "Last Activity": "Email Opened",
+        "Through Recommendations": "0",
+        "A free copy of Mastering The Interview": "1",
+        "Last Notable Activity": "SMS Sent",
+    }
+    same_lead = {**lead, "Do Not Email": 0, "TotalVisits": 5.0}
+    cache = PredictionCache(max_size=10, version=ml_service.model_version)
+
+    with patch.object(ml_service, "cache", cache):
+        features = np.stack([ml_service.pipeline.encode(lead)] * 2)
+        first = ml_service.predict_encoded(features)
+        second = ml_service.predict_encoded(ml_service.pipeline.encode(same_lead)[None])
+
+    assert first == second * 2 == ["Converted", "Converted"]
+    assert cache.stats()["size"] == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_cache_keeps_predictions_with_the_version_that_made_them():
+    """Test a prediction of a replaced version is neither stored nor served."""
+    cache = PredictionCache(max_size=10, version="v2")
+    cache.put("a", 1, version="v1")
+    assert len(cache) == 0
+
+    cache.put("b", 2, version="v2")
+    assert cache.get("b", version="v1") is None
+    assert len(cache) == 0
+
+
+def test_predict_encoded_does_not_cache_across_a_swap():
+    """Test a swap during scoring keeps the old model's predictions out of the cache."""
+    artifacts = ml_service.get_artifacts()
+    cache = PredictionCache(max_size=10, version=artifacts.version)
+    score = ml_service._score
+
+    def score_then_swap(features, artifacts):
+        predictions = score(features, artifacts)
+        cache.set_version("reloaded")  # The model is swapped before the put
+        return predictions
+
+    features = artifacts.pipeline.encode(ml_service.WARM_UP_LEAD)[np.newaxis]
+    with patch.object(ml_service, "cache", cache), patch.object(
+        ml_service, "_score", score_then_swap
+    ):
+        assert ml_service.predict_encoded(features, artifacts) == ["Not Converted"]
+
+    assert cache.version == "reloaded" and len(cache) == 0
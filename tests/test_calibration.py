@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.calibrate import main
+from app.services.calibration import fit_platt, load_calibration, platt_probabilities
+from app.services.ml_service import get_artifacts
+
+
+def test_fit_platt_recovers_sigmoid():
+    """Test the Platt fit recovers the sigmoid that generated the labels."""
+    rng = np.random.default_rng(0)
+    scores = rng.normal(size=20_000)
+    labels = rng.random(20_000) < platt_probabilities(scores, 2.0, -1.0)
+
+    a, b = fit_platt(scores, labels)
+
+    assert a == pytest.approx(2.0, abs=0.1) and b == pytest.approx(-1.0, abs=0.1)
+    with pytest.raises(ValueError, match="both classes"):
+        fit_platt(scores, np.zeros_like(labels))
+
+
+def test_calibrate_cli(tmp_path, capsys):
+    """Test the CLI fits a calibration tied to the served model version."""
+    lead = {
+        "Lead Origin": "Lead Add Form",
+        "Lead Source": "Google",
+        "Do Not Email": 0,
+        "TotalVisits": 5.0,
+        "Total Time Spent on Website": 456,
+        "Last Activity": "Email Opened",
+        "Through Recommendations": 0,
+        "A free copy of Mastering The Interview": 1,
+        "Last Notable Activity": "SMS Sent",
+    }
+    # Leads who opt out of emails score lower, and mostly do not convert
+    rows = [
+        {**lead, "Do Not Email": i % 2, "Converted": int((i % 2 == 0) != (i % 10 == 3))}
+        for i in range(60)
+    ]
+    rows[0]["Lead Origin"] = "Bad value"
+    input_path = tmp_path / "labeled.csv"
+    output_path = tmp_path / "calibration.json"
+    pd.DataFrame(rows).to_csv(input_path, index=False)
+
+    assert main([str(input_path), "-o", str(output_path), "--chunk-size", "16"]) == 0
+    assert "Fitted on 59 leads (1 skipped)" in capsys.readouterr().err
+
+    a, b = load_calibration(str(output_path), get_artifacts().version)
+    assert a > 0, "Higher scores must mean higher probabilities"
+    with pytest.raises(ValueError, match="fitted for model version"):
+        load_calibration(str(output_path), "another-version")
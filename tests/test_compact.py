@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.approximation import sample_leads
+from app.services.artifacts import ModelArtifacts, load_artifacts
+from app.services.compact import CodeTable, compact_report, export_compact
+from app.services.engine import _unwrap_svc
+from app.services.ml_service import WARM_UP_LEAD, get_artifacts, predict_batch
+from app.services.registry import ModelRegistry
+
+
+def test_compact_model_matches_the_original(tmp_path):
+    """Test a float64 compact export predicts like the model, without sklearn."""
+    artifacts = get_artifacts()
+    path = str(tmp_path / "model.compact.bin")
+    export_compact(path, artifacts)
+
+    compact = load_artifacts(path, inference_mode="fused")
+    assert compact.version == artifacts.version
+    assert compact.model is None and compact.inference_mode == "fused"
+    assert all(isinstance(table, CodeTable) for table in compact.encoders.values())
+
+    leads = sample_leads(_unwrap_svc(artifacts.model), artifacts.scaler, 2000)
+    report = compact_report(artifacts, compact, leads)
+    assert report["disagreement"] == 0
+    assert report["max_score_error"] < 1e-9
+
+    batch = pd.DataFrame([WARM_UP_LEAD, {**WARM_UP_LEAD, "Lead Origin": "API"}])
+    assert predict_batch(batch, compact) == predict_batch(batch, artifacts)
+
+
+def test_compact_model_in_float32(tmp_path):
+    """Test a float32 export is smaller and serves the fused and factorized modes."""
+    artifacts = get_artifacts()
+    sizes = {
+        dtype: export_compact(str(tmp_path / f"{dtype}.bin"), artifacts, dtype)
+        for dtype in ("float64", "float32")
+    }
+    assert sizes["float32"] < 0.6 * sizes["float64"]
+
+    path = str(tmp_path / "float32.bin")
+    leads = sample_leads(_unwrap_svc(artifacts.model), artifacts.scaler, 2000)
+    for inference_mode in ("fused", "factorized"):
+        compact = ModelArtifacts.from_compact(path, inference_mode=inference_mode)
+        report = compact_report(artifacts, compact, leads)
+        assert report["disagreement"] < 0.001, inference_mode
+        if inference_mode == "fused":
+            assert compact.engine.dtype == np.float32
+
+    with pytest.raises(ValueError, match="not 'sklearn'"):
+        ModelArtifacts.from_compact(path, inference_mode="sklearn")
+
+
+def test_compact_model_reloads_and_shares_its_engine(tmp_path):
+    """Test a served compact file is not reloaded, and its engine can be mapped."""
+    path = str(tmp_path / "model.compact.bin")
+    export_compact(path, get_artifacts())
+
+    registry = ModelRegistry(path, bundles_dir=str(tmp_path))
+    served = registry.current
+    assert served.directory == path
+    assert registry.reload(path) is served, "Reloading the served file is a no-op"
+
+    features = sample_leads(_unwrap_svc(get_artifacts().model), served.scaler, 50)
+    private, shared = (
+        ModelArtifacts.from_compact(path, inference_mode="fused", storage=storage)
+        for storage in ("joblib", "mmap")
+    )
+    assert isinstance(shared.engine.weighted_sv, np.memmap)
+    assert (tmp_path / "model.compact.shared.bin").exists()
+    np.testing.assert_array_equal(
+        shared.engine.decision_function(features),
+        private.engine.decision_function(features),
+    )
+
+
+def test_code_table_matches_label_encoder():
+    """Test a code table encodes labels like the LabelEncoder it replaces."""
+    encoder = get_artifacts().encoders["Lead Source"]
+    table = CodeTable(np.asarray(encoder.classes_, dtype=str))
+    labels = ["Google", "Olark Chat", "Google", "Welingak Website"]
+
+    np.testing.assert_array_equal(table.transform(labels), encoder.transform(labels))
+    with pytest.raises(ValueError, match="unseen labels"):
+        table.transform(["Google", "Bing"])
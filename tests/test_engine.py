@@ -0,0 +1,106 @@
+import pytest
+import numpy as np
+
+from app.services.engine import FactorizedSVMEngine, FusedSVMEngine
+from app.services.ml_service import encoders, model, scaler
+from app.utils.constants import FEATURE_SCHEMA
+
+
+@pytest.fixture(scope="module")
+def training_features():
+    """Encoded features drawn from the training distribution.
+
+    The support vectors are training rows; resampling their categorical
+    columns and redrawing the numeric ones covers the rest of the input space.
+    """
+    support_vectors = model.best_estimator_.support_vectors_
+    features = support_vectors * scaler.scale_ + scaler.mean_
+
+    rng = np.random.default_rng(0)
+    resampled = features[rng.integers(0, len(features), 2000)]
+    resampled[:, 3] = rng.integers(0, 30, len(resampled))
+    resampled[:, 4] = rng.integers(0, 2500, len(resampled))
+
+    return np.vstack([features, resampled])
+
+
+def _reference(features):
+    scaled = (features - scaler.mean_) / scaler.scale_
+    return model.predict(scaled), model.decision_function(scaled)
+
+
+def test_fused_engine_matches_model(training_features):
+    """Test that the float64 engine agrees with model.predict."""
+    engine = FusedSVMEngine.from_artifacts(model, scaler)
+    expected_predictions, expected_scores = _reference(training_features)
+
+    assert np.allclose(
+        engine.decision_function(training_features), expected_scores, rtol=0, atol=1e-9
+    )
+    assert np.array_equal(engine.predict(training_features), expected_predictions)
+
+
+def test_fused_engine_float32_matches_model(training_features):
+    """Test that the float32 engine stays close to model.predict."""
+    engine = FusedSVMEngine.from_artifacts(model, scaler, dtype=np.float32)
+    expected_predictions, expected_scores = _reference(training_features)
+
+    assert np.allclose(
+        engine.decision_function(training_features), expected_scores, rtol=0, atol=1e-2
+    )
+    agreement = np.mean(engine.predict(training_features) == expected_predictions)
+    assert agreement >= 0.999, f"Expected at least 99.9% agreement, got {agreement}"
+
+
+def test_fused_engine_chunks_and_single_rows(training_features):
+    """Test that chunking and 1-D input do not change the decision values."""
+    engine = FusedSVMEngine.from_artifacts(model, scaler, chunk_size=7)
+    reference = FusedSVMEngine.from_artifacts(model, scaler)
+    features = training_features[:50]
+
+    assert np.allclose(
+        engine.decision_function(features), reference.decision_function(features)
+    )
+    assert engine.decision_function(features[0]).shape == (1,)
+
+
+def test_fused_engine_rejects_non_rbf_models():
+    """Test that only RBF SVCs can be folded."""
+    with pytest.raises(ValueError, match="Expected an RBF SVC"):
+        FusedSVMEngine.from_artifacts(scaler, scaler)
+
+
+def test_factorized_engine_matches_model(training_features):
+    """Test that the kernel factor tables agree exactly with model.predict."""
+    engine = FactorizedSVMEngine.from_artifacts(model, scaler, encoders)
+    expected_predictions, expected_scores = _reference(training_features)
+
+    assert np.allclose(
+        engine.decision_function(training_features), expected_scores, rtol=0, atol=1e-9
+    )
+    assert np.array_equal(engine.predict(training_features), expected_predictions)
+
+
+def test_factorized_engine_falls_back_out_of_vocabulary(training_features):
+    """Test that values outside the vocabularies are scored by the fused engine."""
+    engine = FactorizedSVMEngine.from_artifacts(model, scaler, encoders)
+    features = training_features[:20].copy()
+    features[::2, 2] = 0.5  # "Do Not Email" passes validation as any int-castable value
+
+    expected_predictions, expected_scores = _reference(features)
+
+    assert np.allclose(engine.decision_function(features), expected_scores, atol=1e-9)
+    assert np.array_equal(engine.predict(features), expected_predictions)
+
+
+def test_factorized_engine_memory_report():
+    """Test that the memory report covers every categorical feature once."""
+    engine = FactorizedSVMEngine.from_artifacts(model, scaler, encoders, max_group_size=16)
+    report = engine.memory_report()
+
+    features = [name for table in report["tables"] for name in table["features"]]
+    assert sorted(features) == sorted(
+        name for name, (_, expected_values) in FEATURE_SCHEMA.items() if expected_values
+    )
+    assert all(table["rows"] <= 16 for table in report["tables"])
+    assert report["total_bytes"] == sum(table["bytes"] for table in report["tables"])
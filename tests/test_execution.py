@@ -0,0 +1,49 @@
+import threading
+
+import numpy as np
+
+from app.services.execution import ExecutionPolicy
+
+
+def test_execution_policy_scores_large_batches_in_chunks_on_threads():
+    """Test that large batches are split across threads and reassembled in order."""
+    calls = []
+
+    def score(features):
+        calls.append((len(features), threading.current_thread().name))
+        return features[:, 0] * 2
+
+    policy = ExecutionPolicy(n_threads=2, parallel_min_rows=100, chunk_size=32)
+    features = np.arange(250, dtype=np.float64)[:, np.newaxis]
+
+    np.testing.assert_array_equal(policy.map(score, features), features[:, 0] * 2)
+    assert sorted(size for size, _ in calls) == [26] + [32] * 7
+    assert all(name.startswith("scoring") for _, name in calls)
+
+    calls.clear()
+    np.testing.assert_array_equal(
+        policy.map(score, features[:99]), features[:99, 0] * 2
+    )
+    assert calls == [(99, threading.current_thread().name)], "Small batches are serial"
+
+
+def test_execution_policy_matches_serial_scoring():
+    """Test that the served model scores the same through the thread pool."""
+    from app.services.engine import FusedSVMEngine
+    from app.services.ml_service import get_artifacts
+
+    artifacts = get_artifacts()
+    mean, scale = artifacts.scaler.mean_, artifacts.scaler.scale_
+    scaled = np.random.default_rng(0).standard_normal((1000, len(mean)))
+    features = mean + scaled * scale
+    engine = FusedSVMEngine.from_artifacts(artifacts.model, artifacts.scaler)
+
+    policy = ExecutionPolicy(n_threads=3, parallel_min_rows=1, chunk_size=64)
+    np.testing.assert_allclose(
+        policy.map(engine.decision_function, features),
+        engine.decision_function(features),
+    )
+    np.testing.assert_array_equal(
+        policy.map(artifacts.model.predict, scaled), artifacts.model.predict(scaled)
+    )
+    assert policy.stats()["n_threads"] == 3
@@ -0,0 +1,84 @@
+import pytest
+
+from app import routes
+from app.services import ml_service
+from app.services.ml_service import WARM_UP_LEAD
+from app.utils.metrics import Histogram, Metrics, metrics, render_histograms
+from run import create_app
+
+
+@pytest.fixture
+def enabled_metrics(monkeypatch):
+    """Fixture to record metrics into a fresh, enabled registry.
+
+    The prediction cache is off, so that every prediction runs inference.
+    """
+    fresh = Metrics(enabled=True)
+    monkeypatch.setattr(metrics, "enabled", True)
+    for attribute in ("_stages", "_durations", "_requests"):
+        monkeypatch.setattr(metrics, attribute, getattr(fresh, attribute))
+    monkeypatch.setattr(ml_service, "cache", None)
+    monkeypatch.setattr(routes, "cache", None)
+    return metrics
+
+
+@pytest.fixture
+def disabled_metrics(monkeypatch):
+    """Fixture to turn metrics off, whatever METRICS_ENABLED is."""
+    monkeypatch.setattr(metrics, "enabled", False)
+    return metrics
+
+
+def test_disabled_metrics_record_nothing():
+    """Test disabled metrics share a no-op timer and keep no state."""
+    disabled = Metrics(enabled=False)
+    with disabled.time("inference"):
+        pass
+    disabled.count_request("/predict", 200, 0.1)
+
+    assert disabled.time("a") is disabled.time("b")
+    assert "lead_stage_duration_seconds_count" not in disabled.render()
+
+
+def test_histogram_text_format():
+    """Test histograms are rendered as cumulative Prometheus buckets."""
+    histogram = Histogram([0.1, 1.0])
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value)
+
+    lines = render_histograms("latency", "Latency.", {(("stage", 'a"b'),): histogram})
+    assert lines == [
+        "# HELP latency Latency.",
+        "# TYPE latency histogram",
+        'latency_bucket{stage="a\\"b",le="0.1"} 1',
+        'latency_bucket{stage="a\\"b",le="1.0"} 3',
+        'latency_bucket{stage="a\\"b",le="+Inf"} 4',
+        'latency_sum{stage="a\\"b"} 4.05',
+        'latency_count{stage="a\\"b"} 4',
+    ]
+
+
+def test_metrics_route(enabled_metrics):
+    """Test /metrics reports stage timings and requests by status code."""
+    client = create_app().test_client()
+    client.post("/predict", json=WARM_UP_LEAD)
+    client.post("/predict", json={**WARM_UP_LEAD, "Lead Origin": "Bad value"})
+    client.post("/predict/batch", json=[WARM_UP_LEAD, {}])
+
+    response = client.get("/metrics")
+    assert response.mimetype == "text/plain"
+    text = response.data.decode()
+
+    for stage in ("parse", "encode", "validate", "dataframe", "inference"):
+        assert f'lead_stage_duration_seconds_count{{stage="{stage}"}}' in text, stage
+    assert 'lead_requests_total{route="/predict",status="200"} 1' in text
+    assert 'lead_requests_total{route="/predict",status="400"} 1' in text
+    assert 'lead_errors_total{route="/predict",status="400"} 1' in text
+    assert 'lead_requests_total{route="/predict/batch",status="200"} 1' in text
+    assert "lead_model_info{version=" in text
+
+
+def test_metrics_route_disabled(disabled_metrics):
+    """Test /metrics answers 404 when metrics are off."""
+    client = create_app().test_client()
+    assert client.get("/metrics").json["status"] == 404
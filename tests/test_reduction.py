@@ -0,0 +1,84 @@
+import json
+
+import joblib
+import numpy as np
+
+from app.reduce import main
+from app.services.approximation import sample_leads
+from app.services.engine import _unwrap_svc
+from app.services.ml_service import get_artifacts
+from app.services.reduction import (
+    merge_support_vectors,
+    prune_support_vectors,
+    reduce_model,
+    reduction_report,
+)
+
+
+def _scaled_leads(n: int) -> tuple[np.ndarray, np.ndarray]:
+    """Draw encoded leads, and scale them."""
+    served = get_artifacts()
+    leads = sample_leads(_unwrap_svc(served.model), served.scaler, n, seed=2)
+    return leads, (leads - served.scaler.mean_) / served.scaler.scale_
+
+
+def test_merging_identical_support_vectors_is_lossless():
+    """Test merging identical support vectors keeps the decision function."""
+    served = get_artifacts()
+    reduced = reduce_model(served.model)
+    svc, reduced_svc = _unwrap_svc(served.model), _unwrap_svc(reduced)
+    _, scaled = _scaled_leads(2000)
+
+    assert len(reduced_svc.support_vectors_) < len(svc.support_vectors_)
+    assert reduced_svc.n_support_.sum() == len(reduced_svc.support_vectors_)
+    assert np.allclose(
+        reduced.decision_function(scaled), served.model.decision_function(scaled)
+    )
+    assert len(svc.support_vectors_) == 3291, "The served model is left unchanged"
+
+
+def test_merge_and_prune_support_vectors():
+    """Test near-duplicates of a class are merged and small coefficients dropped."""
+    support_vectors = np.array([[0.0, 0.0], [0.01, 0.0], [0.0, 0.01], [5.0, 5.0]])
+    dual_coef = np.array([1.0, 1.0, -1.0, 0.001])
+
+    merged, merged_coef = merge_support_vectors(support_vectors, dual_coef, radius=0.1)
+    assert sorted(merged_coef.tolist()) == [-1.0, 0.001, 2.0]
+    assert merged[merged_coef == 2.0].tolist() == [[0.005, 0.0]]
+
+    pruned, pruned_coef = prune_support_vectors(support_vectors, dual_coef, 0.01)
+    assert len(pruned) == 3 and 0.001 not in pruned_coef
+
+
+def test_reduction_report():
+    """Test the report compares counts, sizes, latencies and predictions."""
+    served = get_artifacts()
+    leads, _ = _scaled_leads(500)
+    reduced = reduce_model(served.model, merge_radius=0.1)
+
+    report = reduction_report(
+        served.model, reduced, served.scaler, leads, batch_sizes=(1, 100), repeats=1
+    )
+
+    original, smaller = report["original"], report["reduced"]
+    assert smaller["n_support_vectors"] < original["n_support_vectors"]
+    assert smaller["support_vector_bytes"] < original["support_vector_bytes"]
+    assert set(smaller["latency_ms"]["fused"]) == {1, 100}
+    assert 0 <= report["disagreement"] < 0.01
+
+
+def test_reduce_cli(tmp_path, capsys):
+    """Test the CLI only writes a reduced model within the disagreement limit."""
+    output = tmp_path / "reduced.joblib"
+    argv = ["--samples", "500", "-o", str(output)]
+
+    assert main(argv + ["--merge-radius", "5", "--max-disagreement", "0"]) == 1
+    assert not output.exists()
+    capsys.readouterr()
+
+    assert main(argv) == 0
+    report = json.loads(capsys.readouterr().out)
+    reduced = joblib.load(output)
+    assert len(_unwrap_svc(reduced).support_vectors_) == (
+        report["reduced"]["n_support_vectors"]
+    )
@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from app import routes
+from app.bundle import main as bundle_main
+from app.services import ml_service
+from app.services.registry import ModelRegistry
+from run import create_app
+
+
+def build(bundles_dir, version):
+    bundle_main(["build", "--bundles-dir", str(bundles_dir), "--version", version])
+    return str(bundles_dir / version)
+
+
+def test_reload_swaps_atomically(tmp_path):
+    """Test a reload serves the new version while old snapshots stay usable."""
+    registry = ModelRegistry(
+        build(tmp_path, "v1"),
+        bundles_dir=str(tmp_path),
+        warm_up=ml_service._check_artifacts,
+    )
+    in_flight = registry.current
+    assert in_flight.version == "v1"
+
+    build(tmp_path, "v2")
+    assert registry.reload().version == "v2"
+    assert registry.current.version == "v2"
+    assert registry.reload().version == "v2", "Reloading the served bundle is a no-op"
+
+    features = in_flight.pipeline.encode(ml_service.WARM_UP_LEAD)[None]
+    assert ml_service.predict_encoded(features, in_flight) == ["Not Converted"]
+    assert registry.stats()["reloads"] == 1
+
+
+def test_failed_reload_keeps_serving(tmp_path):
+    """Test a bundle that fails validation is never served."""
+    registry = ModelRegistry(build(tmp_path, "v1"), bundles_dir=str(tmp_path))
+    registry.current
+
+    with open(build(tmp_path, "v2") + "/model.joblib", "ab") as f:
+        f.write(b"\0")
+
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        registry.reload()
+    assert registry.current.version == "v1"
+    assert registry.stats()["failed_reloads"] == 1
+    assert "Checksum mismatch" in registry.stats()["last_error"]
+
+
+def test_watcher_picks_up_new_bundle(tmp_path):
+    """Test the watcher serves a bundle dropped into the bundles directory."""
+    registry = ModelRegistry(build(tmp_path, "v1"), bundles_dir=str(tmp_path))
+    registry.watch(0.01)
+    try:
+        assert registry.current.version == "v1"
+        build(tmp_path, "v2")
+
+        deadline = time.monotonic() + 10
+        while registry.current.version != "v2" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert registry.current.version == "v2"
+    finally:
+        registry.stop()
+
+
+def test_admin_reload_route(tmp_path, monkeypatch):
+    """Test the admin reload route and the model version header."""
+    registry = ModelRegistry(build(tmp_path, "v1"), bundles_dir=str(tmp_path))
+    monkeypatch.setattr(ml_service, "registry", registry)
+    monkeypatch.setattr(routes, "registry", registry)
+    monkeypatch.setattr(routes, "MODEL_BUNDLES_DIR", str(tmp_path))
+    client = create_app().test_client()
+
+    response = client.post("/predict", json=ml_service.WARM_UP_LEAD)
+    assert response.headers["X-Model-Version"] == "v1"
+
+    response = client.post("/admin/reload", json={"version": "v1"})
+    assert response.json["status"] == 403, "Admin routes are off without a token"
+
+    monkeypatch.setattr(routes, "ADMIN_TOKEN", "secret")
+    headers = {"Authorization": "Bearer secret"}
+    build(tmp_path, "v2")
+
+    response = client.post("/admin/reload", json={"version": "../v2"}, headers=headers)
+    assert response.json["status"] == 400
+    response = client.post("/admin/reload", json={"version": "v3"}, headers=headers)
+    assert response.json["status"] == 404
+
+    response = client.post("/admin/reload", json={"version": "v2"}, headers=headers)
+    assert response.json["data"] == {"model_version": "v2", "previous_version": "v1"}
+
+    response = client.post("/predict/batch", json=[ml_service.WARM_UP_LEAD])
+    assert response.headers["X-Model-Version"] == "v2"
@@ -0,0 +1,33 @@
+import json
+
+from app.rescore import main
+from app.services.ml_service import WARM_UP_LEAD
+
+
+def test_rescore_cli_skips_unchanged_leads(tmp_path, capsys):
+    """Test a second run over the same leads only scores the changed ones."""
+    leads = [{**WARM_UP_LEAD, "Do Not Email": i % 2, "lead_id": i} for i in range(6)]
+    input_path = tmp_path / "leads.jsonl"
+    output_path = tmp_path / "scores.jsonl"
+    argv = [
+        str(input_path),
+        "--id-field",
+        "lead_id",
+        "--store",
+        str(tmp_path / "scores.sqlite3"),
+        "--chunk-size",
+        "4",
+    ]
+
+    input_path.write_text("".join(json.dumps(lead) + "\n" for lead in leads))
+    assert main(argv) == 0
+    assert "Scored 6 leads, skipped 0 unchanged, 0 errors" in capsys.readouterr().err
+
+    leads[2]["Do Not Email"] = 1
+    input_path.write_text("".join(json.dumps(lead) + "\n" for lead in leads))
+    assert main(argv + ["-o", str(output_path)]) == 0
+    assert "Scored 1 leads, skipped 5 unchanged, 0 errors" in capsys.readouterr().err
+
+    results = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert [result["lead_id"] for result in results] == list(range(6))
+    assert [result["rescored"] for result in results] == [i == 2 for i in range(6)]
@@ -1,14 +1,17 @@
 import pytest
 import json
 
+from app import routes
 from app.routes import bp as routes_bp
+from app.services.admission import BULK, AdmissionController
 from app.utils import WELCOME_MESSAGE
 from run import create_app
 
 
 @pytest.fixture
-def client():
-    """Fixture to provide a test client."""
+def client(monkeypatch):
+    """Fixture to provide a test client, with its own admission controller."""
+    monkeypatch.setattr(routes, "admission", AdmissionController())
     app = create_app()
     with app.test_client() as client:
         yield client
@@ -107,3 +110,360 @@ def test_predict_route_no_data(client):
     assert (
         response_json == expected_response
     ), f"Expected {expected_response}, but got {response_json}"
+
+
+def test_predict_batch_route_keeps_input_order(client):
+    """Test the /predict/batch route scores valid leads and reports errors per row."""
+    lead = {
+        "Lead Origin": "Lead Add Form",
+        "Lead Source": "Google",
+        "Do Not Email": "0",
+        "TotalVisits": 5.0,
+        "Total Time Spent on Website": 456,
+        "Last Activity": "Email Opened",
+        "Through Recommendations": "0",
+        "A free copy of Mastering The Interview": "1",
+        "Last Notable Activity": "SMS Sent",
+    }
+    input_data = [
+        {**lead, "Do Not Email": "1"},
+        {**lead, "Lead Origin": "Bad value"},
+        lead,
+    ]
+
+    response = client.post(
+        "/predict/batch",
+        data=json.dumps(input_data),
+        content_type="application/json",
+    )
+    response_json = json.loads(response.data.decode())
+
+    assert response_json["status"] == 200, f"Expected status code 200, but got {response_json}"
+
+    predictions = response_json["data"]["predictions"]
+    assert predictions[0] == {"prediction": "Not Converted"}
+    assert predictions[1]["error"].startswith("Unexpected value 'Bad value'")
+    assert predictions[2] == {"prediction": "Converted"}
+
+
+def test_predict_batch_route_not_a_list(client):
+    """Test the /predict/batch route rejects a single lead."""
+    expected_response = {"data": {"error": "Expected a list of leads"}, "status": 400}
+
+    response = client.post(
+        "/predict/batch",
+        data=json.dumps({"Lead Origin": "API"}),
+        content_type="application/json",
+    )
+    response_json = json.loads(response.data.decode())
+
+    assert (
+        response_json == expected_response
+    ), f"Expected {expected_response}, but got {response_json}"
+
+
+def test_predict_route_columnar(client):
+    """Test the /predict route scores a columnar payload like a list of leads."""
+    lead = {
+        "Lead Origin": "Lead Add Form",
+        "Lead Source": "Google",
+        "Do Not Email": "0",
+        "TotalVisits": 5.0,
+        "Total Time Spent on Website": 456,
+        "Last Activity": "Email Opened",
+        "Through Recommendations": "0",
+        "A free copy of Mastering The Interview": "1",
+        "Last Notable Activity": "SMS Sent",
+    }
+    leads = [{**lead, "Do Not Email": "1"}, {**lead, "Lead Origin": "Bad value"}, lead]
+    columns = {key: [lead[key] for lead in leads] for key in lead}
+
+    response = client.post("/predict", json=columns)
+    expected = client.post("/predict/batch", json=leads)
+
+    assert response.json["status"] == 200
+    assert response.json == expected.json
+
+    response = client.post("/predict", json={**columns, "TotalVisits": [1.0]})
+    assert response.json == {
+        "data": {"error": "Expected the same number of values for every feature"},
+        "status": 400,
+    }
+
+    response = client.post("/predict", json={**lead, "TotalVisits": [5.0]})
+    assert response.json == {
+        "data": {
+            "error": "Invalid value '[5.0]' for feature 'TotalVisits'. Expected a float."
+        },
+        "status": 400,
+    }
+
+
+def test_predict_route_columnar_checks_its_size_first(client, monkeypatch):
+    """Test an oversized columnar payload is rejected before it is validated."""
+    from app.services.ml_service import WARM_UP_LEAD
+
+    def validate_columns(columns):
+        raise AssertionError("The columns were validated")
+
+    monkeypatch.setattr(routes, "MAX_BATCH_SIZE", 2)
+    monkeypatch.setattr(routes.batch_validator, "validate_columns", validate_columns)
+    columns = {key: [value] * 3 for key, value in WARM_UP_LEAD.items()}
+
+    response = client.post("/predict", json=columns)
+    assert response.json == {
+        "data": {"error": "Too many leads: at most 2 per batch"},
+        "status": 400,
+    }
+
+
+def test_predict_route_npy(client):
+    """Test the /predict route scores a .npy body of encoded features."""
+    import io
+
+    import numpy as np
+
+    from app.services.ml_service import WARM_UP_LEAD, get_artifacts, predict_encoded
+
+    features = np.stack([get_artifacts().pipeline.encode(WARM_UP_LEAD)] * 3)
+    features[1, 0] = 9
+    body = io.BytesIO()
+    np.save(body, features.astype("<f4"))
+
+    response = client.post(
+        "/predict", data=body.getvalue(), content_type="application/x-npy"
+    )
+
+    predictions = response.json["data"]["predictions"]
+    expected = predict_encoded(features[[0]])[0]
+    assert predictions[0] == predictions[2] == {"prediction": expected}
+    assert predictions[1]["error"].startswith("Unexpected value '9' for feature 'Lead Origin'")
+
+    response = client.post(
+        "/predict", data=b"not a npy file", content_type="application/x-npy"
+    )
+    assert response.json["status"] == 400
+
+
+def test_predict_stream_route(client):
+    """Test the /predict/stream route answers one NDJSON line per lead, in order."""
+    lead = {
+        "Lead Origin": "Lead Add Form",
+        "Lead Source": "Google",
+        "Do Not Email": "0",
+        "TotalVisits": 5.0,
+        "Total Time Spent on Website": 456,
+        "Last Activity": "Email Opened",
+        "Through Recommendations": "0",
+        "A free copy of Mastering The Interview": "1",
+        "Last Notable Activity": "SMS Sent",
+    }
+    lines = [
+        json.dumps({**lead, "lead_id": "a"}),
+        "not json",
+        "",
+        json.dumps({**lead, "Do Not Email": "1", "lead_id": "b"}),
+    ]
+
+    with client.post(
+        "/predict/stream?id_field=lead_id",
+        data="\n".join(lines) + "\n",
+        content_type="application/x-ndjson",
+    ) as response:
+        results = [json.loads(line) for line in response.data.decode().splitlines()]
+
+    assert routes.admission.stats()["active"][BULK] == 0, "The stream freed its slot"
+    assert response.mimetype == "application/x-ndjson"
+    assert results[0] == {"lead_id": "a", "prediction": "Converted"}
+    assert "error" in results[1]
+    assert results[2] == {"lead_id": "b", "prediction": "Not Converted"}
+    assert len(results) == 3
+
+
+def test_predict_rank_route(client, tmp_path, monkeypatch):
+    """Test the /predict/rank route returns the top K leads, best first."""
+    from app import routes
+    from app.services.calibration import save_calibration
+    from app.services.ml_service import get_artifacts
+
+    lead = {
+        "Lead Origin": "Lead Add Form",
+        "Lead Source": "Google",
+        "Do Not Email": "0",
+        "TotalVisits": 5.0,
+        "Total Time Spent on Website": 456,
+        "Last Activity": "Email Opened",
+        "Through Recommendations": "0",
+        "A free copy of Mastering The Interview": "1",
+        "Last Notable Activity": "SMS Sent",
+    }
+    lines = [
+        json.dumps({**lead, "Do Not Email": "1", "lead_id": "a"}),
+        json.dumps({**lead, "lead_id": "b"}),
+        json.dumps({**lead, "Lead Origin": "Bad value", "lead_id": "c"}),
+    ]
+    body = "\n".join(lines) + "\n"
+
+    response = client.post("/predict/rank?k=1&id_field=lead_id", data=body)
+    data = response.json["data"]
+    assert [lead["id"] for lead in data["leads"]] == ["b"]
+    assert data["leads"][0]["score"] > 0, "A converted lead has a positive score"
+    assert data["scored"] == 2 and data["errors"] == 1
+
+    response = client.post("/predict/rank?k=0", data=body)
+    assert response.json["status"] == 400
+
+    calibration_path = tmp_path / "calibration.json"
+    monkeypatch.setattr(routes, "CALIBRATION_PATH", str(calibration_path))
+    response = client.post("/predict/rank?probabilities=true", data=body)
+    assert response.json["status"] == 400, "No calibration has been fitted"
+
+    save_calibration(str(calibration_path), 1.0, 0.0, get_artifacts().version, 10)
+    response = client.post(
+        "/predict/rank?k=2&probabilities=1&id_field=lead_id", data=body
+    )
+    probabilities = [lead["probability"] for lead in response.json["data"]["leads"]]
+    assert probabilities[0] > 0.5 > probabilities[1]
+
+
+def test_predict_rescore_route(client, tmp_path, monkeypatch):
+    """Test the /predict/rescore route reports scored and skipped leads."""
+    from app.services import ml_service
+    from app.services.score_store import ScoreStore
+
+    monkeypatch.setattr(
+        ml_service, "_score_store", ScoreStore(str(tmp_path / "scores.sqlite3"))
+    )
+    lines = [
+        json.dumps({**ml_service.WARM_UP_LEAD, "TotalVisits": float(i), "lead_id": i})
+        for i in range(3)
+    ]
+    body = "\n".join(lines + ["not json"]) + "\n"
+
+    response = client.post("/predict/rescore?id_field=lead_id", data=body)
+    assert response.json["data"] == {"scored": 3, "skipped": 0, "errors": 1}
+
+    response = client.post("/predict/rescore?id_field=lead_id", data=body)
+    assert response.json["data"] == {"scored": 0, "skipped": 3, "errors": 1}
+
+    response = client.post("/predict/rescore", data=body)
+    assert response.json["status"] == 400
+
+
+def test_predict_sweep_route(client):
+    """Test the /predict/sweep route finds where a lead flips to Converted."""
+    from app.services.ml_service import WARM_UP_LEAD
+
+    lead = {**WARM_UP_LEAD, "Lead Origin": "API"}
+    del lead["Total Time Spent on Website"]
+    grid = {"Total Time Spent on Website": {"start": 0, "stop": 2000, "num": 201}}
+
+    response = client.post("/predict/sweep", json={"lead": lead, "grid": grid})
+    data = response.json["data"]
+
+    assert len(data["scores"]) == 201
+    flips = data["thresholds"]["Total Time Spent on Website"]
+    assert [flip["prediction"] for flip in flips] == ["Converted"]
+    threshold = flips[0]["value"]
+    for minutes, expected in ((threshold - 20, "Not Converted"), (threshold + 20, "Converted")):
+        prediction = client.post(
+            "/predict", json={**lead, "Total Time Spent on Website": int(minutes)}
+        ).json["data"]["prediction"]
+        assert prediction == expected
+
+    response = client.post(
+        "/predict/sweep", json={"lead": {**lead, "Lead Origin": "Bad"}, "grid": grid}
+    )
+    assert response.json["status"] == 400
+
+
+def test_admission_control_of_scoring_routes(client, monkeypatch):
+    """Test that admission control sheds with a 503 and drops expired requests."""
+    import time
+
+    from app import routes
+    from app.services.admission import BULK, AdmissionController
+    from app.services.ml_service import WARM_UP_LEAD
+
+    controller = AdmissionController(max_concurrency=1, max_queue_size=0)
+    monkeypatch.setattr(routes, "admission", controller)
+
+    response = client.post("/predict", json=WARM_UP_LEAD)
+    assert response.json["status"] == 200
+
+    response = client.post(
+        "/predict", json=WARM_UP_LEAD, headers={"X-Request-Deadline": time.time() - 1}
+    )
+    assert response.status_code == 504
+    assert response.json["status"] == 504
+
+    response = client.post(
+        "/predict", json=WARM_UP_LEAD, headers={"X-Request-Priority": "urgent"}
+    )
+    assert response.json["status"] == 400
+
+    controller.acquire(BULK)  # Every slot is taken, and the queue holds none
+    response = client.post("/predict", json=WARM_UP_LEAD)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(routes.ADMISSION_RETRY_AFTER_S)
+    controller.release(BULK)
+
+    response = client.post("/predict/stream", data=json.dumps(WARM_UP_LEAD) + "\n")
+    assert response.data.decode().splitlines() == ['{"prediction": "Not Converted"}']
+    response.close()
+    assert controller.stats()["active"][BULK] == 0, "A streamed response frees its slot"
+
+
+def test_micro_batcher_overload_is_shed_like_admission(client, monkeypatch):
+    """Test a full micro-batcher queue answers a real 503 with Retry-After."""
+    from app.services.batcher import MicroBatcher
+    from app.services.ml_service import WARM_UP_LEAD
+
+    batcher = MicroBatcher(lambda features: [], max_queue_size=0)
+    monkeypatch.setattr(routes, "batcher", batcher)
+
+    response = client.post("/predict", json=WARM_UP_LEAD)
+    assert response.status_code == 503
+    assert response.json["status"] == 503
+    assert response.headers["Retry-After"] == str(routes.ADMISSION_RETRY_AFTER_S)
+    assert batcher.rejected == 1
+
+
+def test_micro_batched_predict_keeps_its_model_version(client, monkeypatch):
+    """Test a lead is scored by the artifacts that encoded it across a reload."""
+    import copy
+
+    from app import routes
+    from app.services import ml_service
+    from app.services.batcher import MicroBatcher
+
+    served = ml_service.get_artifacts()
+    reloaded = copy.copy(served)
+    reloaded.version = "reloaded"
+
+    def score(features, artifacts):
+        # A reload lands between the encoding and the flush of the batch
+        monkeypatch.setattr(ml_service, "get_artifacts", lambda: reloaded)
+        return ml_service.predict_encoded_versioned(features, artifacts)
+
+    monkeypatch.setattr(routes, "batcher", MicroBatcher(score, max_wait=0))
+    response = client.post("/predict", json=ml_service.WARM_UP_LEAD)
+    assert response.json["status"] == 200
+    assert response.headers["X-Model-Version"] == served.version
+
+
+def test_predict_routes_reject_non_finite_numbers(client):
+    """Test NaN and Infinity, which Flask parses, are rejected as invalid values."""
+    from app.services.ml_service import WARM_UP_LEAD
+
+    for value in ("NaN", "Infinity"):
+        body = json.dumps(WARM_UP_LEAD).replace("3.0", value)
+        response = client.post("/predict", data=body, content_type="application/json")
+        assert response.json["status"] == 400
+        assert "Expected a finite number" in response.json["data"]["error"]
+
+    body = json.dumps([WARM_UP_LEAD, WARM_UP_LEAD]).replace("3.0", "NaN", 1)
+    response = client.post("/predict/batch", data=body, content_type="application/json")
+    predictions = response.json["data"]["predictions"]
+    assert "Expected a finite number" in predictions[0]["error"]
+    assert predictions[1]["prediction"] == "Not Converted"
@@ -0,0 +1,36 @@
+import json
+
+from app.score import main
+
+
+def test_score_cli_keeps_input_order(tmp_path, capsys):
+    """Test the CLI scores a JSONL file in chunks and keeps the input order."""
+    lead = {
+        "Lead Origin": "Lead Add Form",
+        "Lead Source": "Google",
+        "Do Not Email": "0",
+        "TotalVisits": 5.0,
+        "Total Time Spent on Website": 456,
+        "Last Activity": "Email Opened",
+        "Through Recommendations": "0",
+        "A free copy of Mastering The Interview": "1",
+        "Last Notable Activity": "SMS Sent",
+    }
+    leads = [{**lead, "Do Not Email": str(i % 2), "id": i} for i in range(7)]
+    leads[3]["Lead Origin"] = "Bad value"
+
+    input_path = tmp_path / "leads.jsonl"
+    output_path = tmp_path / "predictions.jsonl"
+    input_path.write_text("".join(json.dumps(lead) + "\n" for lead in leads))
+
+    argv = [str(input_path), "-o", str(output_path), "--chunk-size", "2"]
+    assert main(argv + ["--id-field", "id"]) == 0
+
+    results = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert [result["id"] for result in results] == list(range(7))
+    assert "error" in results[3]
+    for i in (0, 2, 4, 6):
+        assert results[i]["prediction"] == "Converted"
+    for i in (1, 5):
+        assert results[i]["prediction"] == "Not Converted"
+    assert "Scored 6 leads, 1 errors" in capsys.readouterr().err
@@ -0,0 +1,68 @@
+import json
+
+import numpy as np
+
+from app.services.ml_service import (
+    WARM_UP_LEAD,
+    decision_scores,
+    get_artifacts,
+    rescore_lines,
+)
+from app.services.score_store import ScoreStore, StoredScore, feature_hashes
+
+
+def test_score_store_round_trip(tmp_path):
+    """Test scores are saved by lead ID, replaced, and persisted."""
+    path = str(tmp_path / "scores.sqlite3")
+    store = ScoreStore(path)
+    store.put_many(
+        [("a", StoredScore(b"h1", "v1", 0.5)), ("b", StoredScore(b"h2", "v1", -1.0))]
+    )
+    store.put_many([("a", StoredScore(b"h3", "v2", 0.25))])
+    store.close()
+
+    store = ScoreStore(path)
+    assert len(store) == 2
+    assert store.get("a") == StoredScore(b"h3", "v2", 0.25)
+    assert store.get("missing") is None
+    assert set(store.get_many([str(i) for i in range(1200)] + ["b"])) == {"b"}
+
+
+def test_feature_hashes_ignore_value_types():
+    """Test leads with equal encoded values hash alike."""
+    features = np.array([[0.0, 1.0], [-0.0, 1.0], [0.0, 2.0]])
+    hashes = feature_hashes(features)
+
+    assert hashes[0] == hashes[1] != hashes[2]
+
+
+def test_rescore_lines_only_scores_changed_leads():
+    """Test only new leads, changed leads and leads of another model version are scored."""
+    store = ScoreStore(":memory:")
+    artifacts = get_artifacts()
+    leads = [{**WARM_UP_LEAD, "TotalVisits": float(i), "id": i} for i in range(10)]
+    lines = [json.dumps(lead) for lead in leads]
+
+    first = list(rescore_lines(lines, store, "id", chunk_size=4))
+    assert all(result["rescored"] for result in first)
+    features = np.stack(
+        [
+            artifacts.pipeline.encode({**WARM_UP_LEAD, "TotalVisits": float(i)})
+            for i in range(10)
+        ]
+    )
+    assert [result["score"] for result in first] == decision_scores(features).tolist()
+
+    lines[3] = json.dumps({**leads[3], "TotalVisits": 30.0})
+    lines.append(json.dumps(WARM_UP_LEAD))
+    second = list(rescore_lines(lines, store, "id", chunk_size=4))
+    assert [i for i, result in enumerate(second) if result.get("rescored")] == [3]
+    assert second[10] == {"error": "Missing lead ID field 'id'"}
+    assert [result["score"] for result in second[:10] if not result["rescored"]] == [
+        result["score"] for i, result in enumerate(first) if i != 3
+    ]
+    assert second[0]["prediction"] == first[0]["prediction"]
+
+    store.put_many([("5", store.get("5")._replace(model_version="old"))])
+    third = list(rescore_lines(lines[:10], store, "id"))
+    assert [i for i, result in enumerate(third) if result["rescored"]] == [5]
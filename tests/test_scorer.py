@@ -0,0 +1,157 @@
+import copy
+import os
+import shutil
+import subprocess
+import sys
+
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import numpy as np
+import pytest
+
+from app.bundle import main
+from app.services import LeadScore, LeadScorer, decision_scores
+from app.services.ml_service import WARM_UP_LEAD, get_artifacts
+from app.utils.constants import ARTIFACTS_DIR
+
+
+@pytest.fixture(scope="module")
+def scorer():
+    """Fixture to load a scorer from the artifact files."""
+    return LeadScorer(ARTIFACTS_DIR)
+
+
+def _leads(n: int) -> list[dict]:
+    """Build valid leads with varied numeric features."""
+    return [
+        {
+            **WARM_UP_LEAD,
+            "TotalVisits": float(i % 20),
+            "Total Time Spent on Website": (i * 37) % 2000,
+        }
+        for i in range(n)
+    ]
+
+
+def test_scorer_matches_service(scorer):
+    """Test the three entry points give the scores of the service."""
+    leads = _leads(50)
+    features = np.stack([get_artifacts().pipeline.encode(lead) for lead in leads])
+    expected = decision_scores(features)
+
+    assert np.allclose([scorer.score_one(lead).score for lead in leads], expected)
+    assert np.allclose([result.score for result in scorer.score_many(leads)], expected)
+    assert np.allclose(scorer.score_array(features), expected)
+    assert scorer.score_one(leads[0]).prediction == (
+        "Converted" if expected[0] > 0 else "Not Converted"
+    )
+
+
+def test_scorer_loads_bundles(tmp_path):
+    """Test a scorer loads a model bundle as well as the artifact files."""
+    main(["build", "--bundles-dir", str(tmp_path), "--version", "v1"])
+
+    scorer = LeadScorer(str(tmp_path / "v1"), inference_mode="sklearn")
+
+    assert scorer.version == "v1"
+    assert scorer.score_one(WARM_UP_LEAD).score == pytest.approx(
+        LeadScorer(ARTIFACTS_DIR).score_one(WARM_UP_LEAD).score
+    )
+
+
+def test_mmap_scorers_of_two_directories_stay_independent(tmp_path):
+    """Test each directory of artifact files maps its arrays from its own file."""
+    directories = [tmp_path / "a", tmp_path / "b"]
+    for directory in directories:
+        shutil.copytree(
+            ARTIFACTS_DIR, directory, ignore=shutil.ignore_patterns("*.bin", "bundles")
+        )
+    scaler = joblib.load(directories[1] / "scaler.joblib")
+    scaler.mean_ = scaler.mean_ + 1.0
+    joblib.dump(scaler, directories[1] / "scaler.joblib")
+
+    first = LeadScorer(str(directories[0]), storage="mmap")
+    expected = first.score_one(WARM_UP_LEAD).score
+    second = LeadScorer(str(directories[1]), storage="mmap")
+
+    assert first.version != second.version
+    for directory in directories:
+        assert os.path.isfile(directory / "shared_arrays.bin")
+    assert isinstance(first.artifacts.scaler.mean_, np.memmap)
+    assert first.score_one(WARM_UP_LEAD).score == expected
+    assert second.score_one(WARM_UP_LEAD).score != expected
+
+
+def test_score_many_is_lazy_and_keeps_going(scorer):
+    """Test leads are consumed chunk by chunk and invalid leads get an error."""
+    consumed = []
+
+    def leads():
+        for i, lead in enumerate(_leads(10)):
+            consumed.append(i)
+            yield lead if i != 3 else {**lead, "Lead Origin": "Bad value"}
+
+    scorer = copy.copy(scorer)
+    scorer.chunk_size = 4
+    results = scorer.score_many(leads())
+
+    first = next(results)
+    assert isinstance(first, LeadScore) and first.error is None
+    assert consumed == [0, 1, 2, 3], "Only the first chunk is read"
+
+    rest = list(results)
+    assert rest[2].prediction is None and rest[2].error.startswith("Unexpected value")
+    assert all(result.error is None for i, result in enumerate(rest) if i != 2)
+    assert len(rest) == 9
+
+    assert list(scorer.score_many(["not a lead"])) == [
+        LeadScore(None, None, "Expected a mapping")
+    ]
+
+
+def test_scorer_leaves_caller_data_alone(scorer):
+    """Test leads and arrays are read, never modified."""
+    leads = _leads(5)
+    original = copy.deepcopy(leads)
+    features = np.stack([get_artifacts().pipeline.encode(lead) for lead in leads])
+    features.flags.writeable = False  # Any write would raise
+
+    list(scorer.score_many(leads))
+    scorer.score_array(features)
+    LeadScorer(ARTIFACTS_DIR, inference_mode="sklearn").score_array(features)
+
+    assert leads == original
+    with pytest.raises(ValueError, match="Row 0"):
+        scorer.score_array(np.where(np.arange(9) == 0, 99.0, features[:1]))
+
+
+def test_scorer_is_thread_safe_and_reentrant(scorer):
+    """Test concurrent and nested calls give the results of a single call."""
+    leads = _leads(200)
+    expected = [result.score for result in scorer.score_many(leads)]
+
+    with ThreadPoolExecutor(8) as pool:
+        runs = list(
+            pool.map(
+                lambda _: [result.score for result in scorer.score_many(leads)],
+                range(16),
+            )
+        )
+    assert all(run == expected for run in runs)
+
+    nested = [
+        (result.score, scorer.score_one(lead).score)
+        for lead, result in zip(leads, scorer.score_many(leads))
+    ]
+    assert all(outer == pytest.approx(inner) for outer, inner in nested)
+
+
+def test_scorer_does_not_import_flask():
+    """Test the library API can be used without the web stack or service state."""
+    code = (
+        "import sys; from app.services import LeadScorer; "
+        "assert 'flask' not in sys.modules and 'werkzeug' not in sys.modules; "
+        "assert 'app.services.ml_service' not in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
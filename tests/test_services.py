@@ -1,6 +1,17 @@
+import json
+
 import pytest
+import numpy as np
 import pandas as pd
-from app.services import predict
+from app.services import (
+    decision_scores,
+    predict,
+    predict_batch,
+    rank_lines,
+    sweep_lead,
+)
+from app.services.ml_service import encoders, pipeline, scaler
+from app.utils import FEATURE_SCHEMA, extract_features
 
 
 def test_predict_valid():
@@ -44,3 +55,168 @@ def test_predict_unseen_labels():
         predict(df)
 
     assert str(exc.value) == "y contains previously unseen labels: 'Bad value'"
+
+
+def test_predict_batch_matches_predict():
+    """Test that scoring a batch gives the same predictions as scoring each row."""
+    data = {
+        "Lead Origin": ["Lead Add Form", "Lead Add Form", "API"],
+        "Lead Source": ["Google", "Google", "Olark Chat"],
+        "Do Not Email": ["1", "0", "0"],
+        "TotalVisits": [5.0, 5.0, 0.0],
+        "Total Time Spent on Website": [456, 456, 0],
+        "Last Activity": ["Email Opened", "Email Opened", "Olark Chat Conversation"],
+        "Through Recommendations": ["0", "0", "0"],
+        "A free copy of Mastering The Interview": ["1", "1", "0"],
+        "Last Notable Activity": ["SMS Sent", "SMS Sent", "Modified"],
+    }
+
+    df = pd.DataFrame(data)
+    expected = [predict(df.iloc[[i]].copy()) for i in range(len(df))]
+
+    assert predict_batch(df) == expected
+
+
+def test_predict_batch_empty():
+    """Test the predict_batch function with no rows."""
+    assert predict_batch(pd.DataFrame()) == []
+
+
+def _random_leads(n: int, seed: int = 0) -> list[dict]:
+    """Draw random valid leads, with the value types clients actually send."""
+    rng = np.random.default_rng(seed)
+    leads = []
+    for _ in range(n):
+        lead = {}
+        for key, (type, expected_values) in FEATURE_SCHEMA.items():
+            if expected_values is not None:
+                value = expected_values[rng.integers(len(expected_values))]
+                lead[key] = str(value) if type == "int" and rng.random() < 0.5 else value
+            elif type == "float":
+                lead[key] = float(rng.integers(0, 30)) if rng.random() < 0.5 else str(rng.random() * 30)
+            else:
+                lead[key] = int(rng.integers(0, 2500))
+        leads.append(lead)
+    return leads
+
+
+def test_pipeline_is_bit_identical_to_dataframe_path():
+    """Test that the compiled pipeline gives the same bits as encoders + scaler."""
+    for lead in _random_leads(200):
+        df = extract_features(lead)
+        for key, encoder in encoders.items():
+            df[key] = encoder.transform(df[key])
+        expected = scaler.transform(df)[0]
+
+        assert np.array_equal(pipeline.transform(lead), expected), lead
+
+
+def test_pipeline_keeps_error_messages():
+    """Test that the compiled pipeline raises the same errors as extract_features."""
+    lead = _random_leads(1)[0]
+    invalid_leads = [
+        {**lead, "Lead Origin": "Bad value"},
+        {**lead, "Lead Source": 3},
+        {**lead, "Do Not Email": "2"},
+        {**lead, "TotalVisits": "many"},
+        {**lead, "Last Activity": None},
+        {**lead, "Unexpected Key": "Invalid"},
+    ]
+    for invalid_lead in invalid_leads:
+        with pytest.raises(ValueError) as expected:
+            extract_features(invalid_lead)
+        with pytest.raises(ValueError) as exc:
+            pipeline.transform(invalid_lead)
+
+        assert str(exc.value) == str(expected.value)
+
+
+def test_pipeline_encodes_columns_like_rows():
+    """Test columnar encoding gives the same features as encoding lead by lead."""
+    leads = _random_leads(300, seed=2)
+    columns = {key: [lead[key] for lead in leads] for key in FEATURE_SCHEMA}
+    expected = np.stack([pipeline.encode(lead) for lead in leads])
+
+    features = pipeline.encode_columns(columns)
+
+    assert np.array_equal(features, expected)
+    assert pipeline.check_encoded(features) == {}
+
+
+def test_pipeline_checks_encoded_features():
+    """Test invalid codes are reported per row, for the first invalid feature."""
+    features = np.stack([pipeline.encode(lead) for lead in _random_leads(4)])
+    features[1, 0] = 17  # Lead Origin has 4 codes
+    features[1, 2] = 0.5  # Do Not Email is 0 or 1
+    features[3, 3] = np.nan
+
+    errors = pipeline.check_encoded(features)
+
+    assert list(errors) == [1, 3]
+    assert errors[1] == (
+        "Unexpected value '17' for feature 'Lead Origin'. Expected one of: 0, 1, 2, 3"
+    )
+    assert errors[3].endswith("for feature 'TotalVisits'. Expected a finite number.")
+
+
+def test_rank_lines_matches_full_sort():
+    """Test the bounded heap keeps the same top K as sorting every score."""
+    leads = _random_leads(500, seed=1)
+    lines = [json.dumps({**lead, "id": i}) for i, lead in enumerate(leads)]
+    lines[7] = "not json"
+
+    ranking = rank_lines(lines, k=20, id_field="id", chunk_size=64)
+
+    valid = [i for i in range(len(leads)) if i != 7]
+    scores = decision_scores(np.stack([pipeline.encode(leads[i]) for i in valid]))
+    expected = [valid[i] for i in np.argsort(-scores, kind="stable")[:20]]
+
+    assert [lead["id"] for lead in ranking["leads"]] == expected
+    assert np.allclose([lead["score"] for lead in ranking["leads"]], np.sort(scores)[::-1][:20])
+    assert ranking["scored"] == 499 and ranking["errors"] == 1
+
+
+def test_rank_lines_probabilities():
+    """Test calibrated probabilities follow the Platt mapping and the score order."""
+    lines = [json.dumps(lead) for lead in _random_leads(50)]
+
+    ranking = rank_lines(lines, k=5, calibration=(2.0, -1.0))
+    probabilities = [lead["probability"] for lead in ranking["leads"]]
+
+    assert probabilities == sorted(probabilities, reverse=True)
+    for lead in ranking["leads"]:
+        assert lead["probability"] == pytest.approx(1 / (1 + np.exp(1 - 2 * lead["score"])))
+    assert {lead["id"] for lead in ranking["leads"]} <= set(range(50)), "Ids default to line numbers"
+
+
+def test_sweep_lead_matches_pointwise_scores():
+    """Test a sweep scores each grid point like the lead with those values."""
+    lead = _random_leads(1, seed=3)[0]
+    visits = np.array([0.0, 5.0, 20.0])
+    minutes = np.linspace(0, 2000, 41)
+
+    sweep = sweep_lead(
+        lead, {"TotalVisits": visits, "Total Time Spent on Website": minutes}
+    )
+
+    expected = decision_scores(
+        np.stack(
+            [
+                pipeline.encode(
+                    {**lead, "TotalVisits": v, "Total Time Spent on Website": m}
+                )
+                for v in visits
+                for m in minutes
+            ]
+        )
+    )
+    assert np.allclose(sweep["scores"], expected.reshape(3, 41))
+
+    thresholds = sweep["thresholds"]["Total Time Spent on Website"]
+    for row, flips in zip(sweep["scores"], thresholds):
+        changes = np.flatnonzero(np.diff(np.array(row) > 0))
+        assert len(flips) == len(changes)
+        for flip, i in zip(flips, changes):
+            assert minutes[i] <= flip["value"] <= minutes[i + 1]
+            expected = "Converted" if row[i + 1] > 0 else "Not Converted"
+            assert flip["prediction"] == expected
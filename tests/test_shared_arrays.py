@@ -0,0 +1,93 @@
+import copy
+
+import numpy as np
+import pytest
+
+from app.services.artifacts import ModelArtifacts
+from app.services.engine import FactorizedSVMEngine, FusedSVMEngine
+from app.services.ml_service import encoders, model, scaler
+from app.services.shared_arrays import load_arrays, save_arrays, share_arrays
+
+
+def test_save_and_load_arrays(tmp_path):
+    """Test arrays round-trip through a single read-only mapped file."""
+    path = str(tmp_path / "arrays.bin")
+    arrays = {
+        "a": np.arange(12, dtype=np.float64).reshape(3, 4),
+        "b": np.array([1, 2, 3], dtype=np.int32),
+        "c": np.float32([0.5]),
+    }
+    save_arrays(path, arrays, version="v1")
+
+    version, mapped = load_arrays(path)
+
+    assert version == "v1"
+    for name, array in arrays.items():
+        assert np.array_equal(mapped[name], array) and mapped[name].dtype == array.dtype
+        assert not mapped[name].flags.writeable
+        assert mapped[name].ctypes.data % 64 == 0
+
+
+def test_load_arrays_rejects_other_files(tmp_path):
+    path = tmp_path / "arrays.bin"
+    path.write_bytes(b"not an array file")
+
+    with pytest.raises(ValueError, match="not a shared array file"):
+        load_arrays(str(path))
+
+
+def test_share_arrays_keeps_predictions(tmp_path):
+    """Test that artifacts and engines predict the same from mapped arrays."""
+    path = str(tmp_path / "arrays.bin")
+    svc = copy.deepcopy(model.best_estimator_)
+    shared_scaler = copy.deepcopy(scaler)
+    fused = FusedSVMEngine.from_artifacts(model, scaler)
+    factorized = FactorizedSVMEngine.from_artifacts(model, scaler, encoders)
+
+    features = svc.support_vectors_[:200] * scaler.scale_ + scaler.mean_
+    scaled = (features - scaler.mean_) / scaler.scale_
+    expected = (svc.predict(scaled), fused.predict(features), factorized.predict(features))
+
+    owners = {"svc": svc, "scaler": shared_scaler, "fused": fused, "factorized": factorized}
+    shared_bytes = share_arrays(path, "v1", owners)
+
+    assert shared_bytes > svc.support_vectors_.nbytes
+    assert isinstance(svc.support_vectors_, np.memmap)
+    assert isinstance(factorized.groups[0]["table"], np.memmap)
+    assert np.array_equal(svc.predict(scaled), expected[0])
+    assert np.array_equal(fused.predict(features), expected[1])
+    assert np.array_equal(factorized.predict(features), expected[2])
+
+
+def test_share_arrays_rewrites_stale_files(tmp_path):
+    """Test that a file built from other artifacts is replaced."""
+    path = str(tmp_path / "arrays.bin")
+    save_arrays(path, {"scaler.mean_": np.zeros(9)}, version="old")
+
+    shared_scaler = copy.deepcopy(scaler)
+    share_arrays(path, "new", {"scaler": shared_scaler})
+
+    version, mapped = load_arrays(path)
+    assert version == "new"
+    assert np.array_equal(shared_scaler.mean_, scaler.mean_)
+
+
+def test_mmap_storage_of_a_bare_svc(tmp_path):
+    """Test a plain SVC, e.g. a reduced model, is served from mapped arrays."""
+    svc = copy.deepcopy(model.best_estimator_)
+    artifacts = ModelArtifacts(
+        svc,
+        encoders,
+        copy.deepcopy(scaler),
+        "v1",
+        directory=str(tmp_path),
+        inference_mode="fused",
+        storage="mmap",
+    )
+
+    features = svc.support_vectors_[:50] * scaler.scale_ + scaler.mean_
+    assert isinstance(svc.support_vectors_, np.memmap)
+    assert np.array_equal(
+        artifacts.engine.predict(features),
+        FusedSVMEngine.from_artifacts(model, scaler).predict(features),
+    )
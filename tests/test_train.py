@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from sklearn.metrics.pairwise import pairwise_kernels
+from sklearn.model_selection import GridSearchCV
+from sklearn.svm import SVC
+
+from app.services import training
+from app.services.artifacts import ModelArtifacts
+from app.services.ml_service import WARM_UP_LEAD, get_artifacts, predict_batch
+from app.services.training import KernelCache, clean_leads, kernel_groups, train
+from app.train import main
+
+
+def _raw_leads(n: int, seed: int = 0) -> pd.DataFrame:
+    """Draw raw leads, labelled from their time on the website and noise."""
+    rng = np.random.default_rng(seed)
+    leads = pd.DataFrame(
+        {
+            name: rng.choice(encoder.classes_, n)
+            for name, encoder in get_artifacts().encoders.items()
+        }
+    )
+    for name in (
+        "Do Not Email",
+        "Through Recommendations",
+        "A free copy of Mastering The Interview",
+    ):
+        leads[name] = rng.choice(["No", "Yes"], n)
+    leads["TotalVisits"] = rng.poisson(3, n).astype(float)
+    leads["Total Time Spent on Website"] = rng.integers(0, 2000, n)
+    leads["Page Views Per Visit"] = rng.gamma(2, 1.2, n)
+    noise = rng.random(n) < 0.15
+    leads["Converted"] = (leads["Total Time Spent on Website"] > 900) ^ noise
+    return leads.astype({"Converted": int})
+
+
+def test_clean_leads_follows_the_notebook():
+    """Test missing values, rare labels and outliers are handled as in the notebook."""
+    leads = _raw_leads(400).drop(columns="Page Views Per Visit")
+    leads.loc[:4, "TotalVisits"] = 1.0
+    leads.loc[0, "Lead Source"] = "google"
+    leads.loc[1, "Lead Source"] = np.nan
+    leads.loc[2, "Last Activity"] = "Select"
+    leads.loc[3, "Lead Origin"] = "Quick Add Form"
+    leads.loc[4, "Last Notable Activity"] = "Email Received"
+    leads.loc[5, "TotalVisits"] = np.nan
+    leads.loc[6, "TotalVisits"] = 250.0
+
+    cleaned = clean_leads(leads)
+    assert len(cleaned) < len(leads) and cleaned["TotalVisits"].max() < 250
+    assert cleaned.loc[:1, "Lead Source"].tolist() == ["Google", "Google"]
+    assert cleaned.loc[2, "Last Activity"] == "Email Opened"
+    assert cleaned.loc[3, "Lead Origin"] == "Lead Add Form"
+    assert cleaned.loc[4, "Last Notable Activity"] == "Other"
+    assert cleaned.loc[5, "TotalVisits"] == leads["TotalVisits"].median()
+    assert set(cleaned["Do Not Email"]) == {0, 1}
+
+    with pytest.raises(ValueError, match="Missing columns: Converted"):
+        clean_leads(leads.drop(columns="Converted"))
+
+
+def test_kernel_cache_matches_svc_fits():
+    """Test the cached kernel search scores candidates like SVC fits do."""
+    leads = _raw_leads(500, seed=1)
+    param_grid = {"C": [0.1, 1], "kernel": ["linear", "rbf"], "gamma": ["auto"]}
+    assert kernel_groups(param_grid) == [
+        {"kernel": ["linear"], "C": [0.1, 1]},
+        {"kernel": ["rbf"], "gamma": ["auto"], "C": [0.1, 1]},
+    ]
+
+    plain = train(leads, param_grid=param_grid, kernel_cache_bytes=None)
+    cached = train(leads, param_grid=param_grid, n_jobs=2)
+    np.testing.assert_allclose(
+        [c["mean_test_score"] for c in cached.report["candidates"]],
+        [c["mean_test_score"] for c in plain.report["candidates"]],
+        atol=1e-6,
+    )
+    assert cached.report["kernel_cache"]["misses"] == 2
+    assert cached.report["best_params"] == plain.report["best_params"]
+    assert cached.model.estimator.get_params() == plain.model.estimator.get_params()
+
+
+def test_train_saves_a_search_of_svcs():
+    """Test the saved model is a search of SVCs serving the refitted SVC."""
+    leads = _raw_leads(300, seed=4)
+    param_grid = {"C": [0.1, 1], "kernel": ["rbf"], "gamma": ["scale"]}
+
+    result = train(leads, param_grid=param_grid, strategy="halving")
+    model = result.model
+    assert isinstance(model, GridSearchCV) and model.refit is True
+    assert model.estimator.get_params() == SVC().get_params()
+    assert model.best_params_ == result.report["best_params"]
+    assert model.best_estimator_.get_params() == SVC(**model.best_params_).get_params()
+
+    features = model.best_estimator_.support_vectors_[:10]
+    np.testing.assert_array_equal(
+        model.decision_function(features),
+        model.best_estimator_.decision_function(features),
+    )
+
+
+def test_kernel_cache_resolves_gamma_on_each_fold():
+    """Test gamma="scale" is resolved on the training rows of each fold, as SVC does."""
+    leads = _raw_leads(500, seed=3)
+    param_grid = {"C": [1], "kernel": ["rbf", "poly", "sigmoid"], "gamma": ["scale"]}
+
+    plain = train(leads, param_grid=param_grid, kernel_cache_bytes=None)
+    cached = train(leads, param_grid=param_grid)
+    np.testing.assert_allclose(
+        [c["mean_test_score"] for c in cached.report["candidates"]],
+        [c["mean_test_score"] for c in plain.report["candidates"]],
+        atol=1e-6,
+    )
+    assert cached.report["kernel_cache"]["misses"] == 2
+
+
+def test_kernel_cache_computes_matrices_concurrently(monkeypatch):
+    """Test a matrix being computed only holds up the fits that need it."""
+    computing_rbf = threading.Event()
+    calls = []
+
+    def slow_base(base, X, Y):
+        calls.append(base)
+        if base == "dot":
+            assert computing_rbf.wait(5), "The rbf kernel waited for the linear one"
+        else:
+            computing_rbf.set()
+        return kernel_base(base, X, Y)
+
+    kernel_base = training._kernel_base
+    monkeypatch.setattr(training, "_kernel_base", slow_base)
+    cache = KernelCache(np.random.default_rng(0).normal(size=(40, 3)))
+    rows = np.arange(40)
+    with ThreadPoolExecutor(3) as pool:
+        blocks = [
+            pool.submit(cache.block, rows, rows, kernel, "auto", 3, 0.0)
+            for kernel in ("linear", "linear", "rbf")
+        ]
+        blocks = [block.result() for block in blocks]
+
+    assert sorted(calls) == ["dot", "sqeuclidean"]
+    assert cache.stats()["misses"] == 2 and cache.stats()["hits"] == 1
+    np.testing.assert_array_equal(blocks[0], blocks[1])
+    np.testing.assert_allclose(
+        blocks[2], pairwise_kernels(cache.features, metric="rbf", gamma=1 / 3)
+    )
+
+
+def test_train_cli_writes_servable_artifacts(tmp_path, capsys):
+    """Test the CLI writes the artifact files the service loads, and a report."""
+    data = str(tmp_path / "leads.csv")
+    _raw_leads(600, seed=2).to_csv(data, index=False)
+    output_dir = str(tmp_path / "artifacts")
+
+    assert main([data, "--output-dir", output_dir, "--search", "halving"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["strategy"] == "halving" and report["n_kept"] < 600
+    assert report["n_train"] + report["n_test"] == report["n_kept"]
+    assert {"iter", "n_resources", "mean_fit_time"} <= set(report["candidates"][0])
+    with open(os.path.join(output_dir, "training_report.json")) as f:
+        assert json.load(f) == report
+
+    model = joblib.load(os.path.join(output_dir, "best_svm.joblib"))
+    assert model.best_params_ == report["best_params"]
+    artifacts = ModelArtifacts.from_legacy_files(output_dir, inference_mode="sklearn")
+    predictions = predict_batch(pd.DataFrame([WARM_UP_LEAD] * 2), artifacts)
+    assert len(predictions) == 2
+
+    assert main([str(tmp_path / "missing.csv"), "--output-dir", output_dir]) == 1
@@ -6,6 +6,7 @@ from unittest.mock import MagicMock, patch
 
 from app.utils import format_response
 from app.utils import load_artifact, check_feature_value, extract_features
+from app.utils import extract_batch_features, parse_sweep_grid
 
 
 # FORMAT_RESPONSE TESTS
@@ -300,3 +301,62 @@ def test_extract_features_none_value():
         ValueError, match="Missing value for feature 'Through Recommendations'"
     ):
         extract_features(data)
+
+
+# EXTRACT_BATCH_FEATURES TESTS
+def test_extract_batch_features_reports_errors_per_row():
+    """Test that invalid leads are reported without failing the batch"""
+    lead = {
+        "Lead Origin": "API",
+        "Lead Source": "Google",
+        "Do Not Email": 1,
+        "TotalVisits": 15.5,
+        "Total Time Spent on Website": 120,
+        "Last Activity": "Email Opened",
+        "Through Recommendations": 1,
+        "A free copy of Mastering The Interview": 0,
+        "Last Notable Activity": "Email Opened",
+    }
+    data = [lead, {**lead, "Through Recommendations": None}, "not a lead", lead]
+
+    df, errors = extract_batch_features(data)
+
+    assert list(df.index) == [0, 3], "Expected only the valid leads, at their input positions."
+    assert df.shape == (2, 9), "Expected DataFrame to have 2 rows and 9 columns."
+    assert errors == {
+        1: "Missing value for feature 'Through Recommendations'",
+        2: "Expected a JSON object",
+    }
+
+
+# PARSE_SWEEP_GRID TESTS
+def test_parse_sweep_grid_valid():
+    """Test that explicit values and evenly spaced ranges are both accepted"""
+    grid = parse_sweep_grid(
+        {
+            "Total Time Spent on Website": [0, 100, 250],
+            "TotalVisits": {"start": 0, "stop": 10, "num": 6},
+        },
+        max_points=100,
+    )
+
+    assert list(grid) == ["Total Time Spent on Website", "TotalVisits"]
+    assert grid["Total Time Spent on Website"].tolist() == [0.0, 100.0, 250.0]
+    assert grid["TotalVisits"].tolist() == [0.0, 2.0, 4.0, 6.0, 8.0, 10.0]
+
+
+@pytest.mark.parametrize(
+    "grid, message",
+    [
+        ({}, "Expected a grid over one or two features"),
+        ({"Lead Origin": ["API"]}, "Cannot sweep Lead Origin"),
+        ({"TotalVisits": [3, 1]}, "Expected increasing values for 'TotalVisits'"),
+        ({"TotalVisits": [1, "2"]}, "Expected numbers for 'TotalVisits'"),
+        ({"TotalVisits": {"start": 0, "stop": 1, "num": 1}}, "Expected an integer num"),
+        ({"TotalVisits": {"start": 0, "stop": 1, "num": 101}}, "Too many grid points"),
+    ],
+)
+def test_parse_sweep_grid_invalid(grid, message):
+    """Test that invalid grids are rejected with a clear message"""
+    with pytest.raises(ValueError, match=message):
+        parse_sweep_grid(grid, max_points=100)
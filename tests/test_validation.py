@@ -0,0 +1,138 @@
+import random
+
+import pandas as pd
+import pytest
+
+from app.utils.constants import FEATURE_NAMES, FEATURE_SCHEMA
+from app.utils.functions import extract_feature_values
+from app.utils.validation import FieldError, batch_validator
+
+# Valid and invalid values of every kind the single-lead path distinguishes
+ODD_VALUES = [
+    None,
+    "",
+    " 1 ",
+    "1.5",
+    "abc",
+    "nan",
+    "0",
+    "1",
+    "01",
+    0,
+    1,
+    2,
+    -1,
+    0.0,
+    1.0,
+    0.5,
+    1.5,
+    True,
+    False,
+    float("nan"),
+    "Google",
+    "google",
+    "Other",
+    "Email Opened",
+    "API",
+]
+
+
+def _random_leads(n: int, seed: int = 0) -> list:
+    """Draw leads mixing valid values, odd values, missing and unknown fields."""
+    rng = random.Random(seed)
+    leads = []
+    for _ in range(n):
+        lead = {}
+        for key, (type, expected_values) in FEATURE_SCHEMA.items():
+            if rng.random() < 0.8:
+                if expected_values is not None:
+                    lead[key] = rng.choice(expected_values)
+                else:
+                    lead[key] = rng.randint(0, 2000)
+            elif rng.random() < 0.9:
+                lead[key] = rng.choice(ODD_VALUES)
+        if rng.random() < 0.05:
+            lead["Unknown"] = 1
+        leads.append(lead if rng.random() < 0.98 else "not a lead")
+    return leads
+
+
+def test_batch_validator_matches_single_lead_path():
+    """Test the column-wise validator gives the rules and messages of the single-lead path."""
+    leads = _random_leads(3000)
+    validation = batch_validator.validate(leads)
+
+    expected_rows, expected_errors = {}, {}
+    for position, lead in enumerate(leads):
+        if not isinstance(lead, dict):
+            expected_errors[position] = "Expected a JSON object"
+            continue
+        try:
+            expected_rows[position] = extract_feature_values(lead)
+        except ValueError as e:
+            expected_errors[position] = str(e)
+
+    assert validation.index == list(expected_rows)
+    assert 0 < len(validation.errors) < len(leads), "Expected a mix of valid and invalid leads"
+    assert {
+        position: field_errors[0].message
+        for position, field_errors in validation.errors.items()
+    } == expected_errors
+
+    rows = [list(row) for row in zip(*validation.columns.values())]
+    assert rows == list(expected_rows.values()), "Valid values must be kept as sent"
+
+
+def test_batch_validator_columns_match_rows():
+    """Test a columnar batch is validated like the same leads sent as objects."""
+    leads = [
+        lead for lead in _random_leads(2000, seed=1)
+        if isinstance(lead, dict) and "Unknown" not in lead
+    ]
+    columns = {key: [lead.get(key) for lead in leads] for key in FEATURE_SCHEMA}
+
+    assert batch_validator.validate_columns(columns) == batch_validator.validate(leads)
+
+
+def test_batch_validator_rejects_bad_columns():
+    """Test unknown, missing and ragged columns fail the whole batch."""
+    columns = {key: [None] for key in FEATURE_SCHEMA}
+    invalid_batches = {
+        "Unknown features: Extra": {**columns, "Extra": [1]},
+        "Missing features: TotalVisits": {
+            key: values for key, values in columns.items() if key != "TotalVisits"
+        },
+        "Expected the same number of values for every feature": {
+            **columns,
+            "TotalVisits": [1.0, 2.0],
+        },
+    }
+    for message, invalid_batch in invalid_batches.items():
+        with pytest.raises(ValueError, match=message):
+            batch_validator.validate_columns(invalid_batch)
+
+
+def test_batch_validator_reports_every_field():
+    """Test each invalid field of a lead is reported, unknown features first."""
+    lead = dict.fromkeys(FEATURE_SCHEMA)
+    lead.update({"Lead Origin": "API", "Do Not Email": 3, "Extra": 1})
+
+    errors = batch_validator.validate([lead]).errors[0]
+
+    assert errors[0] == FieldError(0, None, "Unknown features: Extra")
+    assert errors[1] == FieldError(
+        0,
+        "Lead Source",
+        "Missing value for feature 'Lead Source'",
+    )
+    assert [error.field for error in errors[2:4]] == ["Do Not Email", "TotalVisits"]
+    assert errors[2].message.startswith("Unexpected value '3' for feature 'Do Not Email'")
+    assert len(errors) == 1 + len(FEATURE_SCHEMA) - 1
+
+
+def test_batch_validator_empty_batch():
+    """Test an empty batch gives empty columns."""
+    validation = batch_validator.validate([])
+
+    assert validation.index == [] and validation.errors == {}
+    assert pd.DataFrame(validation.columns, columns=FEATURE_NAMES).shape == (0, 9)